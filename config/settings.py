@@ -35,10 +35,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "store.middleware.ReplicaPinningMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "store.middleware.RateLimitMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -56,6 +58,7 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 'store.context_processors.cart_counter',
+                'store.context_processors.categories',
             ],
         },
     },
@@ -63,18 +66,186 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "config.wsgi.application"
 
+# Warm each worker up when config/wsgi.py or config/asgi.py loads (store.warmup);
+# `manage.py warmup --profile-imports` shows where cold-start time goes
+WARMUP_ON_STARTUP = os.environ.get("WARMUP_ON_STARTUP", "1") == "1"
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite tuned for concurrent web writes (see `manage.py bench_sqlite` for the before/after numbers):
+# WAL lets readers run alongside the single writer, IMMEDIATE takes the write lock at BEGIN (so
+# read-then-write transactions queue instead of failing with "database is locked"), and `timeout`
+# is SQLite's busy_timeout. Connections are kept open and reused across requests.
+SQLITE_INIT_PRAGMAS = (
+    "PRAGMA journal_mode=WAL;"
+    "PRAGMA synchronous=NORMAL;"
+    "PRAGMA mmap_size=134217728;"  # 128 MB memory-mapped reads
+    "PRAGMA cache_size=-20000;"  # ~20 MB page cache per connection
+    "PRAGMA temp_store=MEMORY;"
+)
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "timeout": 20,
+            "transaction_mode": "IMMEDIATE",
+            "init_command": SQLITE_INIT_PRAGMAS,
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Set REDIS_URL (e.g. redis://localhost:6379/0; needs the "redis" extra) when running several
+# workers, so cache invalidations (e.g. of the category tree), rate limits and cached sessions are
+# shared by every process. Without it each process has its own memory cache.
+
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "studywithsai",
+        }
+    }
+
+# Sessions (store.sessions): read through the cache above, written to the database behind the
+# request in batches. The cache is only used when it is shared (REDIS_URL): with the per-process
+# LocMemCache every load and save goes to the database, as with the stock engine
+SESSION_ENGINE = "store.sessions"
+# Decoded sessions kept per worker, and for how many seconds one is trusted before re-reading the
+# shared cache. Another worker's save or logout goes unseen here for that long, so 0 (off) unless
+# sessions are never changed on one worker and read on another within that time
+SESSION_LRU_SIZE = 10000
+SESSION_LRU_TTL = 0
+# Seconds between database flushes, or sooner once this many saved sessions are waiting
+SESSION_FLUSH_INTERVAL = 1.0
+SESSION_FLUSH_BATCH = 500
+# How often (seconds) each worker logs its session hit rate and flush lag (logger "store.sessions")
+SESSION_STATS_LOG_INTERVAL = 60 * 5
+
+# Upper bound on how stale cached catalog data (category tree, ...) can get in another process
+CATALOG_CACHE_TIMEOUT = 60 * 5
+
+
+# How long (seconds) add-to-cart holds stock before `release_expired_reservations` frees it
+STOCK_RESERVATION_TTL = 60 * 15
+
+# Attempts at a lost compare-and-swap stock update before giving up (store.inventory.adjust_stock)
+STOCK_CAS_MAX_RETRIES = 5
+
+# Warehouse stock feed (store.stock_ingest: `manage.py ingest_stock_deltas` and POST inventory/stock-feed/)
+# Shared secret the warehouse sends as "Authorization: Bearer <token>"; the endpoint is off while unset
+STOCK_INGEST_TOKEN = os.environ.get("STOCK_INGEST_TOKEN", "")
+# Records coalesced per product in memory before they are written
+STOCK_INGEST_BUFFER_SIZE = 20000
+# Products written per UPDATE statement (each one adds about a dozen query parameters)
+STOCK_INGEST_CHUNK_SIZE = 500
+
+
+# "Frequently bought together" (manage.py build_recommendations)
+# Neighbours stored per product
+RECOMMENDATIONS_TOP_K = 10
+# Co-occurrence matrix and order watermark kept between runs, so a run only reads new orders
+RECOMMENDATIONS_STATE_FILE = BASE_DIR / 'recommendations.npz'
+
+# Home page "Bestsellers" / "Trending now" (store.rankings)
+RANKINGS_SIZE = 8
+# The lists are cached, not invalidated per order, so they lag sales by up to this many seconds
+RANKINGS_CACHE_TIMEOUT = 60
+# A sale counts half as much towards "trending" after this many seconds
+TRENDING_HALF_LIFE = 60 * 60 * 24 * 3
+
+
+# Read replica for catalog and order-history reads (store.routers.ReplicaRouter)
+# Set DATABASE_REPLICA_NAME to a second SQLite file and keep it fresh with `manage.py sync_replica`.
+REPLICA_DATABASE_ALIAS = "replica"
+if os.environ.get("DATABASE_REPLICA_NAME"):
+    DATABASES[REPLICA_DATABASE_ALIAS] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ["DATABASE_REPLICA_NAME"],
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "timeout": 20,
+            "init_command": SQLITE_INIT_PRAGMAS + "PRAGMA query_only=ON;",
+        },
+        # Tests run against the primary only
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["store.routers.ReplicaRouter"]
+
+# Models whose reads may be served by the replica
+REPLICA_MODELS = {
+    "store.product",
+    "store.category",
+    "store.product_categories",
+    "store.productrecommendation",
+    "store.productsalesstats",
+    "store.order",
+    "store.orderitem",
+    "store.archivedorder",
+    "store.archivedorderitem",
+}
+
+# After a write, the client reads from the primary for this many seconds
+REPLICA_PIN_SECONDS = 10
+
+
+# Search-as-you-type suggestions (store.suggest, GET search/suggest/?q=): an in-memory index per process
+SEARCH_SUGGEST_LIMIT = 8
+# Shortest query (letters and digits) that gets suggestions, and most words considered
+SEARCH_SUGGEST_MIN_CHARS = 2
+SEARCH_SUGGEST_MAX_WORDS = 5
+# Trigram similarity (0-1) a misspelled word needs to count as a match
+SEARCH_SUGGEST_MIN_SIMILARITY = 0.4
+# Words sharing the most trigrams with a query word that are also checked by edit distance (1-2 typos)
+SEARCH_SUGGEST_EDIT_CANDIDATES = 30
+# Cap on vocabulary words one short prefix may expand to
+SEARCH_SUGGEST_MAX_PREFIX_WORDS = 200
+# Seconds before an index is rebuilt anyway (bulk updates such as the stock feed send no signals)
+SEARCH_SUGGEST_MAX_AGE = 60 * 5
+
+
+# Order archive (`manage.py archive_orders`, store.archive): orders older than this many days,
+# in a final status, move out of Order/OrderItem into the archive tables, a batch per transaction
+ORDER_ARCHIVE_AFTER_DAYS = 365
+ORDER_ARCHIVE_STATUSES = ("Completed", "Cancelled", "Refunded")
+ORDER_ARCHIVE_BATCH_SIZE = 500
+
+
+# Rate limiting (store.middleware.RateLimitMiddleware), by URL name.
+# Each client gets `per_ip` and, once it has a session, `per_session` limits of (requests,
+# seconds) over a sliding window; a request over either limit gets a 429 with Retry-After.
+# Counters live in CACHES["default"], so with LocMemCache each worker counts separately.
+RATE_LIMITS = {
+    # Full-text scan of the catalog
+    "search": {"per_ip": (60, 60), "per_session": (20, 60)},
+    # Creates sessions, carts and stock reservations
+    "add_cart": {"per_ip": (60, 60), "per_session": (30, 60)},
+    # Batch quantity changes from the cart page (several clicks per request)
+    "cart_update": {"per_ip": (120, 60), "per_session": (60, 60), "methods": ("POST",)},
+    # Password hashing; showing the form (GET) is cheap
+    "login": {"per_ip": (20, 300), "per_session": (5, 300), "methods": ("POST",)},
+}
+# Number of proxies in front of the app that append to X-Forwarded-For (0 = use REMOTE_ADDR)
+RATE_LIMIT_TRUSTED_PROXIES = int(os.environ.get("RATE_LIMIT_TRUSTED_PROXIES", 0))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -133,5 +304,23 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# --- Media Serving (store.media.serve_media) ---
+# 'python' streams files from Django (zero-copy os.sendfile under gunicorn).
+# 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache) leaves the transfer to the front-end server.
+MEDIA_SERVE_BACKEND = os.environ.get('MEDIA_SERVE_BACKEND', 'python')
+# nginx `internal` location aliased to MEDIA_ROOT, used with 'x-accel-redirect'
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 7 # One week
+MEDIA_STREAM_BLOCK_SIZE = 256 * 1024
+
+# Public address of the site, for absolute links outside a request (sitemaps, catalog snapshot)
+SITE_URL = os.environ.get("SITE_URL", "https://studywithsai.onrender.com")
+
+# Static catalog snapshot (`manage.py build_catalog_snapshot`, store.snapshot): gzipped sitemap and
+# JSON shards written under MEDIA_ROOT/<dir> and served like product images
+CATALOG_SNAPSHOT_DIR = "catalog"
+# Products per shard, by id range (a sitemap may list at most 50,000 URLs)
+CATALOG_SNAPSHOT_SHARD_SIZE = 10000
+
 # Set the domain used in the reset link (required for Django to generate the correct URL)
 SITE_ID = 1
\ No newline at end of file
@@ -1,8 +1,8 @@
 from django.contrib import admin
-from django.urls import path, include 
+from django.urls import path, re_path, include 
 from django.contrib.auth import views as auth_views
 from django.conf import settings # <-- ADD THIS IMPORT
-from django.conf.urls.static import static
+from store.media import serve_media
 import os
 
 urlpatterns = [
@@ -17,10 +17,9 @@ urlpatterns = [
              template_name=os.path.join(settings.BASE_DIR, 'templates', 'registration', 'logout.html')
          ), 
          name='logout'),
+    # Product images: served with 304s/Range support, or offloaded via X-Accel-Redirect/X-Sendfile
+    re_path(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media'),
     path('', include('store.urls')),
     path('account/', include('django.contrib.auth.urls')),
     
-]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+]
\ No newline at end of file
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 application = get_wsgi_application()
+
+# Pay the first-request costs (URL resolver, template compilation, catalog caches) at boot
+from store.warmup import warm_up_worker  # noqa: E402
+
+warm_up_worker()
@@ -1,47 +1,100 @@
-from django.contrib import admin
-from .models import Product, Cart, CartItem, Product, Cart, CartItem, Order, OrderItem, Category
+from datetime import timedelta
+
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models import F, Sum
+from django.template.response import TemplateResponse
+from django.utils import timezone
+from .admin_mixins import ScalableAdminMixin
+from .inventory import InsufficientStock, StockConflict, adjust_stock
+from .rankings import record_cancellation
+from .reporting import record_order_cancelled
+from .models import Product, Cart, CartItem, Product, Cart, CartItem, Order, OrderItem, Category, StockReservation, DailySales, DailyProductSales, ArchivedOrder, ArchivedOrderItem
 
 # Customizing how the Product model appears in the Admin
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(ScalableAdminMixin, admin.ModelAdmin):
     # Which fields to display on the main list page
     list_display = ['name', 'price', 'stock', 'is_available', 'created_at']
     
-    # Fields that can be filtered in the sidebar
-    list_filter = ['is_available', 'created_at', 'updated_at']
+    # Fields that can be filtered in the sidebar (indexed only)
+    list_filter = ['is_available', 'categories']
     
-    # Fields that can be searched
-    search_fields = ['name', 'description']
+    # Fields that can be searched: name prefix or exact slug, both index lookups
+    search_fields = ['name__prefix', 'slug__exact']
     
     # Automatically populate the 'slug' field based on the 'name' field
     prepopulated_fields = {'slug': ('name',)}
     
+    # Nicer widget for picking several categories
+    filter_horizontal = ('categories',)
+    
     # Fields to group/display when editing a single product
     fieldsets = (
         (None, {
-            'fields': ('name', 'slug', 'description', 'image')
+            'fields': ('name', 'slug', 'description', 'image', 'categories')
         }),
         ('Pricing & Inventory', {
             'fields': ('price', 'stock', 'is_available')
         }),
     )
 
+    def get_form(self, request, obj=None, **kwargs):
+        form = super().get_form(request, obj, **kwargs)
+        # Post back the stock value the admin was shown, so an edit can be applied as a delta
+        form.base_fields['stock'].show_hidden_initial = True
+        return form
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            return super().save_model(request, obj, form, change)
+
+        # Write only the columns that were edited, so a checkout that changed stock meanwhile isn't clobbered
+        concrete = {field.name for field in obj._meta.concrete_fields}
+        changed = [name for name in form.changed_data if name in concrete and name != 'stock']
+        if changed:
+            obj.save(update_fields=changed + ['updated_at'])
+
+        if 'stock' in form.changed_data:
+            # Apply the edit as a delta against what the admin saw, via compare-and-swap
+            field = form.fields['stock']
+            seen = field.to_python(
+                field.widget.value_from_datadict(form.data, form.files, form.add_initial_prefix('stock'))
+            )
+            delta = obj.stock - (seen if seen is not None else form.initial['stock'])
+            obj.refresh_from_db(fields=['stock', 'version'])
+            try:
+                adjust_stock(obj, delta)
+            except (InsufficientStock, StockConflict) as e:
+                self.message_user(request, f"Stock for {obj.name} was not changed: {e}", level=messages.ERROR)
+
 # --- NEW ADMIN REGISTRATION ---
 
 @admin.register(Cart)
-class CartAdmin(admin.ModelAdmin):
-    list_display = ('cart_id', 'date_added',)
-    search_fields = ('cart_id',)
+class CartAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ('cart_id', 'user', 'date_added',)
+    raw_id_fields = ('user',)
+    search_fields = ('cart_id__exact',)
 
 @admin.register(CartItem)
-class CartItemAdmin(admin.ModelAdmin):
+class CartItemAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ('product', 'cart', 'quantity', 'is_active')
+    # A user's cart is labelled with the user's name
+    list_select_related = ('product', 'cart__user')
     list_editable = ('is_active',) # Allows editing this field right from the list view
 
+@admin.register(StockReservation)
+class StockReservationAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ('product', 'cart', 'quantity', 'expires_at')
+    list_select_related = ('product', 'cart__user')
+    list_filter = ('expires_at',)
+
 @admin.register(Category)
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(ScalableAdminMixin, admin.ModelAdmin):
     # Only use fields that exist on the Category model
-    list_display = ('name', 'slug') 
+    list_display = ('name', 'slug', 'parent', 'product_count') 
+    readonly_fields = ('path', 'product_count')
     prepopulated_fields = {'slug': ('name',)}
 
 class OrderItemInline(admin.TabularInline):
@@ -52,8 +105,13 @@ class OrderItemInline(admin.TabularInline):
     can_delete = False # Prevent accidental deletion of history
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(ScalableAdminMixin, admin.ModelAdmin):
     inlines = [OrderItemInline]
+    list_display = ('order_number', 'user', 'order_total', 'status', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('order_number__exact', 'legacy_order_number__exact')
+    # Order numbers sort by time; ?order_number__lt=<number> pages through history without OFFSET
+    ordering = ('-order_number',)
     fieldsets = (
         ('Order Information', {
             'fields': (('order_number', 'created_at'), 'status', 'order_total', 'is_ordered'),
@@ -69,28 +127,132 @@ class OrderAdmin(admin.ModelAdmin):
     # Make sure key historical fields are read-only
     readonly_fields = ('order_number', 'order_total', 'created_at', 'user')
 
-def cancel_and_return_stock(self, request, queryset):
-    # Iterate through all selected orders
-    for order in queryset:
-        # Only process orders that are marked as ordered and haven't already been processed
-        if order.is_ordered and order.status not in ('Cancelled', 'Refunded'):
-            
-            # 1. Update Order Status
-            order.status = 'Cancelled'
-            order.save()
-            
-            # 2. Return Stock for each item
-            order_items = OrderItem.objects.filter(order=order)
-            for item in order_items:
-                product = item.product
-                product.stock += item.quantity # Add the quantity back to stock
-                product.save()
-                
-    # Send a confirmation message back to the administrator
-    self.message_user(request, f"{queryset.count()} order(s) successfully marked as Cancelled and stock returned.", level='success')
-
-# 🛑 2. DEFINE THE ACTION NAME AND REGISTER 🛑
-cancel_and_return_stock.short_description = "Cancel Order and Return Stock"
-
-# Register the action with the Admin
-actions = ['cancel_and_return_stock']
\ No newline at end of file
+    # Register the action with the Admin
+    actions = ['cancel_and_return_stock']
+
+    # 🛑 2. DEFINE THE ACTION NAME AND REGISTER 🛑
+    @admin.action(description="Cancel Order and Return Stock")
+    def cancel_and_return_stock(self, request, queryset):
+        cancelled = 0
+        skipped = []
+        # Iterate through all selected orders
+        for order in queryset:
+            # Only process orders that are marked as ordered and haven't already been processed
+            if order.is_ordered and order.status not in ('Cancelled', 'Refunded'):
+                try:
+                    # One transaction per order: an order whose stock can't be returned is left untouched
+                    with transaction.atomic():
+                        # 1. Update Order Status (only the status columns)
+                        order.status = 'Cancelled'
+                        order.save(update_fields=['status', 'updated_at'])
+
+                        # 2. Return Stock for each item (compare-and-swap, never a blind product.save())
+                        order_items = OrderItem.objects.filter(order=order).select_related('product')
+                        for item in order_items:
+                            adjust_stock(item.product, item.quantity) # Add the quantity back to stock
+
+                        # 3. Move the order into the cancelled columns of the sales rollups
+                        record_order_cancelled(order, order_items)
+                        # 4. Take its sales back out of the bestseller/trending counters
+                        record_cancellation(order, order_items)
+                except (StockConflict, InsufficientStock):
+                    # Lost the race to checkouts on the same products every time: the admin can retry
+                    skipped.append(order.order_number)
+                    continue
+                cancelled += 1
+
+        # Send a confirmation message back to the administrator
+        self.message_user(request, f"{cancelled} order(s) successfully marked as Cancelled and stock returned.", level=messages.SUCCESS)
+        if skipped:
+            self.message_user(
+                request,
+                f"{len(skipped)} order(s) were left unchanged because their stock was being updated by "
+                f"other requests; please try again: {', '.join(skipped)}.",
+                level=messages.WARNING,
+            )
+
+
+# --- ORDER ARCHIVE (read-only: rows are only written by `manage.py archive_orders`) ---
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    readonly_fields = ('product', 'quantity', 'product_price', 'sub_total')
+    fields = readonly_fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    inlines = [ArchivedOrderItemInline]
+    list_display = ('order_number', 'user', 'order_total', 'status', 'created_at', 'archived_at')
+    search_fields = ('order_number__exact', 'legacy_order_number__exact')
+    ordering = ('-order_number',)
+    raw_id_fields = ('user',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+# --- SALES DASHBOARD (reads only the daily rollup tables) ---
+
+@admin.register(DailySales)
+class DailySalesAdmin(admin.ModelAdmin):
+    list_display = ('date', 'orders', 'units', 'revenue', 'cancelled_orders', 'cancelled_revenue')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        """Replaces the changelist with a dashboard built from the rollups (a few small queries)."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        try:
+            days = max(1, min(int(request.GET.get('days', 30)), 366))
+        except ValueError:
+            days = 30
+        since = timezone.localdate() - timedelta(days=days - 1)
+
+        daily = list(DailySales.objects.filter(date__gte=since).order_by('date'))
+        totals = DailySales.objects.filter(date__gte=since).aggregate(
+            orders=Sum('orders'), units=Sum('units'), revenue=Sum('revenue'),
+            cancelled_orders=Sum('cancelled_orders'), cancelled_units=Sum('cancelled_units'),
+            cancelled_revenue=Sum('cancelled_revenue'),
+        )
+        top_sellers = (
+            DailyProductSales.objects.filter(date__gte=since)
+            # Grouped by product, not by name: two products can share a name
+            .values('product_id')
+            .annotate(name=F('product__name'), units=Sum(F('units') - F('cancelled_units')), revenue=Sum(F('revenue') - F('cancelled_revenue')))
+            .order_by('-revenue')[:10]
+        )
+
+        max_revenue = max((day.revenue - day.cancelled_revenue for day in daily), default=0) or 1
+        for day in daily:
+            day.net_revenue = day.revenue - day.cancelled_revenue
+            day.net_units = day.units - day.cancelled_units
+            day.bar_width = int(day.net_revenue * 100 / max_revenue)
+        orders = totals['orders'] or 0
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Sales dashboard',
+            'opts': self.model._meta,
+            'days': days,
+            'day_options': (7, 30, 90, 365),
+            'daily': daily,
+            'totals': totals,
+            'net_revenue': (totals['revenue'] or 0) - (totals['cancelled_revenue'] or 0),
+            'net_units': (totals['units'] or 0) - (totals['cancelled_units'] or 0),
+            'cancellation_rate': (totals['cancelled_orders'] or 0) * 100 / orders if orders else 0,
+            'top_sellers': top_sellers,
+            **(extra_context or {}),
+        }
+        return TemplateResponse(request, 'admin/store/sales_dashboard.html', context)
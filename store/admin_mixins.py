@@ -0,0 +1,141 @@
+# store/admin_mixins.py
+
+from django.contrib.admin.utils import NotRelationField, get_fields_from_path
+from django.core import checks
+from django.core.exceptions import FieldDoesNotExist
+from math import ceil
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Min
+from django.utils.functional import cached_property
+
+
+def estimate_row_count(model, using):
+    """
+    Cheap estimate of a table's row count, or None if the backend can't provide one.
+
+    PostgreSQL keeps one in pg_class. SQLite has sqlite_stat1 once ANALYZE has run,
+    and otherwise falls back to the primary-key span (two index lookups).
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+            row = cursor.fetchone()
+            if row and row[0] > 0:
+                return row[0]
+        elif connection.vendor == 'sqlite':
+            # sqlite_stat1 only exists once ANALYZE has been run
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone():
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+                row = cursor.fetchone()
+                if row:
+                    return int(row[0].split()[0])
+    span = model._default_manager.using(using).aggregate(low=Min('pk'), high=Max('pk'))
+    if span['low'] is None or not isinstance(span['low'], int):
+        return None
+    return span['high'] - span['low'] + 1
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    A paginator that never runs an unbounded COUNT(*).
+
+    Counts up to `exact_count_limit` rows exactly with COUNT over a LIMITed subquery.
+    Beyond that, an unfiltered changelist reports the table estimate and a filtered
+    one stops at the limit. Either way the count costs the same on a million rows.
+    The estimate can overshoot (e.g. gaps in the ids), so only the pages covering the
+    first `exact_count_limit` rows are offered; search or filter to reach the rest.
+    """
+
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = self.exact_count_limit
+        # SELECT COUNT(*) FROM (SELECT ... LIMIT n): reads at most `limit + 1` rows
+        bounded = queryset.order_by()[:limit + 1].count()
+        if bounded <= limit:
+            return bounded
+        if not queryset.query.has_filters():
+            estimate = estimate_row_count(queryset.model, queryset.db)
+            if estimate:
+                return max(estimate, limit)
+        return limit
+
+    @cached_property
+    def num_pages(self):
+        # Pages known to hold rows: there are more than exact_count_limit whenever count exceeds it
+        count = min(self.count, self.exact_count_limit)
+        if count == 0 and not self.allow_empty_first_page:
+            return 0
+        return ceil(max(1, count - self.orphans) / self.per_page)
+
+
+class ScalableAdminMixin:
+    """
+    ModelAdmin defaults for tables that grow without bound.
+
+    - No full COUNT(*) on each page load (estimated-count paginator, no "show all" total).
+    - Every ForeignKey shown in list_display is fetched in the same query (no N+1).
+    - `manage.py check` warns about search and filter fields that can't use an index.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_list_select_related(self, request):
+        if self.list_select_related:
+            return self.list_select_related
+        related = []
+        for name in self.get_list_display(request):
+            try:
+                field = self.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.many_to_one or field.one_to_one:
+                related.append(name)
+        return tuple(related)
+
+    def check(self, **kwargs):
+        return [*super().check(**kwargs), *self._check_indexed_lookups()]
+
+    def _check_indexed_lookups(self):
+        warnings = []
+        for entry in self.search_fields:
+            # Only exact and `prefix` searches can use a B-tree index: startswith is LIKE, which
+            # SQLite won't run on an index, and "=field" / "^field" mean iexact / istartswith
+            field_name, _, lookup = entry.rpartition('__')
+            if lookup not in ('exact', 'prefix'):
+                warnings.append(self._index_warning(f"search field '{entry}' is not an exact or prefix lookup", 'W001'))
+            elif not self._is_indexed(field_name):
+                warnings.append(self._index_warning(f"search field '{entry}' is not indexed", 'W002'))
+        for entry in self.list_filter:
+            if isinstance(entry, str) and not self._is_indexed(entry):
+                warnings.append(self._index_warning(f"list_filter field '{entry}' is not indexed", 'W003'))
+        return warnings
+
+    def _index_warning(self, message, code):
+        return checks.Warning(
+            f"{message}; the changelist will scan the whole table.",
+            hint="Use an indexed field with an exact ('field__exact') or prefix ('field__prefix') lookup.",
+            obj=self.__class__,
+            id=f'store.{code}',
+        )
+
+    def _is_indexed(self, path):
+        try:
+            field = get_fields_from_path(self.model, path)[-1]
+        except (FieldDoesNotExist, NotRelationField):
+            return False
+        if field.primary_key or field.unique or field.db_index or field.is_relation:
+            return True
+        # Also counts if it leads a composite index or unique constraint
+        meta = field.model._meta
+        leading = [index.fields[0].lstrip('-') for index in meta.indexes if index.fields]
+        leading += [c.fields[0] for c in meta.constraints if getattr(c, 'fields', None)]
+        return field.name in leading
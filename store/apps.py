@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class StoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "store"
+
+    def ready(self):
+        # Connect the catalog signal handlers (category counts, cache invalidation)
+        from . import signals  # noqa: F401
+        # Register the index-friendly `prefix` lookup on CharFields
+        from . import lookups  # noqa: F401
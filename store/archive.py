@@ -0,0 +1,62 @@
+# store/archive.py
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from .order_numbers import order_number_floor
+
+
+def _copy(instance, model):
+    """An unsaved `model` row with the same column values (and primary key) as `instance`."""
+    return model(**{
+        field.attname: getattr(instance, field.attname)
+        for field in model._meta.concrete_fields if hasattr(instance, field.attname)
+    })
+
+
+def archivable_orders(cutoff=None):
+    """Orders placed before `cutoff` (default: ORDER_ARCHIVE_AFTER_DAYS ago) that are in a final status."""
+    if cutoff is None:
+        cutoff = timezone.now() - timedelta(days=settings.ORDER_ARCHIVE_AFTER_DAYS)
+    # Order numbers sort by time, so the age test is a range on the (status, order_number) index
+    return Order.objects.filter(
+        status__in=settings.ORDER_ARCHIVE_STATUSES,
+        order_number__lt=order_number_floor(cutoff),
+        created_at__lt=cutoff,
+    )
+
+
+def archive_orders(cutoff=None, batch_size=None):
+    """
+    Moves archivable orders and their items into the archive tables.
+
+    Each batch is copied and deleted in its own transaction, so the hot tables are
+    never locked for long and an interrupted run loses nothing. Returns (orders, items) moved.
+    """
+    batch_size = batch_size or settings.ORDER_ARCHIVE_BATCH_SIZE
+    moved_orders = moved_items = 0
+    while True:
+        with transaction.atomic():
+            orders = list(archivable_orders(cutoff).order_by('order_number')[:batch_size])
+            if not orders:
+                return moved_orders, moved_items
+            order_ids = [order.pk for order in orders]
+            items = list(OrderItem.objects.filter(order_id__in=order_ids))
+
+            ArchivedOrder.objects.bulk_create([_copy(order, ArchivedOrder) for order in orders])
+            ArchivedOrderItem.objects.bulk_create([_copy(item, ArchivedOrderItem) for item in items], batch_size=1000)
+            OrderItem.objects.filter(order_id__in=order_ids).delete()
+            Order.objects.filter(pk__in=order_ids).delete()
+        moved_orders += len(orders)
+        moved_items += len(items)
+
+
+def get_order_items(order):
+    """The line items of a live or an archived order."""
+    if isinstance(order, ArchivedOrder):
+        return order.items.select_related('product')
+    return OrderItem.objects.filter(order=order).select_related('product')
@@ -0,0 +1,87 @@
+# store/carts.py
+
+from django.db import IntegrityError, transaction
+
+from .inventory import reserve_many, with_available_stock
+from .models import Cart, CartItem, Product
+
+
+def get_user_cart(user):
+    """The user's own cart, created on first use."""
+    cart = Cart.objects.filter(user=user).first()
+    if cart is not None:
+        return cart
+    try:
+        with transaction.atomic():
+            return Cart.objects.create(user=user)
+    except IntegrityError:
+        # Logged in on two devices at once: the other request created it
+        return Cart.objects.get(user=user)
+
+
+def merge_carts(anonymous_cart, user_cart):
+    """
+    Moves the anonymous cart's lines into the user's cart, then deletes the anonymous cart.
+
+    Quantities of products in both carts are summed and capped at the stock other shoppers
+    aren't holding. The result is written with one bulk upsert, in one transaction.
+    Returns the number of lines merged.
+    """
+    with transaction.atomic():
+        lines = list(CartItem.objects.filter(cart__in=[anonymous_cart, user_cart], is_active=True))
+        if not any(line.cart_id == anonymous_cart.pk for line in lines):
+            anonymous_cart.delete()
+            return 0
+
+        # 1. Sum the quantities per product across both carts
+        wanted = {}
+        for line in lines:
+            wanted[line.product_id] = wanted.get(line.product_id, 0) + line.quantity
+
+        # 2. Cap them at the free stock, read in one query (both carts' own holds don't count against them)
+        available = dict(
+            with_available_stock(Product.objects.filter(pk__in=wanted), exclude_carts=[anonymous_cart, user_cart])
+            .values_list('pk', 'available')
+        )
+        quantities = {
+            product_id: max(min(quantity, available.get(product_id, 0)), 0)
+            for product_id, quantity in wanted.items()
+        }
+
+        # 3. Upsert the merged lines into the user's cart and drop any that ended at zero
+        CartItem.objects.bulk_create(
+            [
+                CartItem(cart=user_cart, product_id=product_id, quantity=quantity)
+                for product_id, quantity in quantities.items() if quantity
+            ],
+            update_conflicts=True, unique_fields=['cart', 'product'], update_fields=['quantity', 'is_active'],
+        )
+        emptied = [product_id for product_id, quantity in quantities.items() if not quantity]
+        if emptied:
+            CartItem.objects.filter(cart=user_cart, product_id__in=emptied).delete()
+        reserve_many(user_cart, quantities)
+
+        # 4. The anonymous cart's lines and holds go with it
+        anonymous_cart.delete()
+    return len(quantities)
+
+
+def attach_cart_on_login(request, user, create=True):
+    """
+    Gives a user who just logged in their own cart, with anything added before logging in merged in.
+
+    Without `create`, a user with no cart and nothing to merge is left without one (returns None).
+    """
+    cart_id = request.session.pop('cart_id', None)
+    anonymous_cart = Cart.objects.filter(cart_id=cart_id, user__isnull=True).first() if cart_id else None
+    if anonymous_cart is None and not create:
+        user_cart = Cart.objects.filter(user=user).first()
+        if user_cart is None:
+            return None
+    else:
+        user_cart = get_user_cart(user)
+        if anonymous_cart is not None:
+            merge_carts(anonymous_cart, user_cart)
+    # Later requests find the cart by primary key
+    request.session['cart_pk'] = user_cart.pk
+    return user_cart
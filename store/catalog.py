@@ -0,0 +1,60 @@
+# store/catalog.py
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Category, Product
+
+CATEGORY_TREE_CACHE_KEY = 'catalog:category_tree'
+
+
+def refresh_product_counts(category_ids):
+    """
+    Recomputes Category.product_count for the given categories only.
+
+    Each node is one indexed COUNT over the membership table. That keeps the
+    counters exact even when remove() is called for products that were never
+    in the category.
+    """
+    if not category_ids:
+        return
+    Membership = Product.categories.through
+    counts = (
+        Membership.objects.filter(category=OuterRef('pk'))
+        .values('category')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Category.objects.filter(pk__in=category_ids).update(
+        product_count=Coalesce(Subquery(counts), Value(0))
+    )
+    invalidate_category_tree()
+
+
+def _build_category_tree():
+    """Flat list of categories in tree (path) order, each with the product count of its whole subtree."""
+    nodes = list(
+        Category.objects.values('id', 'name', 'slug', 'path', 'depth', 'parent_id', 'product_count')
+    )
+    # One query per node: a product in several categories of a subtree (e.g. a parent and its
+    # child) counts once. The tree is cached, and there are only as many nodes as categories.
+    for node in nodes:
+        node['total_count'] = Category.objects.filter(path__prefix=node['path']).aggregate(
+            total=Count('products', distinct=True)
+        )['total']
+    return nodes
+
+
+def get_category_tree():
+    """Returns the cached category tree, building it on a cache miss."""
+    tree = cache.get(CATEGORY_TREE_CACHE_KEY)
+    if tree is None:
+        tree = _build_category_tree()
+        cache.set(CATEGORY_TREE_CACHE_KEY, tree, settings.CATALOG_CACHE_TIMEOUT)
+    return tree
+
+
+def invalidate_category_tree():
+    cache.delete(CATEGORY_TREE_CACHE_KEY)
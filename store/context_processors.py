@@ -1,17 +1,19 @@
 # store/context_processors.py
 
+from django.utils.functional import SimpleLazyObject
+
+from .catalog import get_category_tree
 from .models import Cart, CartItem
-from .views import _get_cart_id # Import the helper function
+from .views import _get_cart # Import the helper function
 
 def cart_counter(request):
     """Injects the total count of items in the current cart into the context."""
     cart_count = 0
     
-    if 'cart_id' in request.session:
+    if request.user.is_authenticated or 'cart_id' in request.session:
         try:
-            # Use the cart_id from the session to retrieve the cart
-            cart_id = _get_cart_id(request)
-            cart = Cart.objects.get(cart_id=cart_id)
+            # The user's own cart, or the anonymous session's
+            cart = _get_cart(request)
             
             # Sum the quantity of all active items in that cart
             cart_items = CartItem.objects.filter(cart=cart, is_active=True)
@@ -22,4 +24,9 @@ def cart_counter(request):
             cart_count = 0 # If cart is not found, count is zero
             
     # Return the dictionary to be added to the template context
-    return dict(cart_count=cart_count)
\ No newline at end of file
+    return dict(cart_count=cart_count)
+
+
+def categories(request):
+    """Injects the cached category tree for the navbar (only fetched if a template iterates it)."""
+    return dict(categories=SimpleLazyObject(get_category_tree))
@@ -0,0 +1,110 @@
+# store/facets.py
+
+from django.db.models import Count, Q
+
+from .catalog import get_category_tree
+from .models import Product
+
+# (value, label, lower bound inclusive, upper bound exclusive)
+PRICE_BANDS = (
+    ('under-10', 'Under $10', None, 10),
+    ('10-25', '$10 to $25', 10, 25),
+    ('25-50', '$25 to $50', 25, 50),
+    ('50-plus', '$50 & above', 50, None),
+)
+
+STOCK_OPTIONS = (
+    ('in', 'In stock', Q(stock__gt=0)),
+    ('out', 'Out of stock', Q(stock__lte=0)),
+)
+
+
+def _price_q(low, high):
+    q = Q()
+    if low is not None:
+        q &= Q(price__gte=low)
+    if high is not None:
+        q &= Q(price__lt=high)
+    return q
+
+
+def _category_q(path):
+    # pk__in a membership subquery avoids the duplicate rows a join through the M2M would produce
+    memberships = Product.categories.through.objects.filter(category__path__prefix=path)
+    return Q(pk__in=memberships.values('product_id'))
+
+
+def _category_nodes(current_category):
+    """The category options to offer: children of the current category, or the top level."""
+    tree = get_category_tree()
+    if current_category is None:
+        return [node for node in tree if node['parent_id'] is None]
+    return [node for node in tree if node['parent_id'] == current_category.pk]
+
+
+def apply_facets(request, products, current_category=None):
+    """
+    Narrows `products` by the facets selected in the query string and counts every facet option.
+
+    All counts come from a single conditional-aggregate query. Each facet's counts apply
+    the *other* active facets but not its own, so shoppers can switch between options.
+    Returns (filtered queryset, list of facets for the template).
+    """
+    # 1. Build the option conditions for each facet
+    options = {
+        'price': [(value, label, _price_q(low, high)) for value, label, low, high in PRICE_BANDS],
+        'stock': list(STOCK_OPTIONS),
+        'category': [
+            (node['slug'], node['name'], _category_q(node['path']))
+            for node in _category_nodes(current_category)
+        ],
+    }
+    titles = {'price': 'Price', 'stock': 'Availability', 'category': 'Category'}
+
+    # 2. Work out which options are selected (unknown values are ignored)
+    selected = {}
+    for facet, choices in options.items():
+        value = request.GET.get(facet)
+        for choice_value, _, condition in choices:
+            if choice_value == value:
+                selected[facet] = (value, condition)
+
+    def other_filters(facet):
+        q = Q()
+        for name, (_, condition) in selected.items():
+            if name != facet:
+                q &= condition
+        return q
+
+    # 3. One aggregate query for every option's count
+    aggregates = {}
+    for facet, choices in options.items():
+        others = other_filters(facet)
+        for index, (_, _, condition) in enumerate(choices):
+            aggregates[f'{facet}_{index}'] = Count('pk', filter=condition & others)
+    counts = products.aggregate(**aggregates) if aggregates else {}
+
+    # 4. Shape the results for the template, with toggle links that keep the rest of the query string
+    facets = []
+    for facet, choices in options.items():
+        if not choices:
+            continue
+        facet_options = []
+        for index, (value, label, _) in enumerate(choices):
+            params = request.GET.copy()
+            is_selected = facet in selected and selected[facet][0] == value
+            if is_selected:
+                params.pop(facet)
+            else:
+                params[facet] = value
+            facet_options.append({
+                'value': value,
+                'label': label,
+                'count': counts[f'{facet}_{index}'],
+                'selected': is_selected,
+                'url': '?' + params.urlencode(),
+            })
+        facets.append({'name': facet, 'title': titles[facet], 'options': facet_options})
+
+    filtered = products.filter(other_filters(None))
+    return filtered, facets
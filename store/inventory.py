@@ -0,0 +1,176 @@
+# store/inventory.py
+
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router
+from django.db.models import F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Product, StockReservation
+
+
+class InsufficientStock(Exception):
+    """Raised when a stock change would take a product below zero."""
+
+    def __init__(self, product, requested):
+        self.product = product
+        self.requested = requested
+        super().__init__(f"Only {product.stock} of {product.name} left, {requested} requested.")
+
+
+class StockConflict(Exception):
+    """Raised when a stock change keeps losing the compare-and-swap race."""
+
+
+# Process-wide compare-and-swap counters (see contention_stats)
+_stats_lock = threading.Lock()
+_stats = {'updates': 0, 'attempts': 0, 'conflicts': 0, 'failures': 0}
+
+
+def _count(**increments):
+    with _stats_lock:
+        for key, value in increments.items():
+            _stats[key] += value
+
+
+def contention_stats():
+    """Snapshot of this process's stock CAS counters, plus the share of attempts that lost a race."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['conflict_rate'] = stats['conflicts'] / stats['attempts'] if stats['attempts'] else 0.0
+    return stats
+
+
+def _reload(product):
+    """Re-reads stock and version from the primary (a replica may lag behind the row the UPDATE checks)."""
+    product.refresh_from_db(using=router.db_for_write(Product), fields=['stock', 'version'])
+
+
+def adjust_stock(product, delta, max_retries=None):
+    """
+    Adds `delta` (negative to deduct) to the product's stock with optimistic concurrency.
+
+    Each attempt is one UPDATE ... WHERE version = <version we read>. Only stock,
+    version and updated_at are written, so a concurrent admin edit or checkout
+    can't be clobbered. If the row changed under us, it is re-read and the update
+    retried, up to STOCK_CAS_MAX_RETRIES times. InsufficientStock is only raised
+    once the current row (not just the caller's copy) is short.
+    """
+    if max_retries is None:
+        max_retries = settings.STOCK_CAS_MAX_RETRIES
+    fresh = False
+    for attempt in range(max_retries + 1):
+        new_stock = product.stock + delta
+        if new_stock < 0 and not fresh:
+            # The caller's copy may predate a restock: ask the row before refusing
+            _reload(product)
+            fresh = True
+            new_stock = product.stock + delta
+        if new_stock < 0:
+            _count(updates=1, attempts=attempt, conflicts=attempt, failures=1)
+            raise InsufficientStock(product, -delta)
+        updated = Product.objects.filter(pk=product.pk, version=product.version).update(
+            stock=new_stock,
+            version=F('version') + 1,
+            updated_at=timezone.now(),
+        )
+        if updated:
+            _count(updates=1, attempts=attempt + 1, conflicts=attempt)
+            product.stock = new_stock
+            product.version += 1
+            return product
+        # Someone else changed the row since we read it: reload and try again
+        _reload(product)
+        fresh = True
+    _count(updates=1, attempts=max_retries + 1, conflicts=max_retries + 1, failures=1)
+    raise StockConflict(f"Could not update stock for {product.name} after {max_retries + 1} attempts.")
+
+
+def reservation_expiry():
+    return timezone.now() + timedelta(seconds=settings.STOCK_RESERVATION_TTL)
+
+
+def reserved_quantity(product, exclude_cart=None):
+    """Units of `product` held by unexpired reservations (optionally ignoring one cart's own hold)."""
+    holds = StockReservation.objects.filter(product=product, expires_at__gt=timezone.now())
+    if exclude_cart is not None:
+        holds = holds.exclude(cart=exclude_cart)
+    return holds.aggregate(total=Sum('quantity'))['total'] or 0
+
+
+def available_stock(product, exclude_cart=None):
+    """Stock that can still be put in a cart: on-hand stock minus active holds."""
+    return max(product.stock - reserved_quantity(product, exclude_cart=exclude_cart), 0)
+
+
+def with_available_stock(products, exclude_carts=()):
+    """
+    Annotates each product with `available`: on-hand stock minus active holds (other than `exclude_carts`').
+
+    One grouped query for any number of products, instead of available_stock() per product.
+    """
+    holds = Q(reservations__expires_at__gt=timezone.now())
+    if exclude_carts:
+        holds &= ~Q(reservations__cart__in=exclude_carts)
+    return products.annotate(
+        available=F('stock') - Coalesce(Sum('reservations__quantity', filter=holds), Value(0)),
+    )
+
+
+def reserve(cart, product, quantity):
+    """
+    Holds `quantity` units of `product` for `cart` (replacing any earlier hold) for the configured TTL.
+
+    Every other hold in the cart gets the same new expiry, so an active shopper keeps the whole cart.
+    """
+    if quantity <= 0:
+        release(cart, product)
+        return
+    expires_at = reservation_expiry()
+    StockReservation.objects.update_or_create(
+        cart=cart, product=product,
+        defaults={'quantity': quantity, 'expires_at': expires_at},
+    )
+    StockReservation.objects.filter(cart=cart).update(expires_at=expires_at)
+
+
+def reserve_many(cart, quantities):
+    """reserve() for several products at once: {product_id: quantity}, with 0 dropping the hold."""
+    expires_at = reservation_expiry()
+    holds = [
+        StockReservation(cart=cart, product_id=product_id, quantity=quantity, expires_at=expires_at)
+        for product_id, quantity in quantities.items() if quantity > 0
+    ]
+    StockReservation.objects.bulk_create(
+        holds, update_conflicts=True,
+        unique_fields=['cart', 'product'], update_fields=['quantity', 'expires_at'],
+    )
+    dropped = [product_id for product_id, quantity in quantities.items() if quantity <= 0]
+    if dropped:
+        StockReservation.objects.filter(cart=cart, product_id__in=dropped).delete()
+    StockReservation.objects.filter(cart=cart).update(expires_at=expires_at)
+
+
+def release(cart, product=None):
+    """Drops the cart's hold on one product, or on everything when no product is given."""
+    holds = StockReservation.objects.filter(cart=cart)
+    if product is not None:
+        holds = holds.filter(product=product)
+    holds.delete()
+
+
+def release_expired(batch_size=1000):
+    """Deletes expired holds in primary-key batches, so no single DELETE locks the table for long."""
+    released = 0
+    now = timezone.now()
+    while True:
+        batch = list(
+            StockReservation.objects.filter(expires_at__lte=now)
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not batch:
+            return released
+        released += StockReservation.objects.filter(pk__in=batch).delete()[0]
@@ -0,0 +1,31 @@
+# store/lookups.py
+
+from django.db.models import CharField, Lookup
+from django.db.models.lookups import StartsWith
+
+# Sorts after every character, so "value" <= x < "value" + MAX_CHAR holds exactly for x starting with "value"
+MAX_CHAR = '\U0010ffff'
+
+
+@CharField.register_lookup
+class Prefix(Lookup):
+    """
+    `field__prefix=value`: a case-sensitive "starts with" that an ordinary B-tree index can serve.
+
+    `startswith` is a LIKE, which SQLite matches case-insensitively and so can't answer
+    from a BINARY index: it scans the table. There this compiles to the range
+    `value <= field < value || MAX_CHAR` instead. PostgreSQL keeps the LIKE, which uses
+    the varchar_pattern_ops index Django adds for indexed and unique CharFields.
+    """
+
+    lookup_name = 'prefix'
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        return compiler.compile(StartsWith(self.lhs, self.rhs))
+
+    def as_sqlite(self, compiler, connection):
+        if not self.rhs_is_direct_value():
+            return self.as_sql(compiler, connection)
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        return f'({lhs} >= %s AND {lhs} < %s)', (*lhs_params, self.rhs, *lhs_params, self.rhs + MAX_CHAR)
@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from store.archive import archivable_orders, archive_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves completed, cancelled and refunded orders older than ORDER_ARCHIVE_AFTER_DAYS out of the "
+        "order tables into the archive tables. Run periodically (e.g. nightly)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Archive orders older than this many days (default: ORDER_ARCHIVE_AFTER_DAYS).")
+        parser.add_argument('--batch-size', type=int, help="Orders moved per transaction (default: ORDER_ARCHIVE_BATCH_SIZE).")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the orders that would be archived.")
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.ORDER_ARCHIVE_AFTER_DAYS
+        cutoff = timezone.now() - timedelta(days=days)
+
+        if options['dry_run']:
+            count = archivable_orders(cutoff).count()
+            self.stdout.write(f"{count} order(s) placed before {cutoff:%Y-%m-%d} would be archived.")
+            return
+
+        orders, items = archive_orders(cutoff, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {orders} order(s) with {items} item(s)."))
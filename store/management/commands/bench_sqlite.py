@@ -0,0 +1,148 @@
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Minimal copies of the tables the cart and checkout paths write to; the real
+# schema, indexes and ORM overhead are left out on purpose (see stress_checkout)
+SCHEMA = """
+CREATE TABLE product (id INTEGER PRIMARY KEY, stock INTEGER NOT NULL, version INTEGER NOT NULL DEFAULT 0);
+CREATE TABLE cart_item (id INTEGER PRIMARY KEY, cart_id INTEGER NOT NULL, product_id INTEGER NOT NULL,
+                        quantity INTEGER NOT NULL, UNIQUE (cart_id, product_id));
+CREATE TABLE "order" (id INTEGER PRIMARY KEY, cart_id INTEGER NOT NULL, total INTEGER NOT NULL);
+CREATE TABLE order_item (id INTEGER PRIMARY KEY, order_id INTEGER NOT NULL, product_id INTEGER NOT NULL,
+                         quantity INTEGER NOT NULL);
+"""
+
+# SQLite as Django configures it out of the box: rollback journal, deferred transactions, 5s timeout
+STOCK_PROFILE = {'timeout': 5, 'transaction_mode': 'DEFERRED', 'init_command': ''}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks concurrent cart and checkout writes on a scratch SQLite file, "
+        "comparing the stock SQLite profile with the one configured in DATABASES['default']. "
+        "It times raw sqlite3 statements against minimal synthetic tables, not the store's views, "
+        "models or indexes, so it only isolates the connection settings; use stress_checkout to "
+        "drive the real cart and checkout code paths."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help="Concurrent workers.")
+        parser.add_argument('--seconds', type=float, default=5.0, help="Duration of each run.")
+        parser.add_argument('--products', type=int, default=20, help="Products the workers compete for.")
+
+    def handle(self, *args, **options):
+        tuned = settings.DATABASES['default'].get('OPTIONS', {})
+        profiles = [('stock', STOCK_PROFILE), ('tuned', tuned)]
+        for name, profile in profiles:
+            with tempfile.TemporaryDirectory() as tmp:
+                result = self.run_profile(Path(tmp) / 'bench.sqlite3', profile, options)
+            self.report(name, result, options['seconds'])
+
+    def connect(self, path, profile):
+        conn = sqlite3.connect(path, timeout=profile.get('timeout', 5), isolation_level=None, check_same_thread=False)
+        for command in profile.get('init_command', '').split(';'):
+            if command.strip():
+                conn.execute(command)
+        return conn
+
+    def run_profile(self, path, profile, options):
+        setup = self.connect(path, profile)
+        setup.executescript(SCHEMA)
+        setup.executemany(
+            'INSERT INTO product (id, stock) VALUES (?, ?)',
+            [(pk, 10 ** 9) for pk in range(1, options['products'] + 1)],
+        )
+        setup.close()
+
+        begin = f"BEGIN {profile.get('transaction_mode') or 'DEFERRED'}"
+        deadline = time.monotonic() + options['seconds']
+        results = []
+        lock = threading.Lock()
+
+        def worker(worker_id):
+            conn = self.connect(path, profile)
+            stats = {'cart': [], 'checkout': [], 'errors': 0}
+            cart_id = worker_id * 10 ** 6
+            step = 0
+            while time.monotonic() < deadline:
+                step += 1
+                product_id = (worker_id + step) % options['products'] + 1
+                # Every fourth operation is a checkout, the rest are add-to-cart clicks
+                operation = 'checkout' if step % 4 == 0 else 'cart'
+                started = time.perf_counter()
+                try:
+                    if operation == 'cart':
+                        self.add_to_cart(conn, begin, cart_id, product_id)
+                    else:
+                        self.checkout(conn, begin, cart_id)
+                        cart_id += 1
+                    stats[operation].append(time.perf_counter() - started)
+                except sqlite3.OperationalError:
+                    # "database is locked": the request would have failed with a 500
+                    stats['errors'] += 1
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+            conn.close()
+            with lock:
+                results.append(stats)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def add_to_cart(self, conn, begin, cart_id, product_id):
+        # Read-then-write, like add_cart: look up the item, then insert or bump it
+        conn.execute(begin)
+        row = conn.execute(
+            'SELECT id, quantity FROM cart_item WHERE cart_id = ? AND product_id = ?', (cart_id, product_id)
+        ).fetchone()
+        if row:
+            conn.execute('UPDATE cart_item SET quantity = ? WHERE id = ?', (row[1] + 1, row[0]))
+        else:
+            conn.execute(
+                'INSERT INTO cart_item (cart_id, product_id, quantity) VALUES (?, ?, 1)', (cart_id, product_id)
+            )
+        conn.execute('COMMIT')
+
+    def checkout(self, conn, begin, cart_id):
+        # Order, order items, compare-and-swap stock deductions and cart clean-up in one transaction
+        conn.execute(begin)
+        items = conn.execute('SELECT product_id, quantity FROM cart_item WHERE cart_id = ?', (cart_id,)).fetchall()
+        order_id = conn.execute('INSERT INTO "order" (cart_id, total) VALUES (?, ?)', (cart_id, len(items))).lastrowid
+        for product_id, quantity in items:
+            conn.execute(
+                'INSERT INTO order_item (order_id, product_id, quantity) VALUES (?, ?, ?)',
+                (order_id, product_id, quantity),
+            )
+            stock, version = conn.execute('SELECT stock, version FROM product WHERE id = ?', (product_id,)).fetchone()
+            conn.execute(
+                'UPDATE product SET stock = ?, version = version + 1 WHERE id = ? AND version = ?',
+                (stock - quantity, product_id, version),
+            )
+        conn.execute('DELETE FROM cart_item WHERE cart_id = ?', (cart_id,))
+        conn.execute('COMMIT')
+
+    def report(self, name, results, seconds):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Profile: {name}"))
+        errors = sum(stats['errors'] for stats in results)
+        for operation in ('cart', 'checkout'):
+            timings = [t for stats in results for t in stats[operation]]
+            if not timings:
+                self.stdout.write(f"  {operation:<9} no successful operations")
+                continue
+            p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+            self.stdout.write(
+                f"  {operation:<9} {len(timings) / seconds:8.1f} ops/s   "
+                f"p50 {statistics.median(timings) * 1000:7.2f} ms   p95 {p95 * 1000:7.2f} ms"
+            )
+        self.stdout.write(f"  locked    {errors} operation(s) failed with 'database is locked'")
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.snapshot import build_catalog_snapshot, sitemap_url
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes the sitemaps and the static JSON catalog under MEDIA_ROOT/CATALOG_SNAPSHOT_DIR, so crawlers "
+        "and partners read static files instead of product pages. Only shards whose products changed since "
+        "the last run are rewritten; use --full to rewrite everything. Run periodically (e.g. hourly)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Rewrite every shard.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rewritten, total = build_catalog_snapshot(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rewrote {rewritten} of {total} shard(s) in {time.monotonic() - started:.1f} s. "
+            f"Sitemap index: {sitemap_url()}"
+        ))
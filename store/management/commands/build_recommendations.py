@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds the \"frequently bought together\" recommendations from order history. "
+        "Each run only reads orders placed since the previous one; use --full to start over."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Rebuild from every order instead of only new ones.")
+        parser.add_argument('--top-k', type=int, help="Recommendations kept per product (default: RECOMMENDATIONS_TOP_K).")
+
+    def handle(self, *args, **options):
+        if not recommendations.build_dependencies_installed():
+            raise CommandError("build_recommendations needs NumPy and SciPy: pip install 'studywithsai[recommendations]'")
+        started = time.monotonic()
+        lines, products = recommendations.build_recommendations(full=options['full'], top_k=options['top_k'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Read {lines} order line(s) and updated recommendations for {products} product(s) "
+            f"in {time.monotonic() - started:.1f} s."
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from store.reporting import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recomputes the daily sales rollups behind the admin sales dashboard from the order tables."
+
+    def handle(self, *args, **options):
+        days, rows = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {days} day(s) and {rows} product/day row(s)."))
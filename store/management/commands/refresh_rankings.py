@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from store.rankings import rebuild_sales_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the bestseller and trending counters from the order tables, correcting any drift "
+        "in the running counters. Run periodically (e.g. nightly)."
+    )
+
+    def handle(self, *args, **options):
+        products = rebuild_sales_stats()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt sales counters for {products} product(s)."))
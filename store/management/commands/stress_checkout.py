@@ -0,0 +1,320 @@
+import http.cookiejar
+import queue
+import random
+import statistics
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from contextlib import contextmanager
+from decimal import Decimal
+from pathlib import Path
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.db.models import Sum
+from django.test import Client
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.urls import reverse
+
+from store.inventory import contention_stats
+from store.models import Cart, CartItem, Order, OrderItem, Product
+
+# What every shopper types into the checkout form
+ORDER_FORM = {
+    'first_name': 'Stress', 'last_name': 'Test', 'phone': '5550100', 'email': 'stress@example.com',
+    'address_line_1': '1 Load Street', 'city': 'Benchville', 'country': 'Testland',
+}
+
+# Checkout outcomes, in report order
+OUTCOMES = ('ordered', 'sold_out', 'conflict', 'lock_timeout', 'throttled', 'empty_cart', 'error')
+
+
+def _classify(status, location='', body=b''):
+    """Names the outcome of a checkout POST from its response."""
+    if status == 302:
+        if '/order_complete/' in location:
+            return 'ordered'
+        if location.endswith(reverse('cart')):
+            return 'sold_out' # InsufficientStock
+        if location.endswith(reverse('checkout')):
+            return 'conflict' # StockConflict: lost every compare-and-swap retry
+        return 'empty_cart'
+    if status == 429:
+        return 'throttled'
+    if status >= 500 and b'database is locked' in body:
+        return 'lock_timeout'
+    return 'error'
+
+
+class ClientShopper:
+    """A shopper driven through Django's test client, in this process."""
+
+    def __init__(self, user, index, password):
+        # A distinct address per shopper, as on the real site, so per-IP rate limits apply per shopper
+        self.client = Client(REMOTE_ADDR=f'10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}')
+        self.user = user
+
+    def login(self):
+        self.client.force_login(self.user)
+
+    def add_to_cart(self, slug):
+        return self.client.get(reverse('add_cart', args=[slug])).status_code
+
+    def checkout(self):
+        try:
+            response = self.client.post(reverse('checkout'), ORDER_FORM)
+        except OperationalError as e:
+            return 'lock_timeout' if 'locked' in str(e) else 'error'
+        except Exception:
+            return 'error'
+        return _classify(response.status_code, response.get('Location', ''))
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpShopper:
+    """A shopper driven over HTTP against a running server, with its own cookies."""
+
+    def __init__(self, user, index, password, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.username, self.password = user.username, password
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect)
+
+    def _request(self, path, data=None):
+        """Returns (status, Location, body) without following redirects."""
+        url = self.base_url + path
+        headers = {'Referer': url}
+        csrf = next((cookie.value for cookie in self.cookies if cookie.name == settings.CSRF_COOKIE_NAME), None)
+        if data is not None:
+            data = urllib.parse.urlencode({**data, 'csrfmiddlewaretoken': csrf or ''}).encode()
+            headers['X-CSRFToken'] = csrf or ''
+        try:
+            with self.opener.open(urllib.request.Request(url, data=data, headers=headers), timeout=60) as response:
+                return response.status, response.headers.get('Location', ''), response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers.get('Location', ''), e.read()
+
+    def login(self):
+        self._request(reverse('login')) # Sets the CSRF cookie
+        status, _, _ = self._request(reverse('login'), {'username': self.username, 'password': self.password})
+        if status != 302:
+            raise CommandError(f"Could not log in as {self.username} (HTTP {status}).")
+
+    def add_to_cart(self, slug):
+        return self._request(reverse('add_cart', args=[slug]))[0]
+
+    def checkout(self):
+        try:
+            return _classify(*self._request(reverse('checkout'), ORDER_FORM))
+        except OSError:
+            return 'error'
+
+
+class Command(BaseCommand):
+    help = (
+        "Races many shoppers through checkout on a few low-stock products and reports throughput, "
+        "failure rates and whether stock stayed consistent (no negative stock, lost updates or oversell). "
+        "By default it runs in-process against a throwaway copy of the schema; --url targets a running "
+        "server instead (seeding its database, so use a scratch one)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shoppers', type=int, default=50, help="Seeded users, one checkout each.")
+        parser.add_argument('--workers', type=int, default=8, help="Concurrent threads.")
+        parser.add_argument('--hot-products', type=int, default=3, help="Products the shoppers compete for.")
+        parser.add_argument('--stock', type=int, default=10, help="Starting stock of each hot product.")
+        parser.add_argument('--items', type=int, default=1, help="Hot products in each cart.")
+        parser.add_argument('--quantity', type=int, default=1, help="Units of each product in a cart.")
+        parser.add_argument(
+            '--direct-carts', action='store_true',
+            help="Fill carts straight in the database, skipping add-to-cart and its stock holds, "
+                 "so every shopper reaches checkout and races on the stock update.",
+        )
+        parser.add_argument('--seed', type=int, default=0, help="Seed for which products go in which cart.")
+        parser.add_argument('--url', help="Base URL of a running server sharing DATABASES['default'].")
+
+    def handle(self, *args, **options):
+        options['items'] = max(1, min(options['items'], options['hot_products']))
+        if options['url']:
+            self.stdout.write(self.style.WARNING(
+                f"Seeding {settings.DATABASES['default']['NAME']}; {options['url']} must be serving it."
+            ))
+            self.run(options)
+        else:
+            with self.scratch_database():
+                self.run(options)
+
+    @contextmanager
+    def scratch_database(self):
+        """A freshly migrated test database, dropped afterwards."""
+        database = settings.DATABASES['default']
+        tmp = None
+        if database['ENGINE'].endswith('sqlite3') and not database['TEST'].get('NAME'):
+            # A file rather than the default in-memory test database: SQLite's file locking is under test
+            tmp = tempfile.TemporaryDirectory()
+            database['TEST']['NAME'] = str(Path(tmp.name) / 'stress.sqlite3')
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        try:
+            yield
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+            if tmp is not None:
+                database['TEST']['NAME'] = None
+                tmp.cleanup()
+
+    def seed(self, options):
+        """Creates the hot products and the shoppers; returns (products, users, password, cart plan)."""
+        rng = random.Random(options['seed'])
+        run = f'stress-{uuid4().hex[:8]}'
+        products = Product.objects.bulk_create([
+            Product(name=f'{run} hot {n}', slug=f'{run}-hot-{n}', price=Decimal('9.99'), stock=options['stock'])
+            for n in range(options['hot_products'])
+        ])
+        password = uuid4().hex
+        hashed = make_password(password) # Hashing is deliberately slow: once for everyone
+        users = User.objects.bulk_create([
+            User(username=f'{run}-{n}', password=hashed) for n in range(options['shoppers'])
+        ])
+        plan = [rng.sample(products, options['items']) for _ in users]
+
+        if options['direct_carts']:
+            carts = Cart.objects.bulk_create([Cart(user=user) for user in users])
+            CartItem.objects.bulk_create([
+                CartItem(cart=cart, product=product, quantity=options['quantity'])
+                for cart, picked in zip(carts, plan) for product in picked
+            ])
+        return products, users, password, plan
+
+    def in_parallel(self, jobs, workers):
+        """Runs the callables on `workers` threads that start together; returns (results, seconds)."""
+        pending = queue.SimpleQueue()
+        for job in jobs:
+            pending.put(job)
+        results = []
+        lock = threading.Lock()
+        start = threading.Barrier(workers + 1)
+
+        def worker():
+            start.wait()
+            try:
+                while True:
+                    try:
+                        job = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    started = time.perf_counter()
+                    outcome = job()
+                    with lock:
+                        results.append((outcome, time.perf_counter() - started))
+            finally:
+                # Each thread has its own connections; none may outlive the scratch database
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        began = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        return results, time.perf_counter() - began
+
+    def run(self, options):
+        products, users, password, plan = self.seed(options)
+        if options['url']:
+            shoppers = [HttpShopper(user, n, password, options['url']) for n, user in enumerate(users)]
+        else:
+            shoppers = [ClientShopper(user, n, password) for n, user in enumerate(users)]
+        workers = max(1, options['workers'])
+
+        # 1. Every shopper logs in and (unless the carts were seeded) fills their cart
+        def shop(shopper, picked):
+            def job():
+                shopper.login()
+                if not options['direct_carts']:
+                    for product in picked:
+                        for _ in range(options['quantity']):
+                            shopper.add_to_cart(product.slug)
+            return job
+
+        _, cart_seconds = self.in_parallel([shop(s, picked) for s, picked in zip(shoppers, plan)], workers)
+
+        # 2. Shoppers turned away at add-to-cart (stock all held by other carts) don't check out
+        filled = set(CartItem.objects.filter(cart__user__in=users).values_list('cart__user', flat=True))
+        shoppers = [shopper for shopper, user in zip(shoppers, users) if user.pk in filled]
+
+        # 3. All workers start checking out at the same moment
+        before = contention_stats()
+        results, checkout_seconds = self.in_parallel([shopper.checkout for shopper in shoppers], workers)
+        after = contention_stats()
+
+        self.report(options, results, len(users) - len(shoppers), cart_seconds, checkout_seconds, before, after)
+        failures = self.check_invariants(options, products, users, results)
+        if failures:
+            raise CommandError(f"{failures} stock invariant(s) violated.")
+
+    def report(self, options, results, turned_away, cart_seconds, checkout_seconds, before, after):
+        counts = {outcome: 0 for outcome in OUTCOMES}
+        for outcome, _ in results:
+            counts[outcome] += 1
+        attempts = len(results) or 1
+        timings = sorted(seconds for _, seconds in results) or [0]
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{options['shoppers']} shoppers on {options['workers']} workers, {options['hot_products']} hot "
+            f"product(s) x {options['stock']} units, {options['items']} x {options['quantity']} unit(s) per cart"
+            + (" (carts seeded directly)" if options['direct_carts'] else "")
+        ))
+        self.stdout.write(f"  cart phase      {cart_seconds:7.2f} s, {turned_away} shopper(s) found nothing left to add")
+        self.stdout.write(
+            f"  checkout phase  {checkout_seconds:7.2f} s, {counts['ordered'] / checkout_seconds:7.1f} orders/s, "
+            f"p50 {statistics.median(timings) * 1000:7.1f} ms, "
+            f"p95 {(statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]) * 1000:7.1f} ms"
+        )
+        for outcome in OUTCOMES:
+            self.stdout.write(f"    {outcome:<13} {counts[outcome]:6} ({counts[outcome] * 100 / attempts:5.1f}%)")
+        if not options['url']:
+            cas_attempts = after['attempts'] - before['attempts']
+            cas_conflicts = after['conflicts'] - before['conflicts']
+            self.stdout.write(
+                f"  stock compare-and-swap: {cas_attempts} attempts, {cas_conflicts} lost races "
+                f"({cas_conflicts * 100 / (cas_attempts or 1):.1f}%)"
+            )
+
+    def check_invariants(self, options, products, users, results):
+        """Prints each stock invariant as OK/FAIL; returns the number that failed."""
+        final = dict(Product.objects.filter(pk__in=[p.pk for p in products]).values_list('pk', 'stock'))
+        sold = dict(
+            OrderItem.objects.filter(product__in=products, order__user__in=users)
+            .values('product').annotate(units=Sum('quantity')).order_by().values_list('product', 'units')
+        )
+        orders = Order.objects.filter(user__in=users).count()
+        empty_orders = Order.objects.filter(user__in=users, orderitem__isnull=True).count()
+        reported = sum(1 for outcome, _ in results if outcome == 'ordered')
+        initial = options['stock']
+
+        checks = [
+            ("no negative stock", all(stock >= 0 for stock in final.values())),
+            ("stock deducted == units ordered (no lost updates)",
+             all(initial - final[p.pk] == sold.get(p.pk, 0) for p in products)),
+            ("units ordered <= starting stock (no oversell)", all(units <= initial for units in sold.values())),
+            (f"orders in database ({orders}) == orders placed ({reported})", orders == reported),
+            (f"every order has line items ({empty_orders} empty)", not empty_orders),
+        ]
+        self.stdout.write("  invariants")
+        for name, ok in checks:
+            self.stdout.write(f"    {self.style.SUCCESS('OK  ') if ok else self.style.ERROR('FAIL')} {name}")
+        return sum(1 for _, ok in checks if not ok)
@@ -0,0 +1,46 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Copies the primary SQLite database into the read replica with SQLite's online backup API. "
+        "Run once, or with --interval to keep the replica continuously refreshed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0, help="Seconds between syncs (0 = sync once).")
+        parser.add_argument(
+            '--pages', type=int, default=1024,
+            help="Pages copied per step; smaller steps hold the primary's read lock for less time.",
+        )
+
+    def handle(self, *args, **options):
+        alias = settings.REPLICA_DATABASE_ALIAS
+        if alias not in settings.DATABASES:
+            raise CommandError("No read replica configured (set DATABASE_REPLICA_NAME).")
+        primary = settings.DATABASES['default']['NAME']
+        replica = settings.DATABASES[alias]['NAME']
+
+        while True:
+            started = time.monotonic()
+            self.sync(primary, replica, options['pages'])
+            self.stdout.write(
+                self.style.SUCCESS(f"Replica {replica} synced in {(time.monotonic() - started) * 1000:.0f} ms.")
+            )
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def sync(self, primary, replica, pages):
+        source = sqlite3.connect(primary)
+        target = sqlite3.connect(replica)
+        try:
+            # Readers of the replica keep seeing the previous copy until the backup commits
+            source.backup(target, pages=pages)
+        finally:
+            target.close()
+            source.close()
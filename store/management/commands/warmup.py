@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from store.warmup import warm_up
+
+# What a worker imports before it can serve its first request
+COLD_START = (
+    "from django.core.wsgi import get_wsgi_application; get_wsgi_application(); "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the worker warm-up (URL resolver, template compilation, catalog caches) and reports "
+        "how long each step takes. --profile-imports also reports what dominates import time at cold start."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile-imports', action='store_true',
+            help="Profile a fresh interpreter's imports with `python -X importtime`.",
+        )
+        parser.add_argument('--top', type=int, default=15, help="Rows shown in the import profile.")
+
+    def handle(self, *args, **options):
+        for name, result, seconds in warm_up():
+            status = 'failed' if result is None else result
+            self.stdout.write(f"{name:<16} {seconds * 1000:8.1f} ms  ({status})")
+        if options['profile_imports']:
+            self.profile_imports(options['top'])
+
+    def profile_imports(self, top):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE, 'WARMUP_ON_STARTUP': '0'}
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', COLD_START],
+            env=env, capture_output=True, text=True,
+        )
+        if process.returncode:
+            raise CommandError(f"Cold-start import failed:\n{process.stderr[-2000:]}")
+
+        # Lines look like "import time:       412 |       1532 |     django.db.models"
+        modules = []
+        for line in process.stderr.splitlines():
+            if not line.startswith('import time:') or 'imported package' in line:
+                continue
+            own, cumulative, name = line[len('import time:'):].split('|')
+            modules.append((name.strip(), int(own), int(cumulative)))
+        if not modules:
+            return
+
+        by_package = defaultdict(int)
+        for name, own, _ in modules:
+            by_package[name.split('.')[0]] += own
+        total = sum(by_package.values())
+
+        self.stdout.write(f"\nCold-start imports: {len(modules)} modules, {total / 1000:.0f} ms\n")
+        self.stdout.write("By top-level package:")
+        for package, own in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f"  {own / 1000:8.1f} ms  {own / total:6.1%}  {package}")
+        self.stdout.write("Slowest modules (own time):")
+        for name, own, cumulative in sorted(modules, key=lambda module: -module[1])[:top]:
+            self.stdout.write(f"  {own / 1000:8.1f} ms  (incl. children {cumulative / 1000:7.1f} ms)  {name}")
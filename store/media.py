@@ -0,0 +1,151 @@
+# store/media.py
+
+import mimetypes
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+# Only a single "bytes=start-end" range is honoured; anything else gets the full file.
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class _RangeFile:
+    """
+    A read-only view over part of an open file.
+
+    It keeps the real file descriptor (``fileno``) and leaves the OS file offset at
+    the start of the range, so gunicorn's ``wsgi.file_wrapper`` can ``os.sendfile``
+    exactly ``Content-Length`` bytes. Any other server just gets bounded reads.
+    """
+
+    def __init__(self, fileobj, start, length):
+        self._file = fileobj
+        self._file.seek(start)
+        self._remaining = length
+        self.name = fileobj.name
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+def _parse_range(header, size):
+    """Returns (start, end) for a satisfiable single range, None to ignore it, or False if unsatisfiable."""
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes of the file
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if start >= size:
+        return False
+    end = int(last) if last else size - 1
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serves files from MEDIA_ROOT with caching validators, 304s and byte ranges.
+
+    When MEDIA_SERVE_BACKEND is 'x-accel-redirect' (nginx) or 'x-sendfile'
+    (Apache/lighttpd), the front-end server sends the bytes. Python only checks
+    the path and sets the headers.
+    """
+    # 1. Resolve the path safely inside MEDIA_ROOT (raises SuspiciousFileOperation on "../")
+    fullpath = Path(safe_join(settings.MEDIA_ROOT, path))
+    try:
+        stat = fullpath.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404('Media file not found.')
+    if not fullpath.is_file():
+        raise Http404('Media file not found.')
+
+    # 2. Validators and conditional GET (If-None-Match / If-Modified-Since -> 304)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return _with_cache_headers(not_modified, etag, last_modified)
+
+    content_type, encoding = mimetypes.guess_type(str(fullpath))
+    if encoding == 'gzip':
+        # Pre-compressed files (e.g. the catalog snapshot's .xml.gz) are sent as the archives they are
+        content_type = 'application/gzip'
+    content_type = content_type or 'application/octet-stream'
+
+    # 3. Hand the transfer off to the front-end server when configured
+    backend = settings.MEDIA_SERVE_BACKEND
+    if backend in ('x-accel-redirect', 'x-sendfile'):
+        response = HttpResponse(content_type=content_type)
+        if backend == 'x-accel-redirect':
+            # nginx maps this prefix to MEDIA_ROOT in an `internal` location and handles Range itself
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path)
+        else:
+            response['X-Sendfile'] = str(fullpath)
+        return _with_cache_headers(response, etag, last_modified)
+
+    # 4. Otherwise stream it ourselves, honouring a single byte range
+    size = stat.st_size
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if range_header and _if_range_matches(request, etag, last_modified):
+        byte_range = _parse_range(range_header, size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return _with_cache_headers(response, etag, last_modified)
+
+    fileobj = fullpath.open('rb')
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(_RangeFile(fileobj, start, length), status=206, content_type=content_type)
+        response['Content-Length'] = length
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    else:
+        response = FileResponse(fileobj, content_type=content_type)
+    # Large blocks keep the pure-Python fallback cheap; gunicorn uses os.sendfile regardless
+    response.block_size = settings.MEDIA_STREAM_BLOCK_SIZE
+    return _with_cache_headers(response, etag, last_modified)
+
+
+def _if_range_matches(request, etag, last_modified):
+    """A Range is only honoured if If-Range (when sent) still matches the current file."""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    return if_range.strip() in (etag, http_date(last_modified))
+
+
+def _with_cache_headers(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    patch_cache_control(response, public=True, max_age=settings.MEDIA_CACHE_MAX_AGE)
+    return response
@@ -0,0 +1,63 @@
+# store/middleware.py
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from .ratelimit import check_request
+from .routers import end_request, has_written, start_request
+
+REPLICA_PIN_COOKIE = 'pin_primary'
+
+
+class ReplicaPinningMiddleware:
+    """
+    Gives clients read-your-writes consistency while a read replica is in use.
+
+    A request that writes sets a short-lived cookie. While that cookie is present,
+    the client's later requests (e.g. the redirect to order_complete) read from
+    the primary, not from a replica that may not have caught up yet.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        tokens = start_request(pinned=REPLICA_PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+            if has_written():
+                response.set_cookie(
+                    REPLICA_PIN_COOKIE, '1',
+                    max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+                )
+            return response
+        finally:
+            end_request(tokens)
+
+
+class RateLimitMiddleware:
+    """
+    Throttles the expensive endpoints listed in RATE_LIMITS (by URL name).
+
+    Runs after URL resolution, so rules follow the URL names rather than paths.
+    Over the limit, the view is never called: the client gets a 429 with Retry-After.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        if match is None or not match.url_name:
+            return None
+        retry_after = check_request(request, match.url_name)
+        if not retry_after:
+            return None
+        response = HttpResponse(
+            "Too many requests. Please wait a moment and try again.", status=429, content_type='text/plain',
+        )
+        response['Retry-After'] = str(retry_after)
+        return response
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_tree(apps, schema_editor):
+    """Existing categories become top-level nodes; their old `ccategory` product becomes a member."""
+    Category = apps.get_model("store", "Category")
+    Membership = apps.get_model("store", "Product").categories.through
+    for category in Category.objects.all():
+        category.path = category.slug + "/"
+        category.depth = 0
+        category.product_count = 1
+        category.save(update_fields=["path", "depth", "product_count"])
+        Membership.objects.get_or_create(product_id=category.ccategory_id, category_id=category.pk)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0003_alter_category_ccategory_alter_product_image"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="category",
+            options={
+                "ordering": ("path",),
+                "verbose_name": "category",
+                "verbose_name_plural": "categories",
+            },
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="parent",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="children",
+                to="store.category",
+            ),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="path",
+            field=models.CharField(default="", editable=False, max_length=1000),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="depth",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="product_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="categories",
+            field=models.ManyToManyField(
+                blank=True, related_name="products", to="store.category"
+            ),
+        ),
+        migrations.RunPython(build_tree, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="category",
+            name="ccategory",
+        ),
+        migrations.AlterField(
+            model_name="category",
+            name="path",
+            field=models.CharField(editable=False, max_length=1000, unique=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0004_category_tree"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["is_available", "price"], name="product_avail_price_idx"),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:42
+
+import secrets
+
+from django.conf import settings
+from django.db import migrations, models
+
+# A frozen copy of store.order_numbers as of this migration: 20 characters of Crockford's
+# base32, a 50-bit millisecond timestamp followed by 50 bits of randomness
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+TIME_CHARS = 10
+RANDOM_CHARS = 10
+RANDOM_BITS = RANDOM_CHARS * 5
+
+
+def _encode(value, length):
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def backfill_order_numbers(apps, schema_editor):
+    """Re-number existing orders from their creation time, keeping the old number for old links."""
+    Order = apps.get_model("store", "Order")
+    last_ms, last_random = -1, 0
+    for order in Order.objects.filter(legacy_order_number__isnull=True).order_by(
+        "created_at", "pk"
+    ):
+        ms = int(order.created_at.timestamp() * 1000)
+        if ms <= last_ms:
+            # Same millisecond as the previous order: count up so numbers stay strictly increasing
+            ms, random = last_ms, last_random + 1
+            if random >= 1 << RANDOM_BITS:
+                ms, random = ms + 1, secrets.randbits(RANDOM_BITS - 1)
+        else:
+            random = secrets.randbits(RANDOM_BITS - 1)
+        last_ms, last_random = ms, random
+        order.legacy_order_number = order.order_number
+        order.order_number = _encode(ms, TIME_CHARS) + _encode(random, RANDOM_CHARS)
+        order.save(update_fields=["order_number", "legacy_order_number"])
+
+
+def restore_order_numbers(apps, schema_editor):
+    Order = apps.get_model("store", "Order")
+    for order in Order.objects.filter(legacy_order_number__isnull=False):
+        order.order_number = order.legacy_order_number
+        order.legacy_order_number = None
+        order.save(update_fields=["order_number", "legacy_order_number"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0007_product_version"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="legacy_order_number",
+            field=models.CharField(
+                blank=True, editable=False, max_length=20, null=True, unique=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["user", "order_number"], name="order_user_number_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_order_numbers, restore_order_numbers),
+    ]
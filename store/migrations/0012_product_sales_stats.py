@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0011_product_recommendations"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductSalesStats",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="sales_stats",
+                        serialize=False,
+                        to="store.product",
+                    ),
+                ),
+                ("units_sold", models.PositiveIntegerField(default=0)),
+                ("trend_score", models.FloatField(default=0)),
+            ],
+            options={
+                "verbose_name_plural": "product sales stats",
+                "indexes": [
+                    models.Index(fields=["-units_sold"], name="sales_stats_units_idx"),
+                    models.Index(fields=["-trend_score"], name="sales_stats_trend_idx"),
+                ],
+            },
+        ),
+    ]
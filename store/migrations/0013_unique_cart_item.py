@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:05
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_cart_items(apps, schema_editor):
+    """Folds duplicate (cart, product) lines into the oldest one, summing their quantities."""
+    CartItem = apps.get_model("store", "CartItem")
+    duplicates = (
+        CartItem.objects.values("cart_id", "product_id")
+        .annotate(lines=Count("pk"), keep=Min("pk"), quantity=Sum("quantity"))
+        .filter(lines__gt=1)
+        .order_by()
+    )
+    for group in duplicates:
+        lines = CartItem.objects.filter(
+            cart_id=group["cart_id"], product_id=group["product_id"]
+        )
+        lines.exclude(pk=group["keep"]).delete()
+        lines.filter(pk=group["keep"]).update(
+            quantity=group["quantity"], is_active=True
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0012_product_sales_stats"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="cartitem",
+            constraint=models.UniqueConstraint(
+                fields=("cart", "product"), name="unique_cart_product_item"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0015_order_archive"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="stock_sequence",
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+    ]
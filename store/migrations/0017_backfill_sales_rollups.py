@@ -0,0 +1,81 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:10
+
+from django.db import migrations
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+
+# A frozen copy of store.reporting.rebuild_rollups as of this migration
+CANCELLED_STATUSES = ("Cancelled", "Refunded")
+
+
+def backfill_sales_rollups(apps, schema_editor):
+    """Fills the daily rollups from every live and archived order placed so far."""
+    DailySales = apps.get_model("store", "DailySales")
+    DailyProductSales = apps.get_model("store", "DailyProductSales")
+    cancelled = Q(order__status__in=CANCELLED_STATUSES)
+    line_total = ExpressionWrapper(
+        F("quantity") * F("product_price"),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+    daily = {}
+    product_sales = {}
+    for order_name, item_name in (
+        ("Order", "OrderItem"),
+        ("ArchivedOrder", "ArchivedOrderItem"),
+    ):
+        Order = apps.get_model("store", order_name)
+        Item = apps.get_model("store", item_name)
+        product_rows = (
+            Item.objects.filter(order__is_ordered=True)
+            .annotate(date=TruncDate("order__created_at"))
+            .values("date", "product_id")
+            .annotate(
+                units=Sum("quantity"),
+                revenue=Sum(line_total),
+                cancelled_units=Sum("quantity", filter=cancelled),
+                cancelled_revenue=Sum(line_total, filter=cancelled),
+            )
+            .order_by()
+        )
+        order_counts = (
+            Order.objects.filter(is_ordered=True)
+            .annotate(date=TruncDate("created_at"))
+            .values("date")
+            .annotate(
+                orders=Count("pk"),
+                cancelled_orders=Count("pk", filter=Q(status__in=CANCELLED_STATUSES)),
+            )
+            .order_by()
+        )
+        for row in product_rows:
+            key = (row["date"], row["product_id"])
+            sales = product_sales.setdefault(
+                key, DailyProductSales(date=row["date"], product_id=row["product_id"])
+            )
+            day = daily.setdefault(row["date"], DailySales(date=row["date"]))
+            for field in ("units", "revenue", "cancelled_units", "cancelled_revenue"):
+                value = row[field] or 0
+                setattr(sales, field, getattr(sales, field) + value)
+                setattr(day, field, getattr(day, field) + value)
+        for row in order_counts:
+            day = daily.setdefault(row["date"], DailySales(date=row["date"]))
+            day.orders += row["orders"]
+            day.cancelled_orders += row["cancelled_orders"]
+
+    # Replaces whatever checkouts recorded since 0009: the orders themselves are the source of truth
+    DailyProductSales.objects.all().delete()
+    DailySales.objects.all().delete()
+    DailyProductSales.objects.bulk_create(product_sales.values(), batch_size=1000)
+    DailySales.objects.bulk_create(daily.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0016_product_stock_sequence"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_sales_rollups, migrations.RunPython.noop),
+    ]
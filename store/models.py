@@ -1,21 +1,31 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from django.contrib.auth.models import User
 
 class Product(models.Model):
     # Basic Product Information
-    name = models.CharField(max_length=200)
+    name = models.CharField(max_length=200, db_index=True)
     description = models.TextField(blank=True, null=True)
     price = models.DecimalField(max_digits=6, decimal_places=2)
     
     # Inventory/Status
     is_available = models.BooleanField(default=True)
     stock = models.IntegerField(default=1)
+    # Bumped on every stock change; compare-and-swap token for store.inventory.adjust_stock
+    version = models.PositiveIntegerField(default=0, editable=False)
+    # Last warehouse feed record applied to this product (store.stock_ingest); older records are skipped
+    stock_sequence = models.BigIntegerField(default=0, editable=False)
     
     # Identification for URLs/Links (e.g., mysite.com/product/the-book-slug)
     slug = models.SlugField(max_length=200, unique=True)
     
     # Visuals (Requires Pillow package for image handling)
     image = models.ImageField(upload_to='product_images', blank=True, null=True)
+
+    # A product can be listed under any number of categories
+    categories = models.ManyToManyField('Category', related_name='products', blank=True)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -26,6 +36,10 @@ class Product(models.Model):
         ordering = ('name',)
         # Name displayed in the Django Admin
         verbose_name_plural = 'Products'
+        indexes = [
+            # Catalog listings and price-band facets always filter on availability first
+            models.Index(fields=['is_available', 'price'], name='product_avail_price_idx'),
+        ]
 
     def __str__(self):
         # This is what will be displayed when referencing a Product object (e.g., in the admin)
@@ -35,7 +49,9 @@ class Product(models.Model):
 
 class Cart(models.Model):
     # A unique identifier for the cart, used for session-based carts (anonymous users)
-    cart_id = models.CharField(max_length=250, blank=True)
+    cart_id = models.CharField(max_length=250, blank=True, db_index=True)
+    # The logged-in owner: one cart per user, kept across devices and sessions (anonymous carts have none)
+    user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True, related_name='cart')
     # The date/time the cart was created
     date_added = models.DateField(auto_now_add=True)
 
@@ -45,7 +61,7 @@ class Cart(models.Model):
         verbose_name_plural = 'Carts'
 
     def __str__(self):
-        return self.cart_id
+        return self.cart_id or f"{self.user}'s cart"
 
 class CartItem(models.Model):
     # Links the item to a specific Cart
@@ -60,6 +76,10 @@ class CartItem(models.Model):
     class Meta:
         db_table = 'CartItem'
         verbose_name_plural = 'Cart Items'
+        constraints = [
+            # One line per product per cart: lets the batch cart update upsert on (cart, product)
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_cart_product_item'),
+        ]
 
     def sub_total(self):
         """Calculates the subtotal for this specific cart item (price * quantity)."""
@@ -69,12 +89,36 @@ class CartItem(models.Model):
         return self.product.name
 
 
+class StockReservation(models.Model):
+    # Units of a product held for a cart until `expires_at` (see store.inventory)
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_cart_product_reservation'),
+        ]
+        indexes = [
+            # "Active holds on this product" is an index range scan, never a ledger scan
+            models.Index(fields=['product', 'expires_at'], name='reservation_product_exp_idx'),
+            # Lets the sweeper find expired holds in batches
+            models.Index(fields=['expires_at'], name='reservation_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product} for cart {self.cart_id}"
+
+
 class Order(models.Model):
     # Links the order to a registered user
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     
-    # Unique order identifier
+    # Unique order identifier: time-ordered, see store.order_numbers
     order_number = models.CharField(max_length=20, unique=True)
+    # The random number an order had before order numbers became time-ordered (old links still work)
+    legacy_order_number = models.CharField(max_length=20, unique=True, null=True, blank=True, editable=False)
     
     # Billing and Shipping details
     first_name = models.CharField(max_length=50)
@@ -107,6 +151,12 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # "My Orders" pages: a user's orders, newest first, keyset-paginated by order number
+            models.Index(fields=['user', 'order_number'], name='order_user_number_idx'),
+            # Admin changelist status filter
+            models.Index(fields=['status', 'order_number'], name='order_status_number_idx'),
+        ]
 
     def __str__(self):
         return self.order_number
@@ -135,7 +185,8 @@ class OrderItem(models.Model):
 
 class Category(models.Model):
 
-    ccategory = models.ForeignKey(Product, on_delete=models.CASCADE) 
+    # Parent node in the category tree (top-level categories have no parent)
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children')
     
     # Basic Product Information (Existing fields)
     name = models.CharField(max_length=200)    
@@ -144,13 +195,180 @@ class Category(models.Model):
     
     # Optional: A short description for the category page
     description = models.TextField(blank=True)
+
+    # Materialized path of slugs (e.g. "books/fiction/"), so a whole subtree is one
+    # indexed range: Category.objects.filter(path__prefix=node.path) (see store.lookups)
+    path = models.CharField(max_length=1000, unique=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    # Denormalized number of products directly in this category (kept up to date by store.signals)
+    product_count = models.PositiveIntegerField(default=0, editable=False)
     
     class Meta:
         verbose_name = 'category'
         verbose_name_plural = 'categories'
-        # Categories will be ordered alphabetically by name
-        ordering = ('name',)
+        # Tree order: every parent is immediately followed by its subtree
+        ordering = ('path',)
 
     def __str__(self):
         return self.name
-    
+
+    def clean(self):
+        # A category can't be moved underneath itself
+        if self.path and self.parent_id and self.parent.path.startswith(self.path):
+            raise ValidationError({'parent': 'A category cannot be placed inside its own subtree.'})
+
+    def save(self, *args, **kwargs):
+        old_path = self.path
+        self.path = (self.parent.path if self.parent_id else '') + self.slug + '/'
+        self.depth = self.parent.depth + 1 if self.parent_id else 0
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if old_path and old_path != self.path:
+                # Re-root the whole subtree in one UPDATE instead of saving every descendant
+                Category.objects.filter(path__prefix=old_path).exclude(pk=self.pk).update(
+                    path=Concat(Value(self.path), Substr('path', len(old_path) + 1)),
+                    depth=F('depth') + (self.depth - old_path.count('/') + 1),
+                )
+
+    def get_descendants(self, include_self=True):
+        """All categories in this subtree: a range scan of the unique index on path."""
+        descendants = Category.objects.filter(path__prefix=self.path)
+        if not include_self:
+            descendants = descendants.exclude(pk=self.pk)
+        return descendants
+
+    def subtree_products(self):
+        """Products listed anywhere in this subtree (without duplicates from multiple memberships)."""
+        memberships = Product.categories.through.objects.filter(category__path__prefix=self.path)
+        return Product.objects.filter(pk__in=memberships.values('product_id'))
+
+
+# --- REPORTING ROLLUPS (maintained by store.reporting) ---
+
+class DailySales(models.Model):
+    # Totals for orders placed on `date`; cancellations count against the day the order was placed
+    date = models.DateField(unique=True)
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cancelled_orders = models.PositiveIntegerField(default=0)
+    cancelled_units = models.PositiveIntegerField(default=0)
+    cancelled_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name_plural = 'daily sales'
+
+    def __str__(self):
+        return str(self.date)
+
+
+class DailyProductSales(models.Model):
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cancelled_units = models.PositiveIntegerField(default=0)
+    cancelled_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name_plural = 'daily product sales'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='unique_daily_product_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.product} on {self.date}"
+
+
+# --- RECOMMENDATIONS (built offline by `manage.py build_recommendations`) ---
+
+class ProductRecommendation(models.Model):
+    # "Customers who bought `product` also bought `recommended`", best first
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recommendations')
+    recommended = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recommended_by')
+    # Number of orders containing both products
+    score = models.PositiveIntegerField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ['product', 'rank']
+        constraints = [
+            # Also the index behind the per-product lookup
+            models.UniqueConstraint(fields=['product', 'rank'], name='unique_recommendation_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.product} -> {self.recommended}"
+
+
+class ProductSalesStats(models.Model):
+    # Running sales counters behind the home page rankings (maintained by store.rankings)
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='sales_stats')
+    units_sold = models.PositiveIntegerField(default=0)
+    # log of the forward-decayed sales weight: higher means more recent sales
+    trend_score = models.FloatField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'product sales stats'
+        indexes = [
+            models.Index(fields=['-units_sold'], name='sales_stats_units_idx'),
+            models.Index(fields=['-trend_score'], name='sales_stats_trend_idx'),
+        ]
+
+    def __str__(self):
+        return str(self.product)
+
+
+# --- ORDER ARCHIVE (filled by `manage.py archive_orders`) ---
+# Old orders in a final status move here with their original ids, so Order and OrderItem
+# (and their indexes) only hold the working set. Columns mirror Order and OrderItem.
+
+class ArchivedOrder(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='archived_orders')
+    order_number = models.CharField(max_length=20, unique=True)
+    legacy_order_number = models.CharField(max_length=20, unique=True, null=True, blank=True)
+    first_name = models.CharField(max_length=50)
+    last_name = models.CharField(max_length=50)
+    phone = models.CharField(max_length=15)
+    email = models.EmailField(max_length=50)
+    address_line_1 = models.CharField(max_length=50)
+    city = models.CharField(max_length=50)
+    country = models.CharField(max_length=50)
+    order_total = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=10)
+    is_ordered = models.BooleanField(default=False)
+    # Copied from the original order, not reset on archival
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-order_number']
+        indexes = [
+            # "My Orders" pages fall back to the archive with the same keyset query
+            models.Index(fields=['user', 'order_number'], name='archived_order_user_number_idx'),
+        ]
+
+    def __str__(self):
+        return self.order_number
+
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='archived_order_items')
+    product_price = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.IntegerField()
+    is_ordered = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+
+    def sub_total(self):
+        return self.product_price * self.quantity
+
+    def __str__(self):
+        return self.product.name
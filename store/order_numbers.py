@@ -0,0 +1,72 @@
+# store/order_numbers.py
+
+import secrets
+import threading
+import time
+from datetime import datetime, timezone
+
+# Crockford's base32: no I, L, O or U, so numbers are easy to read out over the phone
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+TIME_CHARS = 10    # 50 bits, milliseconds since the Unix epoch
+RANDOM_CHARS = 10  # 50 bits of randomness
+RANDOM_BITS = RANDOM_CHARS * 5
+
+
+def _encode(value, length):
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+class OrderNumberGenerator:
+    """
+    Generates 20-character, ULID-style order numbers: a millisecond timestamp followed by randomness.
+
+    Numbers sort by creation time, so new orders append to the end of the unique index
+    and an order number works as a keyset-pagination cursor. Within one millisecond, the
+    random part is incremented rather than redrawn, so numbers from one generator are
+    strictly increasing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def next(self, ms=None):
+        with self._lock:
+            if ms is None:
+                ms = time.time_ns() // 1_000_000
+            if ms <= self._last_ms:
+                # Same (or an earlier, clock-skewed) millisecond: stay on the last timestamp and count up
+                ms = self._last_ms
+                random = self._last_random + 1
+                if random >= 1 << RANDOM_BITS:
+                    ms, random = ms + 1, secrets.randbits(RANDOM_BITS - 1)
+            else:
+                # Top bit left clear so a burst within one millisecond can't overflow
+                random = secrets.randbits(RANDOM_BITS - 1)
+            self._last_ms, self._last_random = ms, random
+        return _encode(ms, TIME_CHARS) + _encode(random, RANDOM_CHARS)
+
+
+_generator = OrderNumberGenerator()
+
+
+def new_order_number():
+    return _generator.next()
+
+
+def order_number_timestamp(order_number):
+    """The creation time encoded in an order number (UTC)."""
+    ms = 0
+    for char in order_number[:TIME_CHARS]:
+        ms = ms * 32 + ALPHABET.index(char)
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+
+
+def order_number_floor(when):
+    """The lowest possible order number for time `when`: every order placed earlier sorts below it."""
+    return _encode(int(when.timestamp() * 1000), TIME_CHARS) + ALPHABET[0] * RANDOM_CHARS
@@ -0,0 +1,142 @@
+# store/rankings.py
+
+import itertools
+import math
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+
+from .models import ArchivedOrderItem, OrderItem, ProductSalesStats
+from .reporting import CANCELLED_STATUSES
+
+BESTSELLERS_CACHE_KEY = 'catalog:bestsellers'
+TRENDING_CACHE_KEY = 'catalog:trending'
+
+# Forward decay: a sale at time t weighs 2^((t - EPOCH) / half-life) and old weights never change,
+# so an update is one addition instead of decaying every row. Scores are kept as natural logs
+# (they would overflow a float within a few years) and compare correctly at any moment.
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _log_weight(quantity, when):
+    """Natural log of a sale's forward-decayed weight."""
+    half_lives = (when - EPOCH).total_seconds() / settings.TRENDING_HALF_LIFE
+    return math.log(quantity) + half_lives * math.log(2)
+
+
+def _log_add(log_weight):
+    # log(e^a + e^b) = max(a, b) + log(1 + e^-|a - b|), computed in the UPDATE itself
+    score, weight = F('trend_score'), Value(log_weight)
+    return Greatest(score, weight) + Ln(1 + Exp(-Abs(score - weight)))
+
+
+def _log_subtract(log_weight):
+    # log(e^a - e^b) = a + log(1 - e^(b - a)). When the cancelled sale made up nearly all of the score,
+    # what's left is below float precision: the floor sinks it by ~40 half-lives until refresh_rankings
+    score, weight = F('trend_score'), Value(log_weight)
+    return score + Ln(Greatest(1 - Exp(weight - score), Value(1e-12)))
+
+
+def _sales_by_product(order_items):
+    quantities = defaultdict(int)
+    for item in order_items:
+        quantities[item.product_id] += item.quantity
+    return quantities
+
+
+def record_sales(order, order_items):
+    """Adds a newly placed order to the running counters (call inside the checkout transaction)."""
+    for product_id, quantity in _sales_by_product(order_items).items():
+        log_weight = _log_weight(quantity, order.created_at)
+        updated = ProductSalesStats.objects.filter(product_id=product_id).update(
+            units_sold=F('units_sold') + quantity, trend_score=_log_add(log_weight),
+        )
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                ProductSalesStats.objects.create(product_id=product_id, units_sold=quantity, trend_score=log_weight)
+        except IntegrityError:
+            # Another checkout created the row first: add to it instead
+            ProductSalesStats.objects.filter(product_id=product_id).update(
+                units_sold=F('units_sold') + quantity, trend_score=_log_add(log_weight),
+            )
+
+
+def record_cancellation(order, order_items):
+    """Takes a cancelled order's units and trending weight back out of the counters."""
+    for product_id, quantity in _sales_by_product(order_items).items():
+        ProductSalesStats.objects.filter(product_id=product_id).update(
+            units_sold=Greatest(F('units_sold') - quantity, Value(0)),
+            trend_score=_log_subtract(_log_weight(quantity, order.created_at)),
+        )
+
+
+def _top_products(cache_key, order_by):
+    products = cache.get(cache_key)
+    if products is None:
+        products = [
+            stats.product
+            for stats in ProductSalesStats.objects.filter(units_sold__gt=0, product__is_available=True)
+            .select_related('product')
+            .order_by(order_by)[:settings.RANKINGS_SIZE]
+        ]
+        cache.set(cache_key, products, settings.RANKINGS_CACHE_TIMEOUT)
+    return products
+
+
+def get_bestsellers():
+    """The cached all-time bestseller list (most units sold first)."""
+    return _top_products(BESTSELLERS_CACHE_KEY, '-units_sold')
+
+
+def get_trending():
+    """The cached "trending now" list (most recent-weighted sales first)."""
+    return _top_products(TRENDING_CACHE_KEY, '-trend_score')
+
+
+def invalidate_rankings():
+    cache.delete_many([BESTSELLERS_CACHE_KEY, TRENDING_CACHE_KEY])
+
+
+def rebuild_sales_stats():
+    """
+    Recomputes every counter from the order tables (to bootstrap, or to correct drift).
+
+    Returns the number of products with sales.
+    """
+    totals = {}
+    # Archived orders still count towards the all-time bestsellers
+    lines = itertools.chain.from_iterable(
+        model.objects.filter(order__is_ordered=True)
+        .exclude(order__status__in=CANCELLED_STATUSES)
+        .order_by()
+        .values_list('product_id', 'quantity', 'order__created_at')
+        .iterator(chunk_size=10000)
+        for model in (OrderItem, ArchivedOrderItem)
+    )
+    for product_id, quantity, created_at in lines:
+        if quantity <= 0:
+            continue
+        log_weight = _log_weight(quantity, created_at)
+        units, score = totals.get(product_id, (0, None))
+        if score is not None:
+            high, low = max(score, log_weight), min(score, log_weight)
+            log_weight = high + math.log1p(math.exp(low - high))
+        totals[product_id] = (units + quantity, log_weight)
+
+    stats = [
+        ProductSalesStats(product_id=product_id, units_sold=units, trend_score=score)
+        for product_id, (units, score) in totals.items()
+    ]
+    # Checkouts that land during the scan are overwritten; the next run picks them up
+    with transaction.atomic():
+        ProductSalesStats.objects.all().delete()
+        ProductSalesStats.objects.bulk_create(stats, batch_size=1000)
+    invalidate_rankings()
+    return len(stats)
@@ -0,0 +1,80 @@
+# store/ratelimit.py
+
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _incr(key, delta, timeout):
+    """Atomically adds `delta` to the counter at `key`, creating it (at 0) if it doesn't exist."""
+    cache.add(key, 0, timeout=timeout)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Expired between the add and the incr
+        cache.add(key, 0, timeout=timeout)
+        return cache.incr(key, delta)
+
+
+def _retry_after(count, previous, elapsed, capacity, period):
+    """Seconds until one more request fits, given `count` requests so far in this window."""
+    if count < capacity and previous:
+        # This window has room: wait for enough of the previous window to slide out
+        wait = period * (previous + count + 1 - capacity) / previous - elapsed
+    else:
+        # This window alone is full: it becomes the previous window and slides out in turn
+        wait = period - elapsed + period * (count + 1 - capacity) / count
+    return max(1, math.ceil(wait))
+
+
+def consume(bucket, capacity, period):
+    """
+    Counts one request against `bucket`, which allows `capacity` requests per sliding
+    `period` seconds.
+
+    Returns 0 if the request is allowed, otherwise the seconds until one will be. Each
+    fixed window of `period` seconds has a counter in the cache, and the limit applies
+    to the current count plus the previous window's, weighted by how much of it still
+    overlaps the sliding period. The counters only change through cache.add and
+    cache.incr/decr, which are atomic on every backend, so concurrent requests can't
+    overshoot the limit. The limit is shared by every process only when CACHES is a
+    shared backend (Redis, Memcached, ...); with the default LocMemCache each worker
+    enforces it separately.
+    """
+    now = time.time()
+    window, elapsed = divmod(now, period)
+    key = f'ratelimit:{bucket}:{int(window)}'
+    # The counter is read as the "previous window" throughout the next one
+    timeout = math.ceil(2 * period) + 1
+    count = _incr(key, 1, timeout)
+    previous = cache.get(f'ratelimit:{bucket}:{int(window) - 1}', 0)
+    if previous * (1 - elapsed / period) + count <= capacity:
+        return 0
+    # Refused requests don't count towards the limit
+    count = _incr(key, -1, timeout)
+    return _retry_after(count, previous, elapsed, capacity, period)
+
+
+def client_ip(request):
+    """The client's address, taken from X-Forwarded-For only as far as our own proxies vouch for it."""
+    proxies = settings.RATE_LIMIT_TRUSTED_PROXIES
+    forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+    if proxies and len(forwarded) >= proxies:
+        # Each trusted proxy appends the address it received the request from
+        return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def check_request(request, url_name):
+    """Applies the RATE_LIMITS rule for `url_name`; returns 0 or the Retry-After seconds."""
+    rule = settings.RATE_LIMITS.get(url_name)
+    if not rule or request.method not in rule.get('methods', ('GET', 'POST')):
+        return 0
+    buckets = [(f'{url_name}:ip:{client_ip(request)}', rule['per_ip'])]
+    session_key = request.session.session_key if hasattr(request, 'session') else None
+    if session_key:
+        # per_ip is the looser limit, so shoppers sharing an address (office, mobile carrier) get headroom
+        buckets.append((f'{url_name}:session:{session_key}', rule['per_session']))
+    return max(consume(bucket, *limit) for bucket, limit in buckets)
@@ -0,0 +1,205 @@
+# store/recommendations.py
+
+import importlib.util
+import itertools
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, Product, ProductRecommendation
+from .reporting import CANCELLED_STATUSES
+
+# Order lines fetched per database round trip while streaming
+STREAM_CHUNK_SIZE = 50_000
+# Orders younger than this wait for the next run, so a checkout still committing can't land below the watermark
+SETTLE_SECONDS = 60
+# Products whose recommendations are rewritten per transaction
+WRITE_BATCH_PRODUCTS = 1000
+
+
+# --- Storefront lookups ---
+
+def recommended_products(product, limit=None):
+    """Products frequently bought with `product`, best first (one query on the (product, rank) index)."""
+    limit = limit or settings.RECOMMENDATIONS_TOP_K
+    return (
+        Product.objects.filter(recommended_by__product=product, is_available=True)
+        .order_by('recommended_by__rank')[:limit]
+    )
+
+
+def recommended_for_cart(product_ids, limit=None):
+    """Products frequently bought with anything in the cart, scored over all cart items."""
+    limit = limit or settings.RECOMMENDATIONS_TOP_K
+    if not product_ids:
+        return Product.objects.none()
+    return (
+        Product.objects.filter(recommended_by__product__in=product_ids, is_available=True)
+        .exclude(pk__in=product_ids)
+        .annotate(together=Sum('recommended_by__score'))
+        .order_by('-together', 'name')[:limit]
+    )
+
+
+# --- Offline build ---
+# NumPy and SciPy are imported inside the build functions: only the offline job needs them, and
+# importing them with the views would add ~150 ms to every worker's cold start.
+
+def build_dependencies_installed():
+    return all(importlib.util.find_spec(name) for name in ('numpy', 'scipy'))
+
+
+def _stream_order_lines(after_order_id, up_to_order_id):
+    """(order_id, product_id) of every line in the order-id window, as two int64 arrays."""
+    import numpy as np
+
+    # Archived orders keep their ids, so a full build reads them in the same window
+    lines = itertools.chain.from_iterable(
+        model.objects.filter(
+            order__is_ordered=True, order_id__gt=after_order_id, order_id__lte=up_to_order_id,
+        )
+        .exclude(order__status__in=CANCELLED_STATUSES)
+        .order_by()
+        .values_list('order_id', 'product_id')
+        .iterator(chunk_size=STREAM_CHUNK_SIZE)
+        for model in (OrderItem, ArchivedOrderItem)
+    )
+    # Straight from the cursor into one flat array: no per-row Python objects are kept
+    pairs = np.fromiter(itertools.chain.from_iterable(lines), dtype=np.int64).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def cooccurrence(order_ids, product_ids, size):
+    """
+    The size×size matrix of how many orders contain both products (indexed by product pk).
+
+    Builds the sparse order×product basket matrix X and returns XᵀX with the diagonal
+    cleared, so the whole count is a single sparse matrix product.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    orders, rows = np.unique(order_ids, return_inverse=True)
+    baskets = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, product_ids)), shape=(len(orders), size),
+    )
+    # Two lines for the same product in one order still count as one basket
+    baskets.data[:] = 1
+    counts = (baskets.T @ baskets).tocsr()
+    counts.setdiag(0)
+    counts.eliminate_zeros()
+    return counts
+
+
+def top_neighbours(counts, rows, exists, k):
+    """Yields (product_id, neighbour ids, scores) for each row, best first, skipping deleted products."""
+    import numpy as np
+
+    indptr, indices, data = counts.indptr, counts.indices, counts.data
+    for row in rows:
+        cols = indices[indptr[row]:indptr[row + 1]]
+        scores = data[indptr[row]:indptr[row + 1]]
+        keep = exists[cols]
+        cols, scores = cols[keep], scores[keep]
+        if len(cols) > k:
+            best = np.argpartition(-scores, k - 1)[:k]
+            cols, scores = cols[best], scores[best]
+        # Highest score first; ties broken by product id so ranks are stable between runs
+        order = np.lexsort((cols, -scores))
+        yield int(row), cols[order], scores[order]
+
+
+def load_state(path):
+    """The saved co-occurrence matrix and order watermark, or (None, 0) before the first build."""
+    import numpy as np
+    from scipy import sparse
+
+    try:
+        with np.load(path) as state:
+            counts = sparse.csr_matrix(
+                (state['data'], state['indices'], state['indptr']), shape=tuple(state['shape']),
+            )
+            return counts, int(state['watermark'])
+    except FileNotFoundError:
+        return None, 0
+
+
+def save_state(path, counts, watermark):
+    import numpy as np
+
+    # Write then rename, so an interrupted run leaves the previous state intact
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as f:
+        np.savez_compressed(
+            f, data=counts.data, indices=counts.indices, indptr=counts.indptr,
+            shape=np.array(counts.shape), watermark=np.array(watermark),
+        )
+    os.replace(temporary, path)
+
+
+def _write_recommendations(counts, rows, exists, k, replace_all):
+    # Replace a batch of products per transaction, so the storefront never sees a product half-written
+    neighbours = top_neighbours(counts, rows, exists, k)
+    while batch := list(itertools.islice(neighbours, WRITE_BATCH_PRODUCTS)):
+        recommendations = [
+            ProductRecommendation(product_id=row, recommended_id=int(col), score=int(score), rank=rank)
+            for row, cols, scores in batch if exists[row]
+            for rank, (col, score) in enumerate(zip(cols, scores), start=1)
+        ]
+        with transaction.atomic():
+            ProductRecommendation.objects.filter(product_id__in=[row for row, _, _ in batch]).delete()
+            ProductRecommendation.objects.bulk_create(recommendations, batch_size=1000)
+    if replace_all:
+        # Products with no co-purchases left (e.g. every shared order was cancelled)
+        written = set(rows.tolist())
+        stored = ProductRecommendation.objects.order_by().values_list('product_id', flat=True).distinct()
+        stale = [product_id for product_id in stored if product_id not in written]
+        for start in range(0, len(stale), WRITE_BATCH_PRODUCTS):
+            ProductRecommendation.objects.filter(product_id__in=stale[start:start + WRITE_BATCH_PRODUCTS]).delete()
+
+
+def build_recommendations(full=False, top_k=None, state_file=None):
+    """
+    Updates the "frequently bought together" table from orders placed since the last run.
+
+    Only new orders are read: their co-occurrence counts are added to the saved matrix
+    and only the products they touch are rewritten. `full=True` starts from scratch,
+    which also drops orders cancelled since they were counted.
+    Returns (order lines read, products updated).
+    """
+    import numpy as np
+
+    k = top_k or settings.RECOMMENDATIONS_TOP_K
+    state_file = state_file or settings.RECOMMENDATIONS_STATE_FILE
+    counts, watermark = (None, 0) if full else load_state(state_file)
+
+    settled = Order.objects.filter(
+        is_ordered=True, created_at__lt=timezone.now() - timedelta(seconds=SETTLE_SECONDS),
+    ).aggregate(last=Max('pk'))['last']
+    # The live table may be empty right after an archive run
+    archived = ArchivedOrder.objects.aggregate(last=Max('pk'))['last']
+    up_to = max(settled or 0, archived or 0, watermark)
+
+    product_pks = np.fromiter(Product.objects.values_list('pk', flat=True).iterator(), dtype=np.int64)
+    size = int(product_pks.max(initial=0)) + 1
+    if counts is not None:
+        # Products created since the last run grow the matrix; ids of deleted ones are kept
+        size = max(size, counts.shape[0])
+        counts.resize((size, size))
+    exists = np.zeros(size, dtype=bool)
+    exists[product_pks] = True
+
+    order_ids, product_ids = _stream_order_lines(watermark, up_to)
+    delta = cooccurrence(order_ids, product_ids, size)
+    counts = delta if counts is None else counts + delta
+
+    # A full build rewrites every product; an incremental one only those with new co-purchases
+    changed = counts if full else delta
+    rows = np.flatnonzero(np.diff(changed.indptr))
+    _write_recommendations(counts, rows, exists, k, replace_all=full)
+    save_state(state_file, counts, up_to)
+    return len(order_ids), len(rows)
@@ -0,0 +1,104 @@
+# store/reporting.py
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, DailyProductSales, DailySales, Order, OrderItem
+
+# Order statuses that take an order out of the revenue figures
+CANCELLED_STATUSES = ('Cancelled', 'Refunded')
+
+
+def _add_to_rollup(model, lookup, **deltas):
+    """Adds `deltas` to the rollup row identified by `lookup`, creating it on first use."""
+    updates = {field: F(field) + value for field, value in deltas.items()}
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Another request created the row first: add to it instead
+        model.objects.filter(**lookup).update(**updates)
+
+
+def _record(order, order_items, cancelled):
+    date = timezone.localdate(order.created_at)
+    prefix = 'cancelled_' if cancelled else ''
+    units = revenue = 0
+    for item in order_items:
+        item_revenue = item.product_price * item.quantity
+        units += item.quantity
+        revenue += item_revenue
+        _add_to_rollup(
+            DailyProductSales, {'date': date, 'product_id': item.product_id},
+            **{f'{prefix}units': item.quantity, f'{prefix}revenue': item_revenue},
+        )
+    _add_to_rollup(
+        DailySales, {'date': date},
+        **{f'{prefix}orders': 1, f'{prefix}units': units, f'{prefix}revenue': revenue},
+    )
+
+
+def record_order_placed(order, order_items):
+    """Adds a newly placed order to the daily rollups (call inside the checkout transaction)."""
+    _record(order, order_items, cancelled=False)
+
+
+def record_order_cancelled(order, order_items):
+    """Moves an order's figures into the cancelled columns of the day it was placed."""
+    _record(order, order_items, cancelled=True)
+
+
+def rebuild_rollups():
+    """Recomputes every rollup row from the live and archived order tables (to bootstrap, or to correct drift)."""
+    cancelled = Q(order__status__in=CANCELLED_STATUSES)
+    line_total = ExpressionWrapper(
+        F('quantity') * F('product_price'), output_field=DecimalField(max_digits=12, decimal_places=2)
+    )
+
+    daily = {}
+    product_sales = {}
+    # A day can have orders in both tables, so the two sets of sums are added together
+    for order_model, item_model in ((Order, OrderItem), (ArchivedOrder, ArchivedOrderItem)):
+        product_rows = (
+            item_model.objects.filter(order__is_ordered=True)
+            .annotate(date=TruncDate('order__created_at'))
+            .values('date', 'product_id')
+            .annotate(
+                units=Sum('quantity'),
+                revenue=Sum(line_total),
+                cancelled_units=Sum('quantity', filter=cancelled),
+                cancelled_revenue=Sum(line_total, filter=cancelled),
+            )
+            .order_by()
+        )
+        order_counts = (
+            order_model.objects.filter(is_ordered=True)
+            .annotate(date=TruncDate('created_at'))
+            .values('date')
+            .annotate(orders=Count('pk'), cancelled_orders=Count('pk', filter=Q(status__in=CANCELLED_STATUSES)))
+            .order_by()
+        )
+
+        for row in product_rows:
+            key = (row['date'], row['product_id'])
+            sales = product_sales.setdefault(key, DailyProductSales(date=row['date'], product_id=row['product_id']))
+            day = daily.setdefault(row['date'], DailySales(date=row['date']))
+            for field in ('units', 'revenue', 'cancelled_units', 'cancelled_revenue'):
+                value = row[field] or 0
+                setattr(sales, field, getattr(sales, field) + value)
+                setattr(day, field, getattr(day, field) + value)
+        for row in order_counts:
+            day = daily.setdefault(row['date'], DailySales(date=row['date']))
+            day.orders += row['orders']
+            day.cancelled_orders += row['cancelled_orders']
+
+    with transaction.atomic():
+        DailyProductSales.objects.all().delete()
+        DailySales.objects.all().delete()
+        DailyProductSales.objects.bulk_create(product_sales.values(), batch_size=1000)
+        DailySales.objects.bulk_create(daily.values(), batch_size=1000)
+    return len(daily), len(product_sales)
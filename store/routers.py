@@ -0,0 +1,74 @@
+# store/routers.py
+
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# True once the current request must read from the primary (it wrote, or its client wrote very recently)
+_pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+# True once the current request has written to the store tables
+_wrote = ContextVar('wrote_to_primary', default=False)
+
+
+def pin_to_primary():
+    _pinned_to_primary.set(True)
+    _wrote.set(True)
+
+
+def is_pinned_to_primary():
+    return _pinned_to_primary.get()
+
+
+def has_written():
+    return _wrote.get()
+
+
+def start_request(pinned=False):
+    """Resets the routing state for a new request; returns tokens for end_request()."""
+    return _pinned_to_primary.set(pinned), _wrote.set(False)
+
+
+def end_request(tokens):
+    pinned_token, wrote_token = tokens
+    _pinned_to_primary.reset(pinned_token)
+    _wrote.reset(wrote_token)
+
+
+class ReplicaRouter:
+    """
+    Sends read-heavy catalog and order-history reads to the read replica.
+
+    Reads of the models in REPLICA_MODELS go to REPLICA_DATABASE_ALIAS, if that
+    database is configured. Every write goes to the primary. After a store write,
+    the rest of the request (and, via ReplicaPinningMiddleware, the next few
+    seconds of the client's requests) reads from the primary, so shoppers see
+    their own cart and orders.
+    """
+
+    def _replica(self):
+        alias = settings.REPLICA_DATABASE_ALIAS
+        return alias if alias in settings.DATABASES else None
+
+    def db_for_read(self, model, **hints):
+        replica = self._replica()
+        if replica and not is_pinned_to_primary() and model._meta.label_lower in settings.REPLICA_MODELS:
+            return replica
+        return None
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label == 'store':
+            pin_to_primary()
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of the primary, so objects from either can be related
+        databases = {'default', settings.REPLICA_DATABASE_ALIAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema along with the data from `manage.py sync_replica`
+        if db == settings.REPLICA_DATABASE_ALIAS:
+            return False
+        return None
@@ -0,0 +1,327 @@
+# store/sessions.py
+#
+# Session engine (SESSION_ENGINE = "store.sessions"). Reads are served from the shared cache,
+# then the database (and, if SESSION_LRU_TTL is set, first from a per-process LRU of decoded
+# sessions). Writes go to the caches at once and reach the database in batches, behind the
+# request. The cache layers are only used with a cache shared by every worker (Redis, see
+# REDIS_URL in the settings); with a process-local one the engine behaves exactly like the
+# database engine.
+
+import atexit
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.sessions.backends.base import CreateError
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import close_old_connections
+
+KEY_PREFIX = 'store.sessions:'
+
+logger = logging.getLogger(__name__)
+
+# Process-wide counters (see session_stats)
+_stats_lock = threading.Lock()
+_stats = {
+    'lru_hits': 0, 'cache_hits': 0, 'db_loads': 0, 'misses': 0, 'no_cookie': 0,
+    'writes': 0, 'flushes': 0, 'flushed': 0, 'flush_errors': 0,
+    'last_flush_lag': 0.0, 'max_flush_lag': 0.0,
+}
+
+
+def _count(**increments):
+    with _stats_lock:
+        for key, value in increments.items():
+            _stats[key] += value
+
+
+def session_stats():
+    """Snapshot of this process's session counters, with the share of loads served without the database."""
+    with _stats_lock:
+        stats = dict(_stats)
+    loads = stats['lru_hits'] + stats['cache_hits'] + stats['db_loads'] + stats['misses']
+    stats['hit_rate'] = (stats['lru_hits'] + stats['cache_hits']) / loads if loads else 0.0
+    stats['pending'] = _writer.pending()
+    return stats
+
+
+class _LRU:
+    """
+    Decoded sessions for this process, each trusted for SESSION_LRU_TTL seconds (off by default).
+
+    Nothing tells other processes about a save or a delete, so for up to SESSION_LRU_TTL
+    seconds a worker may serve a session as it was before another worker changed it (or
+    logged it out). With SESSION_LRU_TTL = 0 every load reads the shared cache.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            data, deadline = entry
+            if deadline < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        # Callers mutate their session dict: never hand out the cached one
+        return copy.deepcopy(data)
+
+    def put(self, key, data):
+        if settings.SESSION_LRU_TTL <= 0:
+            return
+        entry = (copy.deepcopy(data), time.monotonic() + settings.SESSION_LRU_TTL)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.SESSION_LRU_SIZE:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class _WriteBehind:
+    """
+    Sessions saved but not yet in the database, upserted in batches by a background thread.
+
+    Repeated saves of one session before a flush cost a single row write. A flush runs every
+    SESSION_FLUSH_INTERVAL seconds, or as soon as SESSION_FLUSH_BATCH sessions are waiting,
+    and once more when the process exits.
+    """
+
+    def __init__(self):
+        self._pending = {} # session key -> (encoded data, expire date, first queued at)
+        self._lock = threading.Lock()
+        # Held while a batch is written, so a delete can't be undone by a flush already under way
+        self.flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._last_stats_log = time.monotonic()
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def get(self, key):
+        with self._lock:
+            return self._pending.get(key)
+
+    def enqueue(self, key, session_data, expire_date):
+        with self._lock:
+            queued = self._pending.get(key)
+            self._pending[key] = (session_data, expire_date, queued[2] if queued else time.monotonic())
+            waiting = len(self._pending)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='session-write-behind', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+        if waiting >= settings.SESSION_FLUSH_BATCH:
+            self._wake.set()
+
+    def discard(self, key):
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def flush(self):
+        """Writes every pending session to the database; returns how many were written."""
+        from django.contrib.sessions.models import Session
+
+        with self.flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            try:
+                Session.objects.bulk_create(
+                    [
+                        Session(session_key=key, session_data=session_data, expire_date=expire_date)
+                        for key, (session_data, expire_date, _) in batch.items()
+                    ],
+                    update_conflicts=True, unique_fields=['session_key'], update_fields=['session_data', 'expire_date'],
+                    batch_size=500,
+                )
+            except Exception:
+                logger.exception("Could not write %d session(s); retrying on the next flush", len(batch))
+                with self._lock:
+                    # Anything saved meanwhile is newer than the failed batch
+                    self._pending = {**batch, **self._pending}
+                _count(flush_errors=1)
+                return 0
+            finally:
+                close_old_connections()
+        lag = time.monotonic() - min(queued_at for _, _, queued_at in batch.values())
+        with _stats_lock:
+            _stats['flushes'] += 1
+            _stats['flushed'] += len(batch)
+            _stats['last_flush_lag'] = lag
+            _stats['max_flush_lag'] = max(_stats['max_flush_lag'], lag)
+        return len(batch)
+
+    def _run(self):
+        while True:
+            self._wake.wait(settings.SESSION_FLUSH_INTERVAL)
+            self._wake.clear()
+            self.flush()
+            if time.monotonic() - self._last_stats_log >= settings.SESSION_STATS_LOG_INTERVAL:
+                self._last_stats_log = time.monotonic()
+                logger.info("Session stats: %s", session_stats())
+
+
+_lru = _LRU()
+_writer = _WriteBehind()
+
+
+def flush_pending_sessions():
+    """Writes this process's pending sessions to the database now (e.g. before a graceful shutdown)."""
+    return _writer.flush()
+
+
+class SessionStore(DBStore):
+    """
+    Database-backed sessions read through the shared cache (and the optional per-process LRU).
+
+    The session is only loaded when a view first reads it, and a request without a session
+    cookie never queries anything. Saves update both caches immediately; the database copy is
+    written behind, in batches. With a process-local cache (LocMemCache, DummyCache) a worker
+    would keep serving its own copy after another worker changed the session, and save it back
+    over that change, so both cache layers are skipped and every load and save goes to the database.
+    """
+
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        self._cache = caches[settings.SESSION_CACHE_ALIAS]
+        super().__init__(session_key)
+
+    @property
+    def cache_key(self):
+        return self.cache_key_prefix + self._get_or_create_session_key()
+
+    def _shared_cache(self):
+        return not isinstance(self._cache, (LocMemCache, DummyCache))
+
+    def load(self):
+        key = self.session_key
+        if key is None:
+            # No cookie: nothing to look up
+            _count(no_cookie=1)
+            return {}
+        if not self._shared_cache():
+            _count(db_loads=1)
+            return super().load()
+
+        # 1. Decoded copy in this process
+        data = _lru.get(key)
+        if data is not None:
+            _count(lru_hits=1)
+            return data
+
+        # 2. Shared cache
+        try:
+            data = self._cache.get(self.cache_key)
+        except Exception:
+            # Some backends (e.g. memcache) raise on invalid keys: treat as a miss
+            data = None
+        if data is not None:
+            _count(cache_hits=1)
+            _lru.put(key, data)
+            return data
+
+        # 3. Saved here but not flushed yet (and evicted from the cache meanwhile)
+        queued = _writer.get(key)
+        if queued is not None:
+            _count(cache_hits=1)
+            data = self.decode(queued[0])
+            _lru.put(key, data)
+            return data
+
+        # 4. The database
+        session = self._get_session_from_db()
+        if session is None:
+            _count(misses=1)
+            return {}
+        _count(db_loads=1)
+        data = self.decode(session.session_data)
+        self._cache.set(self.cache_key, data, self.get_expiry_age(expiry=session.expire_date))
+        _lru.put(key, data)
+        return data
+
+    def exists(self, session_key):
+        if not session_key:
+            return False
+        if not self._shared_cache():
+            return super().exists(session_key)
+        return (
+            _writer.get(session_key) is not None
+            or (self.cache_key_prefix + session_key) in self._cache
+            or super().exists(session_key)
+        )
+
+    def save(self, must_create=False):
+        if not self._shared_cache():
+            super().save(must_create)
+            _count(writes=1)
+            return
+        if self.session_key is None:
+            return self.create()
+
+        data = self._get_session(no_load=must_create)
+        age = self.get_expiry_age()
+        if must_create:
+            # Claims the new key atomically; create() checked the database for it already
+            if not self._cache.add(self.cache_key, data, age):
+                raise CreateError
+        else:
+            self._cache.set(self.cache_key, data, age)
+        _lru.put(self.session_key, data)
+        # Encoded now, so unserializable session data fails in the request, as with the stock engine
+        _writer.enqueue(self.session_key, self.encode(data), self.get_expiry_date())
+        _count(writes=1)
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        # Logging out must take effect at once: drop every copy, and the row, before returning.
+        # Other workers' LRUs, if enabled, still hold theirs for up to SESSION_LRU_TTL seconds (see _LRU).
+        _lru.discard(session_key)
+        self._cache.delete(self.cache_key_prefix + session_key)
+        with _writer.flush_lock:
+            _writer.discard(session_key)
+            super().delete(session_key)
+
+    def flush(self):
+        """Removes the current session data from every layer and regenerates the key."""
+        self.clear()
+        self.delete(self.session_key)
+        self._session_key = None
+
+    # The app is served over WSGI; ASGI requests run the same code in a thread
+    async def aload(self):
+        return await sync_to_async(self.load)()
+
+    async def aexists(self, session_key):
+        return await sync_to_async(self.exists)(session_key)
+
+    async def asave(self, must_create=False):
+        return await sync_to_async(self.save)(must_create)
+
+    async def adelete(self, session_key=None):
+        return await sync_to_async(self.delete)(session_key)
+
+    async def aflush(self):
+        return await sync_to_async(self.flush)()
@@ -0,0 +1,62 @@
+# store/signals.py
+
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .carts import attach_cart_on_login
+from .catalog import invalidate_category_tree, refresh_product_counts
+from .models import Category, Product
+from .suggest import invalidate_suggestions
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+def category_membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keeps Category.product_count in step with product <-> category membership."""
+    if action == 'pre_clear':
+        # clear() doesn't report which rows it removes, so remember them before they go
+        if reverse:
+            instance._cleared_category_ids = {instance.pk}
+        else:
+            instance._cleared_category_ids = set(instance.categories.values_list('pk', flat=True))
+        return
+
+    if action in ('post_add', 'post_remove'):
+        # Forward (product.categories.add) reports category ids; reverse (category.products.add) product ids
+        affected = {instance.pk} if reverse else pk_set
+    elif action == 'post_clear':
+        affected = getattr(instance, '_cleared_category_ids', set())
+    else:
+        return
+    refresh_product_counts(affected)
+
+
+@receiver(pre_delete, sender=Product)
+def remember_product_categories(sender, instance, **kwargs):
+    # The cascade deletes membership rows without firing m2m_changed
+    instance._deleted_category_ids = set(instance.categories.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    refresh_product_counts(getattr(instance, '_deleted_category_ids', set()))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, **kwargs):
+    # Every process rebuilds its search suggestion index in the background
+    invalidate_suggestions()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, **kwargs):
+    invalidate_category_tree()
+
+
+@receiver(user_logged_in)
+def merge_cart_on_login(sender, request, user, **kwargs):
+    """Merges what the shopper added before logging in into their own cart (creating it only to merge into)."""
+    if request is not None and hasattr(request, 'session'):
+        attach_cart_on_login(request, user, create=False)
@@ -0,0 +1,207 @@
+# store/snapshot.py
+
+import gzip
+import io
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Count, F, Max
+from django.db.models.functions import Floor
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Category, Product
+
+MANIFEST = 'catalog.json'
+SITEMAP_INDEX = 'sitemap.xml'
+PAGES_SITEMAP = 'sitemap-pages.xml.gz'
+
+URLSET_OPEN = '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+URLSET_CLOSE = '</urlset>\n'
+
+
+def snapshot_root():
+    return Path(settings.MEDIA_ROOT) / settings.CATALOG_SNAPSHOT_DIR
+
+
+def snapshot_url(name):
+    """Absolute URL of a snapshot file: they are served from MEDIA_ROOT like product images."""
+    return f"{settings.SITE_URL}{settings.MEDIA_URL}{settings.CATALOG_SNAPSHOT_DIR}/{name}"
+
+
+def sitemap_url(name=SITEMAP_INDEX):
+    """
+    Absolute URL of a sitemap file. Sitemaps may only list URLs under their own directory,
+    so they are served from the site root (views.sitemap) rather than from MEDIA_URL.
+    """
+    if name == SITEMAP_INDEX:
+        return _absolute(reverse('sitemap'))
+    return _absolute(reverse('sitemap_part', args=[name]))
+
+
+def _absolute(path):
+    return settings.SITE_URL + path
+
+
+def _sitemap_name(shard):
+    return f'sitemap-products-{shard:05d}.xml.gz'
+
+
+def _catalog_name(shard):
+    return f'catalog-products-{shard:05d}.json.gz'
+
+
+@contextmanager
+def _atomic_write(path, compress=False):
+    """A text stream to a temporary file that replaces `path` only once it is completely written."""
+    tmp = path.with_name(path.name + '.tmp')
+    try:
+        with open(tmp, 'wb') as raw:
+            # mtime=0: unchanged content compresses to identical bytes
+            stream = gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) if compress else raw
+            with io.TextIOWrapper(stream, encoding='utf-8') as text:
+                yield text
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    os.replace(tmp, path)
+
+
+def shard_signatures(shard_size):
+    """
+    {shard: [products, last updated_at]} for every id range holding products, in one GROUP BY.
+
+    A shard whose signature is unchanged since the last build has the same products in the
+    same state: an edit moves updated_at forward and a deletion lowers the count.
+    """
+    rows = (
+        Product.objects.annotate(shard=Floor(F('pk') / shard_size))
+        .values('shard')
+        .annotate(products=Count('pk'), last=Max('updated_at'))
+        .order_by()
+    )
+    return {int(row['shard']): [row['products'], row['last'].isoformat()] for row in rows}
+
+
+def _product_entry(product):
+    return {
+        'slug': product.slug,
+        'name': product.name,
+        'description': product.description or '',
+        'price': str(product.price),
+        'in_stock': product.stock > 0,
+        'url': _absolute(reverse('product_detail', args=[product.slug])),
+        'image': _absolute(product.image.url) if product.image else None,
+        'categories': [category.slug for category in product.categories.all()],
+        'updated_at': product.updated_at.isoformat(),
+    }
+
+
+def write_shard(root, shard, shard_size):
+    """Streams one id range of listed products into its sitemap and JSON files; returns how many were written."""
+    products = (
+        Product.objects.filter(pk__gte=shard * shard_size, pk__lt=(shard + 1) * shard_size, is_available=True)
+        .order_by('pk')
+        .prefetch_related('categories')
+        .iterator(chunk_size=2000)
+    )
+    listed = 0
+    with _atomic_write(root / _sitemap_name(shard), compress=True) as sitemap, \
+            _atomic_write(root / _catalog_name(shard), compress=True) as catalog:
+        sitemap.write(URLSET_OPEN)
+        catalog.write('[')
+        for product in products:
+            entry = _product_entry(product)
+            sitemap.write(f"<url><loc>{escape(entry['url'])}</loc><lastmod>{product.updated_at.date()}</lastmod></url>\n")
+            catalog.write((',\n' if listed else '\n') + json.dumps(entry))
+            listed += 1
+        sitemap.write(URLSET_CLOSE)
+        catalog.write('\n]\n')
+    return listed
+
+
+def write_pages_sitemap(root):
+    """The home page and every category page (a handful of rows, so rewritten on every build)."""
+    with _atomic_write(root / PAGES_SITEMAP, compress=True) as sitemap:
+        sitemap.write(URLSET_OPEN)
+        sitemap.write(f"<url><loc>{escape(_absolute(reverse('home')))}</loc></url>\n")
+        for slug in Category.objects.values_list('slug', flat=True).iterator():
+            url = _absolute(reverse('products_by_category', args=[slug]))
+            sitemap.write(f"<url><loc>{escape(url)}</loc></url>\n")
+        sitemap.write(URLSET_CLOSE)
+
+
+def load_manifest(root):
+    try:
+        return json.loads((root / MANIFEST).read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def build_catalog_snapshot(full=False):
+    """
+    Brings the static catalog under MEDIA_ROOT/CATALOG_SNAPSHOT_DIR up to date.
+
+    Products are split into shards by id range (CATALOG_SNAPSHOT_SHARD_SIZE ids each). Every
+    shard has a gzipped sitemap and a gzipped JSON list of its listed products. sitemap.xml indexes
+    the sitemaps (all served at the site root), and catalog.json lists the shards for partners. Only shards whose signature
+    changed since the last build are rewritten. Category membership changes don't touch
+    updated_at, so they wait for the next `full` build.
+    Returns (shards rewritten, shards in total).
+    """
+    root = snapshot_root()
+    root.mkdir(parents=True, exist_ok=True)
+    shard_size = settings.CATALOG_SNAPSHOT_SHARD_SIZE
+
+    manifest = load_manifest(root)
+    if manifest.get('shard_size') != shard_size or manifest.get('base_url') != settings.SITE_URL:
+        full = True
+    previous = {} if full else {shard['index']: shard for shard in manifest.get('shards', [])}
+
+    # 1. Rewrite the shards that changed, keep the rest as they are
+    shards = []
+    rewritten = 0
+    for index, signature in sorted(shard_signatures(shard_size).items()):
+        old = previous.get(index)
+        if old and old['signature'] == signature and (root / old['sitemap']).exists() and (root / old['catalog']).exists():
+            shards.append(old)
+            continue
+        listed = write_shard(root, index, shard_size)
+        shards.append({
+            'index': index,
+            'signature': signature,
+            'products': listed,
+            'sitemap': _sitemap_name(index),
+            'catalog': _catalog_name(index),
+        })
+        rewritten += 1
+
+    # 2. Drop the files of shards whose products have all been deleted
+    kept = {shard['index'] for shard in shards}
+    for index in set(previous) - kept:
+        for name in (previous[index]['sitemap'], previous[index]['catalog']):
+            (root / name).unlink(missing_ok=True)
+
+    # 3. The pages sitemap, the sitemap index and the manifest (written last: it describes a complete snapshot)
+    write_pages_sitemap(root)
+    with _atomic_write(root / SITEMAP_INDEX) as index:
+        index.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        index.write('<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        index.write(f"<sitemap><loc>{escape(sitemap_url(PAGES_SITEMAP))}</loc></sitemap>\n")
+        for shard in shards:
+            lastmod = shard['signature'][1][:10]
+            index.write(f"<sitemap><loc>{escape(sitemap_url(shard['sitemap']))}</loc><lastmod>{lastmod}</lastmod></sitemap>\n")
+        index.write('</sitemapindex>\n')
+    with _atomic_write(root / MANIFEST) as out:
+        json.dump({
+            'generated_at': timezone.now().isoformat(),
+            'base_url': settings.SITE_URL,
+            'shard_size': shard_size,
+            'products': sum(shard['products'] for shard in shards),
+            'shards': [{**shard, 'catalog_url': snapshot_url(shard['catalog'])} for shard in shards],
+        }, out, indent=1)
+    return rewritten, len(shards)
@@ -0,0 +1,190 @@
+# store/stock_ingest.py
+
+import itertools
+import json
+from collections import defaultdict
+from functools import reduce
+from operator import itemgetter, or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+from django.db.models.lookups import GreaterThan, LessThanOrEqual
+from django.utils import timezone
+
+from .models import Product
+
+# The warehouse feed is applied on the primary: the sequence check below must see the latest rows
+DATABASE = 'default'
+
+
+class InvalidStockRecord(ValueError):
+    """Raised for a line of a stock feed that isn't a valid adjustment record."""
+
+    def __init__(self, line_number, reason):
+        self.line_number = line_number
+        super().__init__(f"Line {line_number}: {reason}")
+
+
+def parse_records(lines):
+    """
+    Yields (slug, is_absolute, value, sequence) from a feed of JSON lines.
+
+    Each line is {"slug": ..., "delta": <int>, "seq": <int>} for an adjustment, or
+    {"slug": ..., "stock": <int>, "seq": <int>} for an absolute count. Blank lines are skipped.
+    """
+    for number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode()
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            slug, sequence = record['slug'], record['seq']
+            if ('delta' in record) == ('stock' in record):
+                raise ValueError
+            is_absolute = 'stock' in record
+            value = record['stock'] if is_absolute else record['delta']
+            if not isinstance(slug, str) or type(sequence) is not int or type(value) is not int:
+                raise ValueError
+            if sequence < 0 or (is_absolute and value < 0):
+                raise ValueError
+        except (ValueError, TypeError, KeyError):
+            raise InvalidStockRecord(number, 'expected {"slug": ..., "delta" or "stock": <int>, "seq": <int>}')
+        yield slug, is_absolute, value, sequence
+
+
+def coalesce(records, applied_sequence):
+    """
+    Folds one product's (is_absolute, value, sequence) records into a single change.
+
+    Records at or below `applied_sequence` (already applied, or repeated in the feed) are
+    dropped. Returns (absolute, delta, last_sequence, records_used): `absolute` is the last
+    absolute count (None if there was none) and `delta` the sum of the adjustments after it.
+    Returns None when there is nothing new.
+    """
+    absolute, delta, last, used = None, 0, applied_sequence, 0
+    for is_absolute, value, sequence in sorted(records, key=itemgetter(2)):
+        if sequence <= last:
+            continue
+        if is_absolute:
+            absolute, delta = value, 0
+        else:
+            delta += value
+        last, used = sequence, used + 1
+    return (absolute, delta, last, used) if used else None
+
+
+def _update_products(changes):
+    """
+    Applies {product pk: (absolute, delta, last_sequence, applied_sequence)} in one UPDATE.
+
+    A row is only written if its stock_sequence is still the one the change was coalesced
+    against, so two feeds running at once can't apply the same record twice.
+    Returns the number of rows written.
+    """
+    new_stock = Case(
+        *[
+            When(pk=pk, then=Value(max(absolute + delta, 0)) if absolute is not None else Greatest(F('stock') + delta, 0))
+            for pk, (absolute, delta, _, _) in changes.items()
+        ],
+        output_field=IntegerField(),
+    )
+    unchanged = reduce(or_, [Q(pk=pk, stock_sequence=applied) for pk, (_, _, _, applied) in changes.items()])
+    return Product.objects.using(DATABASE).filter(unchanged).update(
+        # Listed first: MySQL evaluates SET left to right, and this must compare against the old stock
+        is_available=Case(
+            When(GreaterThan(new_stock, 0) & LessThanOrEqual(F('stock'), 0), then=Value(True)),
+            When(LessThanOrEqual(new_stock, 0) & GreaterThan(F('stock'), 0), then=Value(False)),
+            default=F('is_available'),
+        ),
+        stock=new_stock,
+        stock_sequence=Case(*[When(pk=pk, then=Value(last)) for pk, (_, _, last, _) in changes.items()]),
+        # Checkouts doing a compare-and-swap on the old version re-read and retry
+        version=F('version') + 1,
+        updated_at=timezone.now(),
+    )
+
+
+def _apply_chunk(pending, stats, max_retries):
+    """Applies {slug: [(is_absolute, value, sequence), ...]} in one transaction, retrying rows another feed changed."""
+    for _ in range(max_retries + 1):
+        with transaction.atomic(using=DATABASE):
+            # 1. Each product's pk and the last sequence number applied to it
+            products = {
+                slug: (pk, applied)
+                for slug, pk, applied in Product.objects.using(DATABASE)
+                .filter(slug__in=pending).values_list('slug', 'pk', 'stock_sequence')
+            }
+            for slug in set(pending) - set(products):
+                stats['unknown'] += len(pending.pop(slug))
+
+            # 2. Coalesce each product's new records into one change
+            changes = {}
+            for slug, records in pending.items():
+                pk, applied = products[slug]
+                change = coalesce(records, applied)
+                if change is None:
+                    stats['skipped'] += len(records)
+                else:
+                    changes[slug] = (pk, applied, change)
+            if not changes:
+                return
+
+            # 3. One UPDATE for the whole chunk
+            written = _update_products({
+                pk: (absolute, delta, last, applied)
+                for pk, applied, (absolute, delta, last, _) in changes.values()
+            })
+            stats['products'] += written
+            if written == len(changes):
+                done = set(changes)
+            else:
+                # Another feed moved some rows on since step 1: only those that now carry our sequence were written
+                sequences = dict(
+                    Product.objects.using(DATABASE).filter(slug__in=changes).values_list('slug', 'stock_sequence')
+                )
+                done = {slug for slug, (_, _, change) in changes.items() if sequences.get(slug) == change[2]}
+        for slug in done:
+            used = changes[slug][2][3]
+            stats['applied'] += used
+            stats['skipped'] += len(pending[slug]) - used
+        # The rest are coalesced again against their new sequence numbers
+        pending = {slug: records for slug, records in pending.items() if slug in changes and slug not in done}
+        if not pending:
+            return
+    stats['failed'] += sum(len(records) for records in pending.values())
+
+
+def ingest_stock_records(records, buffer_size=None, chunk_size=None, max_retries=None):
+    """
+    Applies a stream of warehouse stock records, as yielded by parse_records().
+
+    Records are read `buffer_size` at a time and coalesced per product in memory, so a
+    burst of adjustments to one product costs one row update. The products are then
+    written `chunk_size` per UPDATE ... CASE statement, one transaction each. Sequence
+    numbers make the feed idempotent: a record at or below the product's last applied
+    sequence is skipped, so a feed can safely be replayed after a failure.
+
+    Returns counts: records read, applied, skipped (already applied), unknown (no such
+    product), failed (lost the race to a concurrent feed every time) and products updated.
+    """
+    buffer_size = buffer_size or settings.STOCK_INGEST_BUFFER_SIZE
+    chunk_size = chunk_size or settings.STOCK_INGEST_CHUNK_SIZE
+    if max_retries is None:
+        max_retries = settings.STOCK_CAS_MAX_RETRIES
+
+    stats = dict.fromkeys(('records', 'applied', 'skipped', 'unknown', 'failed', 'products'), 0)
+    records = iter(records)
+    while True:
+        batch = list(itertools.islice(records, buffer_size))
+        if not batch:
+            return stats
+        stats['records'] += len(batch)
+        pending = defaultdict(list)
+        for slug, is_absolute, value, sequence in batch:
+            pending[slug].append((is_absolute, value, sequence))
+        slugs = list(pending)
+        for start in range(0, len(slugs), chunk_size):
+            _apply_chunk({slug: pending[slug] for slug in slugs[start:start + chunk_size]}, stats, max_retries)
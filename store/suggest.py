@@ -0,0 +1,230 @@
+# store/suggest.py
+#
+# Search-as-you-type suggestions from an in-memory index over product names: a sorted
+# vocabulary for prefix lookups and a trigram index over it for typo tolerance. Queries
+# never touch the database; the index is rebuilt in the background when products change.
+
+import bisect
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.urls import reverse
+
+from .models import Product, ProductSalesStats
+
+# Bumped whenever a product changes, so every process knows its index is out of date
+VERSION_CACHE_KEY = 'store:suggest:version'
+
+# Scores for a query word matching a name word exactly or as its beginning; typo matches score below
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.9
+TYPO_WEIGHT = 0.8
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text):
+    """Lower-case words with accents removed: "Crème Brûlée!" -> ['creme', 'brulee']."""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return _WORD_RE.findall(text.lower())
+
+
+def edit_distance(a, b, limit):
+    """
+    Optimal string alignment distance (insertions, deletions, substitutions and swapped
+    neighbours each cost 1), or limit + 1 as soon as it must exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def trigrams(word):
+    """Trigrams of a word padded as in PostgreSQL's pg_trgm ("  w", " wo", "wor", ... , "rd ")."""
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SuggestionIndex:
+    """
+    An immutable index over the names of the listed products.
+
+    `words` is the sorted vocabulary of name words (a flattened prefix trie: every word with
+    a given prefix is one contiguous bisect range), `word_products` the products using each
+    word, and `trigram_words` maps each trigram to the words containing it.
+    """
+
+    __slots__ = ('version', 'built_at', 'names', 'slugs', 'popularity', 'words', 'word_products',
+                 'word_trigram_counts', 'trigram_words')
+
+    def __init__(self, products, popularity, version):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.names = [name for _, name, _ in products]
+        self.slugs = [slug for _, _, slug in products]
+        self.popularity = array('q', (popularity.get(pk, 0) for pk, _, _ in products))
+
+        postings = {}
+        for position, (_, name, _) in enumerate(products):
+            for word in set(normalize(name)):
+                postings.setdefault(word, array('I')).append(position)
+        self.words = sorted(postings)
+        self.word_products = [postings[word] for word in self.words]
+
+        self.word_trigram_counts = array('H')
+        trigram_words = {}
+        for position, word in enumerate(self.words):
+            grams = trigrams(word)
+            self.word_trigram_counts.append(min(len(grams), 65535))
+            for gram in grams:
+                trigram_words.setdefault(gram, array('I')).append(position)
+        self.trigram_words = trigram_words
+
+    def _matching_words(self, word):
+        """{vocabulary position: score} for the words a query word may stand for."""
+        matches = {}
+        # 1. Exact and prefix matches: one contiguous range of the sorted vocabulary
+        start = bisect.bisect_left(self.words, word)
+        end = bisect.bisect_left(self.words, word + '\uffff', start)
+        for position in range(start, min(end, start + settings.SEARCH_SUGGEST_MAX_PREFIX_WORDS)):
+            matches[position] = EXACT_SCORE if self.words[position] == word else PREFIX_SCORE
+
+        # 2. Typos: words sharing enough trigrams (Jaccard similarity), or, among those sharing
+        #    the most, words within a small edit distance (catches swapped letters, which break
+        #    up too many trigrams)
+        if len(word) >= 3:
+            grams = trigrams(word)
+            shared = Counter()
+            for gram in grams:
+                postings = self.trigram_words.get(gram)
+                if postings is not None:
+                    shared.update(postings)
+            typos = 1 if len(word) <= 5 else 2
+            for rank, (position, count) in enumerate(shared.most_common()):
+                similarity = count / (len(grams) + self.word_trigram_counts[position] - count)
+                if similarity < settings.SEARCH_SUGGEST_MIN_SIMILARITY:
+                    if count < 2 or rank >= settings.SEARCH_SUGGEST_EDIT_CANDIDATES:
+                        continue
+                    distance = edit_distance(word, self.words[position], typos)
+                    if distance > typos:
+                        continue
+                    similarity = 1 - distance / len(word)
+                score = similarity * TYPO_WEIGHT
+                if score > matches.get(position, 0):
+                    matches[position] = score
+        return matches
+
+    def search(self, query, limit):
+        """Up to `limit` product positions for `query`, best first."""
+        query_words = normalize(query)[:settings.SEARCH_SUGGEST_MAX_WORDS]
+        if not query_words or sum(map(len, query_words)) < settings.SEARCH_SUGGEST_MIN_CHARS:
+            return []
+
+        # Each product scores the best match it has for every query word
+        matched = Counter()
+        scores = Counter()
+        for word in query_words:
+            best = {}
+            for position, score in self._matching_words(word).items():
+                for product in self.word_products[position]:
+                    if score > best.get(product, 0):
+                        best[product] = score
+            matched.update(best.keys())
+            scores.update(best)
+
+        # Products matching most of the words first, then by score, then by units sold
+        needed = (len(query_words) + 1) // 2
+        candidates = [product for product, count in matched.items() if count >= needed]
+        candidates.sort(key=lambda product: (-matched[product], -scores[product], -self.popularity[product]))
+        return candidates[:limit]
+
+
+def build_index(version=None):
+    """Reads the listed products (two queries) and builds a SuggestionIndex."""
+    if version is None:
+        version = cache.get(VERSION_CACHE_KEY, 0)
+    products = list(Product.objects.filter(is_available=True).order_by('pk').values_list('pk', 'name', 'slug'))
+    popularity = dict(ProductSalesStats.objects.values_list('product_id', 'units_sold'))
+    return SuggestionIndex(products, popularity, version)
+
+
+_state = {'index': None, 'rebuilding': False}
+_state_lock = threading.Lock()
+
+
+def _rebuild(version):
+    try:
+        index = build_index(version)
+        with _state_lock:
+            _state['index'] = index
+    finally:
+        with _state_lock:
+            _state['rebuilding'] = False
+        # This thread's connection would otherwise stay open until the process exits
+        connections.close_all()
+
+
+def get_index():
+    """
+    This process's index, built on first use.
+
+    When products changed (or the index is older than SEARCH_SUGGEST_MAX_AGE, which covers bulk
+    updates that send no signals), a rebuild starts in a background thread and the current
+    index keeps answering until the new one is swapped in.
+    """
+    with _state_lock:
+        index = _state['index']
+    if index is None:
+        index = build_index()
+        with _state_lock:
+            _state['index'] = index
+        return index
+
+    version = cache.get(VERSION_CACHE_KEY, 0)
+    if version != index.version or time.monotonic() - index.built_at > settings.SEARCH_SUGGEST_MAX_AGE:
+        with _state_lock:
+            start = not _state['rebuilding']
+            _state['rebuilding'] = True
+        if start:
+            threading.Thread(target=_rebuild, args=(version,), name='suggest-rebuild', daemon=True).start()
+    return index
+
+
+def invalidate_suggestions():
+    """Marks every process's index out of date (called from the Product signals)."""
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, 1, None)
+
+
+def suggest(query, limit=None):
+    """[{'name', 'slug', 'url'}, ...] for a partly typed query."""
+    index = get_index()
+    limit = limit or settings.SEARCH_SUGGEST_LIMIT
+    return [
+        {
+            'name': index.names[product],
+            'slug': index.slugs[product],
+            'url': reverse('product_detail', args=[index.slugs[product]]),
+        }
+        for product in index.search(query, limit)
+    ]
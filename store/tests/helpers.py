@@ -0,0 +1,74 @@
+# store/tests/helpers.py
+#
+# Fixtures shared by the store tests.
+
+import shutil
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+
+from store.models import Category, Order, OrderItem, Product
+from store.order_numbers import OrderNumberGenerator
+
+PASSWORD = 's3cret-pass'
+
+# One generator for the whole run, so order numbers stay unique and time-ordered
+_order_numbers = OrderNumberGenerator()
+
+
+def make_product(name, stock=10, price='9.99', **fields):
+    fields.setdefault('slug', name.lower().replace(' ', '-'))
+    return Product.objects.create(name=name, stock=stock, price=price, **fields)
+
+
+def make_category(name, parent=None):
+    return Category.objects.create(name=name, slug=name.lower().replace(' ', '-'), parent=parent)
+
+
+def make_user(username='shopper', **fields):
+    return User.objects.create_user(username, password=PASSWORD, **fields)
+
+
+def make_order(items, user=None, status='New', created_at=None):
+    """
+    A placed order of `items` ([(product, quantity), ...]) at each product's current price.
+
+    `created_at` back-dates the order (and its time-ordered order number).
+    """
+    if created_at is None:
+        order_number = _order_numbers.next()
+    else:
+        # A generator never goes back in time, so a back-dated number needs a fresh one
+        order_number = OrderNumberGenerator().next(ms=int(created_at.timestamp() * 1000))
+    order = Order.objects.create(
+        user=user, order_number=order_number,
+        first_name='Test', last_name='Shopper', phone='5550100', email='shopper@example.com',
+        address_line_1='1 Test Street', city='Testville', country='Testland',
+        order_total=sum((Decimal(product.price) * quantity for product, quantity in items), Decimal(0)),
+        status=status, is_ordered=True,
+    )
+    OrderItem.objects.bulk_create(
+        OrderItem(order=order, product=product, product_price=product.price, quantity=quantity, is_ordered=True)
+        for product, quantity in items
+    )
+    if created_at is not None:
+        # auto_now_add ignores a value passed to create()
+        Order.objects.filter(pk=order.pk).update(created_at=created_at)
+        order.created_at = created_at
+    return order
+
+
+def use_settings(test, **settings):
+    """Overrides settings for the rest of `test` (typically called from setUp)."""
+    override = override_settings(**settings)
+    override.enable()
+    test.addCleanup(override.disable)
+
+
+def temp_dir(test):
+    """A directory that is removed when `test` finishes."""
+    path = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, path, ignore_errors=True)
+    return path
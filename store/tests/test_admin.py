@@ -0,0 +1,80 @@
+from django.contrib import admin
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from store.admin_mixins import EstimatedCountPaginator, ScalableAdminMixin
+from store.models import Cart, CartItem, Product
+
+from .helpers import PASSWORD, make_product, make_user
+
+
+class SmallPaginator(EstimatedCountPaginator):
+    exact_count_limit = 3
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    def setUp(self):
+        for number in range(6):
+            make_product(f'Item {number}')
+
+    def test_exact_below_the_limit(self):
+        paginator = EstimatedCountPaginator(Product.objects.all(), 2)
+        self.assertEqual((paginator.count, paginator.num_pages), (6, 3))
+
+    def test_unfiltered_count_is_estimated(self):
+        paginator = SmallPaginator(Product.objects.all(), 2)
+        self.assertEqual(paginator.count, 6)
+
+    def test_filtered_count_stops_at_the_limit(self):
+        paginator = SmallPaginator(Product.objects.filter(stock__gt=0), 2)
+        self.assertEqual(paginator.count, 3)
+
+    def test_pages_only_cover_the_exact_limit(self):
+        # The estimate can overshoot, so page 3 (rows 5-6) isn't offered
+        self.assertEqual(SmallPaginator(Product.objects.all(), 2).num_pages, 2)
+
+
+class IndexedLookupCheckTests(TestCase):
+    def check_ids(self, **options):
+        model_admin_class = type('ProductCheckAdmin', (ScalableAdminMixin, admin.ModelAdmin), options)
+        return [warning.id for warning in model_admin_class(Product, admin.AdminSite()).check()]
+
+    def test_exact_and_prefix_on_indexed_fields_pass(self):
+        self.assertEqual(self.check_ids(search_fields=['name__prefix', 'slug__exact']), [])
+
+    def test_startswith_is_flagged(self):
+        self.assertEqual(self.check_ids(search_fields=['name__startswith', '^slug', 'name']), ['store.W001'] * 3)
+
+    def test_unindexed_fields_are_flagged(self):
+        ids = self.check_ids(search_fields=['description__exact'], list_filter=['stock', 'is_available'])
+        self.assertEqual(ids, ['store.W002', 'store.W003'])
+
+
+class ScalableChangelistTests(TestCase):
+    def setUp(self):
+        make_user('admin', is_staff=True, is_superuser=True)
+        self.client.login(username='admin', password=PASSWORD)
+
+    def test_product_search_by_name_prefix(self):
+        make_product('Lamp')
+        make_product('Table Lamp')
+        response = self.client.get(reverse('admin:store_product_changelist'), {'q': 'Lamp'})
+        self.assertEqual([product.name for product in response.context['cl'].result_list], ['Lamp'])
+
+    def test_cart_items_listed_without_a_query_per_row(self):
+        product = make_product('Mug')
+        url = reverse('admin:store_cartitem_changelist')
+
+        def add_item(username):
+            CartItem.objects.create(cart=Cart.objects.create(user=make_user(username)), product=product, quantity=1)
+
+        add_item('first')
+        with CaptureQueriesContext(connection) as one_row:
+            self.client.get(url)
+        add_item('second')
+        add_item('third')
+        with CaptureQueriesContext(connection) as three_rows:
+            self.client.get(url)
+        self.assertEqual(len(three_rows), len(one_row))
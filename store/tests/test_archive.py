@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from store.archive import archive_orders, get_order_items
+from store.models import ArchivedOrder, Order, OrderItem
+
+from .helpers import PASSWORD, make_order, make_product, make_user
+
+
+def _columns(instance, model):
+    """`instance`'s values for the columns of `model` (the live table, which the archive copies)."""
+    return {field.attname: getattr(instance, field.attname) for field in model._meta.concrete_fields}
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.mug = make_product('Mug', price='4.00')
+        self.lamp = make_product('Lamp', price='20.00')
+        now = timezone.now()
+        self.old = make_order([(self.mug, 2), (self.lamp, 1)], user=self.user, status='Completed',
+                              created_at=now - timedelta(days=400))
+        self.old_open = make_order([(self.mug, 1)], user=self.user, created_at=now - timedelta(days=399))
+        self.recent = make_order([(self.lamp, 1)], user=self.user, status='Completed')
+
+    def login(self, user=None):
+        user = user or self.user
+        self.client.login(username=user.username, password=PASSWORD)
+
+    def test_moves_only_old_finished_orders(self):
+        self.assertEqual(archive_orders(batch_size=1), (1, 2))
+        self.assertEqual(list(ArchivedOrder.objects.values_list('pk', flat=True)), [self.old.pk])
+        self.assertCountEqual(Order.objects.values_list('pk', flat=True), [self.old_open.pk, self.recent.pk])
+        self.assertFalse(OrderItem.objects.filter(order_id=self.old.pk).exists())
+        self.assertEqual(archive_orders(), (0, 0))
+
+    def test_round_trip_keeps_every_column(self):
+        order = Order.objects.get(pk=self.old.pk)
+        items = [_columns(item, OrderItem) for item in OrderItem.objects.filter(order=order).order_by('pk')]
+        archive_orders()
+        archived = ArchivedOrder.objects.get(pk=order.pk)
+        self.assertEqual(_columns(archived, Order), _columns(order, Order))
+        self.assertEqual([_columns(item, OrderItem) for item in get_order_items(archived).order_by('pk')], items)
+
+    def test_order_detail_falls_back_to_the_archive(self):
+        archive_orders()
+        self.login()
+        response = self.client.get(reverse('order_detail', args=[self.old.order_number]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['order'].pk, self.old.pk)
+        self.assertEqual(len(response.context['order_items']), 2)
+
+    def test_archived_orders_stay_private(self):
+        archive_orders()
+        self.login(make_user('other'))
+        response = self.client.get(reverse('order_detail', args=[self.old.order_number]))
+        self.assertRedirects(response, reverse('my_orders'))
+
+    def test_my_orders_lists_live_and_archived_orders_newest_first(self):
+        archive_orders()
+        self.login()
+        response = self.client.get(reverse('my_orders'))
+        self.assertEqual(
+            [order.pk for order in response.context['orders']],
+            [self.recent.pk, self.old_open.pk, self.old.pk],
+        )
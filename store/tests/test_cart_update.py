@@ -0,0 +1,63 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from store.inventory import reserve
+from store.models import Cart, CartItem, StockReservation
+
+from .helpers import make_product
+
+
+class CartUpdateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.mug = make_product('Mug', stock=5, price='4.00')
+        self.lamp = make_product('Lamp', stock=2, price='20.00')
+
+    def update(self, items):
+        return self.client.post(reverse('cart_update'), json.dumps({'items': items}), content_type='application/json')
+
+    def lines(self):
+        return dict(CartItem.objects.values_list('product__slug', 'quantity'))
+
+    def holds(self):
+        return dict(StockReservation.objects.values_list('product__slug', 'quantity'))
+
+    def test_sets_quantities_and_returns_totals(self):
+        response = self.update({'mug': 3, 'lamp': 1})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['quantity'], data['total']), (4, '32.00'))
+        self.assertEqual(data['items']['mug'], {'quantity': 3, 'sub_total': '12.00'})
+        self.assertEqual(self.lines(), {'mug': 3, 'lamp': 1})
+        self.assertEqual(self.holds(), {'mug': 3, 'lamp': 1})
+
+    def test_zero_removes_the_line_and_its_hold(self):
+        self.update({'mug': 3, 'lamp': 1})
+        self.update({'mug': 0})
+        self.assertEqual(self.lines(), {'lamp': 1})
+        self.assertEqual(self.holds(), {'lamp': 1})
+
+    def test_lowers_quantities_to_stock_not_held_elsewhere(self):
+        reserve(Cart.objects.create(cart_id='other-shopper'), self.mug, 4)
+        data = self.update({'mug': 3}).json()
+        self.assertEqual(data['items']['mug']['quantity'], 1)
+        self.assertEqual(len(data['notices']), 1)
+        self.assertEqual(self.lines(), {'mug': 1})
+
+    def test_own_holds_do_not_count_against_the_cart(self):
+        self.update({'lamp': 2})
+        self.assertEqual(self.update({'lamp': 2}).json()['notices'], [])
+
+    def test_unknown_products_change_nothing(self):
+        response = self.update({'mug': 1, 'nope': 1})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['unknown'], ['nope'])
+        self.assertEqual(self.lines(), {})
+
+    def test_rejects_malformed_requests(self):
+        for items in ({'mug': -1}, {'mug': 'many'}, ['mug']):
+            self.assertEqual(self.update(items).status_code, 400)
+        self.assertEqual(self.client.get(reverse('cart_update')).status_code, 405)
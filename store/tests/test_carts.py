@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from store.carts import get_user_cart
+from store.models import Cart, CartItem, StockReservation
+
+from .helpers import PASSWORD, make_product, make_user
+
+
+class CartMergeTests(TestCase):
+    """The anonymous cart is merged into the user's own cart at login (store.carts)."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        self.mug = make_product('Mug', stock=2)
+        self.lamp = make_product('Lamp', stock=5)
+
+    def login(self):
+        self.client.login(username=self.user.username, password=PASSWORD)
+
+    def test_login_merges_and_caps_at_free_stock(self):
+        user_cart = get_user_cart(self.user)
+        CartItem.objects.create(cart=user_cart, product=self.mug, quantity=1)
+        self.client.get(reverse('add_cart', args=[self.mug.slug]))
+        self.client.get(reverse('add_cart', args=[self.mug.slug]))
+        self.client.get(reverse('add_cart', args=[self.lamp.slug]))
+        anonymous_cart = Cart.objects.get(user=None)
+
+        self.login()
+
+        quantities = dict(CartItem.objects.filter(cart=user_cart).values_list('product__slug', 'quantity'))
+        # Three mugs wanted, two in stock
+        self.assertEqual(quantities, {'mug': 2, 'lamp': 1})
+        self.assertFalse(Cart.objects.filter(pk=anonymous_cart.pk).exists())
+        holds = dict(StockReservation.objects.filter(cart=user_cart).values_list('product__slug', 'quantity'))
+        self.assertEqual(holds, {'mug': 2, 'lamp': 1})
+        self.assertEqual(self.client.session['cart_pk'], user_cart.pk)
+
+    def test_login_without_anonymous_cart_keeps_user_cart(self):
+        user_cart = get_user_cart(self.user)
+        CartItem.objects.create(cart=user_cart, product=self.lamp, quantity=2)
+        self.login()
+        self.assertEqual(CartItem.objects.get(cart=user_cart).quantity, 2)
+        self.assertEqual(self.client.session['cart_pk'], user_cart.pk)
+
+    def test_login_with_nothing_to_merge_creates_no_cart(self):
+        self.login()
+        self.assertFalse(Cart.objects.exists())
+
+    def test_browsing_creates_no_cart(self):
+        self.login()
+        for url in (reverse('home'), reverse('cart'), reverse('remove_cart', args=[self.mug.slug])):
+            self.client.get(url)
+        self.assertFalse(Cart.objects.exists())
+
+    def test_counter_reads_the_existing_cart(self):
+        self.login()
+        self.client.get(reverse('add_cart', args=[self.lamp.slug]))
+        self.client.get(reverse('add_cart', args=[self.lamp.slug]))
+        self.assertEqual(Cart.objects.get().user, self.user)
+        self.assertEqual(self.client.get(reverse('home')).context['cart_count'], 2)
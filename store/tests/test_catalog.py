@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from store.catalog import get_category_tree
+from store.models import Category
+
+from .helpers import make_category, make_product
+
+
+class CategoryTreeTests(TestCase):
+    """Materialized-path categories and the cached navbar tree (store.catalog)."""
+
+    def setUp(self):
+        cache.clear()
+        self.books = make_category('Books')
+        self.fiction = make_category('Fiction', parent=self.books)
+        self.crime = make_category('Crime', parent=self.fiction)
+        self.games = make_category('Games')
+        # A top-level slug that shares the "books" prefix without being in the subtree
+        self.booksets = make_category('Booksets')
+
+    def totals(self):
+        return {node['slug']: node['total_count'] for node in get_category_tree()}
+
+    def test_paths_and_depths(self):
+        self.assertEqual((self.crime.path, self.crime.depth), ('books/fiction/crime/', 2))
+
+    def test_descendants_stay_inside_the_subtree(self):
+        self.assertEqual(
+            list(self.books.get_descendants().values_list('slug', flat=True)), ['books', 'fiction', 'crime'],
+        )
+        self.assertEqual(list(self.fiction.get_descendants(include_self=False)), [self.crime])
+
+    def test_subtree_totals_count_each_product_once(self):
+        novel = make_product('Novel')
+        novel.categories.set([self.books, self.fiction, self.crime])
+        make_product('Atlas').categories.set([self.books])
+        make_product('Chess').categories.set([self.games])
+
+        self.assertEqual(
+            self.totals(), {'books': 2, 'fiction': 1, 'crime': 1, 'games': 1, 'booksets': 0},
+        )
+        self.assertEqual(self.books.subtree_products().count(), 2)
+        self.assertEqual(Category.objects.get(pk=self.books.pk).product_count, 2)
+
+    def test_tree_is_rebuilt_after_changes(self):
+        self.assertEqual(self.totals()['games'], 0)
+        make_product('Chess').categories.add(self.games)
+        self.assertEqual(self.totals()['games'], 1)
+
+    def test_moving_a_category_moves_its_subtree(self):
+        self.fiction.parent = self.games
+        self.fiction.save()
+        self.crime.refresh_from_db()
+        self.assertEqual((self.crime.path, self.crime.depth), ('games/fiction/crime/', 2))
+        self.assertEqual([node['slug'] for node in get_category_tree()][:3], ['books', 'booksets', 'games'])
+
+    def test_prefix_lookup_is_case_sensitive(self):
+        self.assertEqual(Category.objects.filter(path__prefix='books/').count(), 3)
+        self.assertEqual(Category.objects.filter(path__prefix='Books/').count(), 0)
+        self.assertEqual(Category.objects.filter(name__prefix='Book').count(), 2)
@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from store.catalog import get_category_tree
+from store.facets import apply_facets
+from store.models import Product
+
+from .helpers import make_category, make_product
+
+
+class FacetTests(TestCase):
+    """Facet filtering and single-query facet counts (store.facets)."""
+
+    def setUp(self):
+        cache.clear()
+        self.books = make_category('Books')
+        self.fiction = make_category('Fiction', parent=self.books)
+        self.games = make_category('Games')
+        make_product('Novel', price='8.00').categories.set([self.books, self.fiction])
+        make_product('Atlas', price='30.00').categories.set([self.books])
+        make_product('Chess', price='12.00', stock=0).categories.set([self.games])
+        make_product('Dice', price='5.00').categories.set([self.games])
+
+    def facets(self, query='', products=None, category=None):
+        request = RequestFactory().get('/', query)
+        products = Product.objects.all() if products is None else products
+        filtered, facets = apply_facets(request, products, current_category=category)
+        counts = {
+            facet['name']: {option['value']: option['count'] for option in facet['options']} for facet in facets
+        }
+        return sorted(filtered.values_list('slug', flat=True)), counts, facets
+
+    def test_counts_without_selection(self):
+        slugs, counts, _ = self.facets()
+        self.assertEqual(slugs, ['atlas', 'chess', 'dice', 'novel'])
+        self.assertEqual(counts['price'], {'under-10': 2, '10-25': 1, '25-50': 1, '50-plus': 0})
+        self.assertEqual(counts['stock'], {'in': 3, 'out': 1})
+        # A product in a category and its subcategory counts once
+        self.assertEqual(counts['category'], {'books': 2, 'games': 2})
+
+    def test_each_facet_ignores_its_own_selection(self):
+        slugs, counts, _ = self.facets({'price': 'under-10', 'category': 'games'})
+        self.assertEqual(slugs, ['dice'])
+        # Price counts apply the category filter only, category counts the price filter only
+        self.assertEqual(counts['price'], {'under-10': 1, '10-25': 1, '25-50': 0, '50-plus': 0})
+        self.assertEqual(counts['category'], {'books': 1, 'games': 1})
+        self.assertEqual(counts['stock'], {'in': 1, 'out': 0})
+
+    def test_counts_come_from_one_query(self):
+        request = RequestFactory().get('/', {'stock': 'in'})
+        get_category_tree()
+        # The category tree is cached: the counts themselves are a single aggregate
+        with self.assertNumQueries(1):
+            apply_facets(request, Product.objects.all())
+
+    def test_unknown_values_are_ignored(self):
+        slugs, _, _ = self.facets({'price': 'free', 'category': 'nope'})
+        self.assertEqual(len(slugs), 4)
+
+    def test_toggle_links_keep_other_parameters(self):
+        _, _, facets = self.facets({'price': 'under-10', 'q': 'x'})
+        price = next(facet for facet in facets if facet['name'] == 'price')
+        under_10 = next(option for option in price['options'] if option['value'] == 'under-10')
+        self.assertTrue(under_10['selected'])
+        self.assertEqual(under_10['url'], '?q=x')
+
+    def test_category_page_offers_its_children(self):
+        _, counts, _ = self.facets(products=self.books.subtree_products(), category=self.books)
+        self.assertEqual(counts['category'], {'fiction': 1})
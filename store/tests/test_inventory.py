@@ -0,0 +1,108 @@
+from unittest import mock
+
+from django.contrib import messages
+from django.test import TestCase
+from django.urls import reverse
+
+from store.inventory import InsufficientStock, StockConflict, adjust_stock, contention_stats
+from store.models import Product
+
+from .helpers import make_order, make_product, make_user
+
+
+class AdjustStockTests(TestCase):
+    """Compare-and-swap stock updates (store.inventory.adjust_stock)."""
+
+    def setUp(self):
+        self.product = make_product('Mug', stock=5)
+
+    def copy(self):
+        return Product.objects.get(pk=self.product.pk)
+
+    def assertRow(self, stock, version):
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.version), (stock, version))
+
+    def test_update_bumps_version(self):
+        adjust_stock(self.product, -2)
+        self.assertRow(3, 1)
+
+    def test_stale_copy_retries_against_the_current_row(self):
+        stale = self.copy()
+        adjust_stock(self.copy(), -3)
+        before = contention_stats()
+
+        adjust_stock(stale, -1)
+
+        # Both deductions landed: the stale copy re-read the row instead of overwriting it
+        self.assertRow(1, 2)
+        self.assertEqual(contention_stats()['conflicts'] - before['conflicts'], 1)
+
+    def test_conflict_after_retries_run_out(self):
+        stale = self.copy()
+        adjust_stock(self.copy(), -1)
+        with self.assertRaises(StockConflict):
+            adjust_stock(stale, -1, max_retries=0)
+        self.assertRow(4, 1)
+
+    def test_insufficient_stock_leaves_row_alone(self):
+        with self.assertRaises(InsufficientStock) as raised:
+            adjust_stock(self.product, -6)
+        self.assertIn('Only 5 of Mug left', str(raised.exception))
+        self.assertRow(5, 0)
+
+    def test_stale_copy_sees_a_restock_before_refusing(self):
+        stale = self.copy()
+        adjust_stock(self.copy(), 10)
+
+        adjust_stock(stale, -12)
+
+        self.assertRow(3, 2)
+
+    def test_insufficient_stock_reports_the_current_count(self):
+        stale = self.copy()
+        adjust_stock(self.copy(), -4)
+        with self.assertRaises(InsufficientStock) as raised:
+            adjust_stock(stale, -3)
+        self.assertIn('Only 1 of Mug left', str(raised.exception))
+
+
+class CancelOrderActionTests(TestCase):
+    """The admin's "Cancel Order and Return Stock" action."""
+
+    def setUp(self):
+        self.client.force_login(make_user('admin', is_staff=True, is_superuser=True))
+        self.mug = make_product('Mug', stock=5)
+        self.lamp = make_product('Lamp', stock=5)
+        self.mug_order = make_order([(self.mug, 2)])
+        self.lamp_order = make_order([(self.lamp, 1)])
+
+    def cancel(self, *orders):
+        return self.client.post(
+            reverse('admin:store_order_changelist'),
+            {'action': 'cancel_and_return_stock', '_selected_action': [order.pk for order in orders]},
+            follow=True,
+        )
+
+    def test_returns_stock(self):
+        self.cancel(self.mug_order)
+        self.mug.refresh_from_db()
+        self.mug_order.refresh_from_db()
+        self.assertEqual((self.mug.stock, self.mug_order.status), (7, 'Cancelled'))
+
+    def test_lost_race_skips_only_that_order(self):
+        def adjust(product, delta):
+            if product.pk == self.mug.pk:
+                raise StockConflict('busy')
+            return adjust_stock(product, delta)
+
+        with mock.patch('store.admin.adjust_stock', side_effect=adjust):
+            response = self.cancel(self.mug_order, self.lamp_order)
+
+        self.assertEqual(response.status_code, 200)
+        self.mug_order.refresh_from_db()
+        self.lamp_order.refresh_from_db()
+        self.assertEqual((self.mug_order.status, self.lamp_order.status), ('New', 'Cancelled'))
+        notices = [(message.level, str(message)) for message in response.context['messages']]
+        self.assertIn(messages.WARNING, [level for level, _ in notices])
+        self.assertTrue(any(self.mug_order.order_number in text for _, text in notices))
@@ -0,0 +1,74 @@
+from pathlib import Path
+
+from django.test import TestCase
+
+from .helpers import temp_dir, use_settings
+
+CONTENT = b'0123456789abcdef'
+
+
+class ServeMediaTests(TestCase):
+    """Conditional GET and byte ranges for files under MEDIA_ROOT (store.media.serve_media)."""
+
+    url = '/media/product_images/mug.jpg'
+
+    def setUp(self):
+        media_root = temp_dir(self)
+        (Path(media_root) / 'product_images').mkdir()
+        (Path(media_root) / 'product_images' / 'mug.jpg').write_bytes(CONTENT)
+        use_settings(self, MEDIA_ROOT=media_root, MEDIA_SERVE_BACKEND='python')
+
+    def get(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_full_file_with_validators(self):
+        response, body = self.get()
+        self.assertEqual((response.status_code, body), (200, CONTENT))
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertTrue(response['ETag'])
+        self.assertIn('max-age=', response['Cache-Control'])
+
+    def test_not_modified(self):
+        first, _ = self.get()
+        response, body = self.get(if_none_match=first['ETag'])
+        self.assertEqual((response.status_code, body), (304, b''))
+        response, _ = self.get(if_modified_since=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_byte_range(self):
+        response, body = self.get(range='bytes=2-5')
+        self.assertEqual((response.status_code, body), (206, b'2345'))
+        self.assertEqual(response['Content-Range'], f'bytes 2-5/{len(CONTENT)}')
+        self.assertEqual(response['Content-Length'], '4')
+
+    def test_suffix_and_open_ended_ranges(self):
+        _, body = self.get(range='bytes=-3')
+        self.assertEqual(body, b'def')
+        _, body = self.get(range='bytes=14-')
+        self.assertEqual(body, b'ef')
+
+    def test_unsatisfiable_range(self):
+        response, _ = self.get(range='bytes=100-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_if_range_mismatch_sends_whole_file(self):
+        first, _ = self.get()
+        response, body = self.get(range='bytes=2-5', if_range=first['ETag'])
+        self.assertEqual((response.status_code, body), (206, b'2345'))
+        response, body = self.get(range='bytes=2-5', if_range='"stale"')
+        self.assertEqual((response.status_code, body), (200, CONTENT))
+
+    def test_front_end_offload(self):
+        use_settings(self, MEDIA_SERVE_BACKEND='x-accel-redirect')
+        response, body = self.get()
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/product_images/mug.jpg')
+        self.assertEqual(body, b'')
+
+    def test_missing_file_and_traversal(self):
+        self.assertEqual(self.client.get('/media/product_images/nope.jpg').status_code, 404)
+        self.assertIn(self.client.get('/media/../config/settings.py').status_code, (400, 404))
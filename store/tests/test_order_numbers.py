@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from store.order_numbers import (
+    ALPHABET, OrderNumberGenerator, order_number_floor, order_number_timestamp,
+)
+
+from .helpers import PASSWORD, make_order, make_product, make_user
+
+WHEN = datetime(2026, 3, 14, 15, 9, 26, 535000, tzinfo=timezone.utc)
+
+
+class OrderNumberTests(SimpleTestCase):
+    def setUp(self):
+        self.generator = OrderNumberGenerator()
+
+    def test_format(self):
+        number = self.generator.next()
+        self.assertEqual(len(number), 20)
+        self.assertTrue(set(number) <= set(ALPHABET))
+
+    def test_strictly_increasing_within_one_millisecond(self):
+        ms = int(WHEN.timestamp() * 1000)
+        numbers = [self.generator.next(ms=ms) for _ in range(50)]
+        self.assertEqual(numbers, sorted(set(numbers)))
+
+    def test_clock_going_backwards_keeps_the_order(self):
+        ms = int(WHEN.timestamp() * 1000)
+        first = self.generator.next(ms=ms)
+        self.assertGreater(self.generator.next(ms=ms - 5000), first)
+
+    def test_sorts_by_time(self):
+        ms = int(WHEN.timestamp() * 1000)
+        earlier = OrderNumberGenerator().next(ms=ms + 1)
+        self.assertGreater(self.generator.next(ms=ms + 2), earlier)
+
+    def test_timestamp_round_trip(self):
+        number = self.generator.next(ms=int(WHEN.timestamp() * 1000))
+        self.assertEqual(order_number_timestamp(number), WHEN)
+
+    def test_floor_sits_between_earlier_and_later_orders(self):
+        ms = int(WHEN.timestamp() * 1000)
+        before = self.generator.next(ms=ms - 1)
+        at = self.generator.next(ms=ms)
+        floor = order_number_floor(WHEN)
+        self.assertLess(before, floor)
+        self.assertLessEqual(floor, at)
+
+
+@mock.patch('store.views.MY_ORDERS_PAGE_SIZE', 2)
+class MyOrdersPagingTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        product = make_product('Mug')
+        self.orders = [
+            make_order([(product, 1)], user=self.user, created_at=WHEN + timedelta(days=day))
+            for day in range(5)
+        ]
+        # Someone else's order is never listed
+        make_order([(product, 1)], user=make_user('other'), created_at=WHEN + timedelta(days=2))
+        self.client.login(username=self.user.username, password=PASSWORD)
+
+    def page(self, before=None):
+        response = self.client.get(reverse('my_orders'), {'before': before} if before else {})
+        numbers = [order.order_number for order in response.context['orders']]
+        return numbers, response.context['next_cursor']
+
+    def test_walks_every_order_newest_first(self):
+        expected = [order.order_number for order in reversed(self.orders)]
+        seen, cursor = self.page()
+        self.assertEqual(seen, expected[:2])
+        while cursor:
+            numbers, cursor = self.page(cursor)
+            seen += numbers
+        self.assertEqual(seen, expected)
+
+    def test_cursor_is_the_last_order_shown(self):
+        numbers, cursor = self.page()
+        self.assertEqual(cursor, numbers[-1])
+
+    def test_last_page_has_no_cursor(self):
+        numbers, cursor = self.page(self.orders[1].order_number)
+        self.assertEqual(numbers, [self.orders[0].order_number])
+        self.assertIsNone(cursor)
@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from store.ratelimit import consume
+
+from .helpers import use_settings
+
+LIMITS = {'search': {'per_ip': (3, 60), 'per_session': (3, 60)}}
+
+
+class Clock:
+    """Stands in for time.time() in store.ratelimit."""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class ConsumeTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.clock = Clock(600.0)
+        patcher = mock.patch('store.ratelimit.time.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_allows_capacity_requests_per_window(self):
+        self.assertEqual([consume('b', 3, 60) for _ in range(4)], [0, 0, 0, 80])
+
+    def test_refused_requests_are_not_counted(self):
+        for _ in range(10):
+            consume('b', 3, 60)
+        self.clock.now = 680.0
+        self.assertEqual(consume('b', 3, 60), 0)
+
+    def test_previous_window_slides_out(self):
+        for _ in range(3):
+            consume('b', 3, 60)
+        # Halfway through the next window the earlier requests still count for half
+        self.clock.now = 690.0
+        self.assertEqual([consume('b', 3, 60) for _ in range(2)], [0, 10])
+        self.clock.now = 700.0
+        self.assertEqual(consume('b', 3, 60), 0)
+
+    def test_buckets_are_independent(self):
+        for _ in range(3):
+            consume('a', 3, 60)
+        self.assertEqual(consume('b', 3, 60), 0)
+
+
+class RateLimitMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        use_settings(self, RATE_LIMITS=LIMITS)
+        patcher = mock.patch('store.ratelimit.time.time', Clock(600.0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def search(self, **extra):
+        return self.client.get(reverse('search'), {'q': 'mug'}, **extra)
+
+    def test_over_the_limit_gets_429_with_retry_after(self):
+        for _ in range(3):
+            self.assertEqual(self.search().status_code, 200)
+        response = self.search()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '80')
+
+    def test_limit_is_per_client_address(self):
+        for _ in range(3):
+            self.search()
+        self.assertEqual(self.search(REMOTE_ADDR='10.0.0.2').status_code, 200)
+
+    def test_unlisted_views_are_not_limited(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get(reverse('home')).status_code, 200)
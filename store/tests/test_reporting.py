@@ -0,0 +1,94 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import Permission
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from store.models import DailyProductSales, DailySales
+from store.reporting import rebuild_rollups, record_order_cancelled, record_order_placed
+
+from .helpers import PASSWORD, make_order, make_product, make_user
+
+
+def _rollups():
+    days = {
+        row.date: (row.orders, row.units, row.revenue, row.cancelled_orders, row.cancelled_units, row.cancelled_revenue)
+        for row in DailySales.objects.all()
+    }
+    products = {
+        (row.date, row.product_id): (row.units, row.revenue, row.cancelled_units, row.cancelled_revenue)
+        for row in DailyProductSales.objects.all()
+    }
+    return days, products
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.mug = make_product('Mug', price='5.00')
+        self.lamp = make_product('Lamp', price='20.00')
+        self.yesterday = timezone.now() - timedelta(days=1)
+
+    def place(self, items, **fields):
+        order = make_order(items, **fields)
+        record_order_placed(order, order.orderitem_set.all())
+        return order
+
+    def test_placed_orders_add_up_per_day_and_product(self):
+        self.place([(self.mug, 2), (self.lamp, 1)])
+        self.place([(self.mug, 1)])
+        day = DailySales.objects.get()
+        self.assertEqual((day.orders, day.units, day.revenue), (2, 4, Decimal('35.00')))
+        mug = DailyProductSales.objects.get(product=self.mug)
+        self.assertEqual((mug.units, mug.revenue), (3, Decimal('15.00')))
+
+    def test_cancellation_lands_on_the_day_the_order_was_placed(self):
+        order = self.place([(self.lamp, 2)], created_at=self.yesterday)
+        self.place([(self.mug, 1)])
+        order.status = 'Cancelled'
+        order.save()
+        record_order_cancelled(order, order.orderitem_set.all())
+        day = DailySales.objects.get(date=timezone.localdate(self.yesterday))
+        self.assertEqual((day.orders, day.cancelled_orders, day.cancelled_revenue), (1, 1, Decimal('40.00')))
+        self.assertEqual(DailySales.objects.get(date=timezone.localdate()).cancelled_orders, 0)
+
+    def test_rebuild_matches_the_incremental_rollups(self):
+        order = self.place([(self.mug, 2), (self.lamp, 1)], created_at=self.yesterday)
+        self.place([(self.lamp, 3)])
+        order.status = 'Cancelled'
+        order.save()
+        record_order_cancelled(order, order.orderitem_set.all())
+        incremental = _rollups()
+
+        DailySales.objects.update(orders=0, revenue=0)
+        self.assertEqual(rebuild_rollups(), (2, 3))
+        self.assertEqual(_rollups(), incremental)
+
+
+class SalesDashboardTests(TestCase):
+    url = reverse('admin:store_dailysales_changelist')
+
+    def setUp(self):
+        self.staff = make_user('staff', is_staff=True)
+        self.client.login(username='staff', password=PASSWORD)
+
+    def grant_view(self):
+        self.staff.user_permissions.add(Permission.objects.get(codename='view_dailysales'))
+
+    def test_requires_view_permission(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.grant_view()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_top_sellers_keeps_products_with_the_same_name_apart(self):
+        self.grant_view()
+        for price in ('5.00', '7.00'):
+            product = make_product('Mug', price=price, slug=f'mug-{price}')
+            order = make_order([(product, 1)])
+            record_order_placed(order, order.orderitem_set.all())
+        sellers = list(self.client.get(self.url).context['top_sellers'])
+        self.assertEqual(
+            [(row['name'], row['revenue']) for row in sellers],
+            [('Mug', Decimal('7.00')), ('Mug', Decimal('5.00'))],
+        )
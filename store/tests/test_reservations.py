@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from store.inventory import available_stock, release_expired, reserve
+from store.models import Cart, CartItem, StockReservation
+
+from .helpers import make_product
+
+
+class ReservationTests(TestCase):
+    """Stock held by carts (store.inventory reservations and the cart views)."""
+
+    def setUp(self):
+        cache.clear()
+        self.product = make_product('Lamp', stock=3)
+        self.other_cart = Cart.objects.create(cart_id='other-shopper')
+
+    def add(self):
+        self.client.get(reverse('add_cart', args=[self.product.slug]))
+
+    def own_hold(self):
+        hold = StockReservation.objects.exclude(cart=self.other_cart).first()
+        return hold.quantity if hold else 0
+
+    def test_holds_count_against_other_carts_only(self):
+        reserve(self.other_cart, self.product, 2)
+        self.assertEqual(available_stock(self.product), 1)
+        self.assertEqual(available_stock(self.product, exclude_cart=self.other_cart), 3)
+
+    def test_expired_holds_stop_counting_and_are_swept(self):
+        reserve(self.other_cart, self.product, 3)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(available_stock(self.product), 3)
+        self.assertEqual(release_expired(), 1)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_add_cart_refuses_stock_held_elsewhere(self):
+        reserve(self.other_cart, self.product, 3)
+        self.add()
+        self.assertFalse(CartItem.objects.filter(product=self.product).exists())
+
+    def test_add_cart_holds_what_it_adds(self):
+        reserve(self.other_cart, self.product, 1)
+        for _ in range(3):
+            self.add()
+        item = CartItem.objects.exclude(cart=self.other_cart).get(product=self.product)
+        self.assertEqual((item.quantity, self.own_hold()), (2, 2))
+
+    def test_decrease_and_remove_release_the_hold(self):
+        self.add()
+        self.add()
+        self.client.get(reverse('decrease_cart', args=[self.product.slug]))
+        self.assertEqual(self.own_hold(), 1)
+        self.client.get(reverse('remove_cart', args=[self.product.slug]))
+        self.assertEqual(self.own_hold(), 0)
+        self.assertEqual(available_stock(self.product), 3)
@@ -0,0 +1,98 @@
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.test import TestCase
+
+from store.sessions import KEY_PREFIX, SessionStore, flush_pending_sessions
+
+from .helpers import temp_dir, use_settings
+
+
+class SessionStoreTests(TestCase):
+    """Saving and loading through store.sessions with a process-local and a shared cache."""
+
+    def test_local_cache_reads_every_change_from_the_database(self):
+        session = SessionStore()
+        session['cart_pk'] = 1
+        session.save()
+        self.assertTrue(Session.objects.filter(session_key=session.session_key).exists())
+
+        # Another worker changes the session: this one must see it, not a cached copy
+        other = SessionStore(session.session_key)
+        other['cart_pk'] = 2
+        other.save()
+        self.assertEqual(SessionStore(session.session_key)['cart_pk'], 2)
+
+    def test_no_cookie_makes_no_queries(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(dict(SessionStore().items()), {})
+
+    def test_delete_logs_out_at_once(self):
+        session = SessionStore()
+        session['_auth_user_id'] = '1'
+        session.save()
+        session.delete()
+        self.assertFalse(SessionStore(session.session_key).exists(session.session_key))
+        self.assertEqual(dict(SessionStore(session.session_key).items()), {})
+
+
+class WriteBehindSessionStoreTests(TestCase):
+    """With a shared cache, saves reach the database in batches."""
+
+    def setUp(self):
+        use_settings(
+            self,
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': temp_dir(self),
+            }},
+            # Flushed by the tests only
+            SESSION_FLUSH_INTERVAL=3600, SESSION_FLUSH_BATCH=10 ** 6,
+        )
+        self.addCleanup(flush_pending_sessions)
+
+    def test_save_is_read_back_before_and_after_the_flush(self):
+        session = SessionStore()
+        session['cart_pk'] = 7
+        session.save()
+        key = session.session_key
+        self.assertFalse(Session.objects.filter(session_key=key).exists())
+        self.assertEqual(SessionStore(key)['cart_pk'], 7)
+
+        flush_pending_sessions()
+        row = Session.objects.get(session_key=key)
+        self.assertEqual(SessionStore().decode(row.session_data), {'cart_pk': 7})
+
+    def test_repeated_saves_write_one_row(self):
+        session = SessionStore()
+        for value in range(3):
+            session['step'] = value
+            session.save()
+        self.assertEqual(flush_pending_sessions(), 1)
+        self.assertEqual(SessionStore(session.session_key)['step'], 2)
+
+    def test_delete_drops_pending_write(self):
+        session = SessionStore()
+        session['_auth_user_id'] = '1'
+        session.save()
+        session.delete()
+        flush_pending_sessions()
+        self.assertFalse(Session.objects.filter(session_key=session.session_key).exists())
+        self.assertEqual(dict(SessionStore(session.session_key).items()), {})
+
+    def change_on_another_worker(self, key, data):
+        # Another worker's save updates the shared cache (this process's LRU never hears of it)
+        caches['default'].set(KEY_PREFIX + key, data)
+
+    def test_another_workers_change_is_seen_at_once_by_default(self):
+        session = SessionStore()
+        session['cart_pk'] = 1
+        session.save()
+        self.change_on_another_worker(session.session_key, {'cart_pk': 2})
+        self.assertEqual(SessionStore(session.session_key)['cart_pk'], 2)
+
+    def test_lru_serves_its_copy_for_the_ttl(self):
+        use_settings(self, SESSION_LRU_TTL=60)
+        session = SessionStore()
+        session['cart_pk'] = 1
+        session.save()
+        self.change_on_another_worker(session.session_key, {'cart_pk': 2})
+        self.assertEqual(SessionStore(session.session_key)['cart_pk'], 1)
@@ -0,0 +1,59 @@
+import gzip
+import json
+
+from django.test import TestCase
+
+from store.snapshot import build_catalog_snapshot, load_manifest, snapshot_root
+
+from .helpers import make_product, temp_dir, use_settings
+
+
+class CatalogSnapshotTests(TestCase):
+    """Incremental rebuilds of the sitemap and JSON catalog shards (store.snapshot)."""
+
+    def setUp(self):
+        use_settings(
+            self, MEDIA_ROOT=temp_dir(self), CATALOG_SNAPSHOT_SHARD_SIZE=100, SITE_URL='https://shop.example',
+        )
+        # Explicit ids: one product in shard 0, two in shard 1
+        self.mug = make_product('Mug', pk=1)
+        self.lamp = make_product('Lamp', pk=101)
+        self.desk = make_product('Desk', pk=150)
+
+    def read_gzip(self, name):
+        return gzip.decompress((snapshot_root() / name).read_bytes()).decode()
+
+    def test_only_changed_shards_are_rewritten(self):
+        self.assertEqual(build_catalog_snapshot(), (2, 2))
+        self.assertEqual(build_catalog_snapshot(), (0, 2))
+
+        self.lamp.name = 'Desk Lamp'
+        self.lamp.save()
+        self.assertEqual(build_catalog_snapshot(), (1, 2))
+        catalog = json.loads(self.read_gzip('catalog-products-00001.json.gz'))
+        self.assertEqual([entry['name'] for entry in catalog], ['Desk Lamp', 'Desk'])
+
+        self.assertEqual(build_catalog_snapshot(full=True), (2, 2))
+
+    def test_sitemaps_are_indexed_from_the_site_root(self):
+        build_catalog_snapshot()
+        index = (snapshot_root() / 'sitemap.xml').read_text()
+        self.assertIn('<loc>https://shop.example/sitemap-products-00000.xml.gz</loc>', index)
+        self.assertIn('<loc>https://shop.example/mug/</loc>', self.read_gzip('sitemap-products-00000.xml.gz'))
+        response = self.client.get('/sitemap-products-00001.xml.gz')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    def test_emptied_shard_is_dropped(self):
+        build_catalog_snapshot()
+        self.mug.delete()
+        self.assertEqual(build_catalog_snapshot(), (0, 1))
+        self.assertFalse((snapshot_root() / 'sitemap-products-00000.xml.gz').exists())
+        self.assertEqual([shard['index'] for shard in load_manifest(snapshot_root())['shards']], [1])
+
+    def test_unlisted_products_are_left_out(self):
+        self.desk.is_available = False
+        self.desk.save()
+        build_catalog_snapshot()
+        self.assertEqual(load_manifest(snapshot_root())['products'], 2)
+        self.assertNotIn('/desk/', self.read_gzip('sitemap-products-00001.xml.gz'))
@@ -0,0 +1,76 @@
+import json
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from store.stock_ingest import ingest_stock_records, parse_records
+
+from .helpers import make_product
+
+
+class StockFeedTests(TestCase):
+    """Warehouse stock feeds are idempotent by sequence number (store.stock_ingest)."""
+
+    def setUp(self):
+        self.mug = make_product('Mug', stock=10)
+        self.lamp = make_product('Lamp', stock=1)
+
+    def ingest(self, *records):
+        return ingest_stock_records(parse_records(json.dumps(record) for record in records))
+
+    def stock(self, product):
+        product.refresh_from_db()
+        return product.stock
+
+    def test_replayed_feed_is_skipped(self):
+        feed = [{'slug': 'mug', 'delta': -3, 'seq': 1}, {'slug': 'mug', 'delta': 5, 'seq': 2}]
+        stats = self.ingest(*feed)
+        self.assertEqual((stats['applied'], self.stock(self.mug)), (2, 12))
+
+        stats = self.ingest(*feed)
+        self.assertEqual((stats['applied'], stats['skipped'], self.stock(self.mug)), (0, 2, 12))
+
+    def test_older_and_repeated_records_are_skipped(self):
+        stats = self.ingest(
+            {'slug': 'mug', 'delta': -1, 'seq': 5},
+            {'slug': 'mug', 'delta': -1, 'seq': 5},
+            {'slug': 'mug', 'delta': -1, 'seq': 3},
+        )
+        self.assertEqual((stats['applied'], stats['skipped'], self.stock(self.mug)), (2, 1, 8))
+        self.mug.refresh_from_db()
+        self.assertEqual(self.mug.stock_sequence, 5)
+
+        stats = self.ingest({'slug': 'mug', 'delta': -1, 'seq': 4})
+        self.assertEqual((stats['skipped'], self.stock(self.mug)), (1, 8))
+
+    def test_absolute_count_resets_earlier_deltas(self):
+        self.ingest(
+            {'slug': 'mug', 'delta': -4, 'seq': 1},
+            {'slug': 'mug', 'stock': 20, 'seq': 2},
+            {'slug': 'mug', 'delta': 2, 'seq': 3},
+        )
+        self.assertEqual(self.stock(self.mug), 22)
+
+    def test_availability_follows_stock_across_zero(self):
+        self.ingest({'slug': 'lamp', 'delta': -1, 'seq': 1})
+        self.lamp.refresh_from_db()
+        self.assertEqual((self.lamp.stock, self.lamp.is_available), (0, False))
+        self.ingest({'slug': 'lamp', 'delta': 4, 'seq': 2})
+        self.lamp.refresh_from_db()
+        self.assertEqual((self.lamp.stock, self.lamp.is_available), (4, True))
+
+    def test_unknown_products_are_counted(self):
+        stats = self.ingest({'slug': 'nope', 'delta': 1, 'seq': 1})
+        self.assertEqual(stats['unknown'], 1)
+
+    @override_settings(STOCK_INGEST_TOKEN='feed-token')
+    def test_endpoint_requires_token(self):
+        body = json.dumps({'slug': 'mug', 'delta': 1, 'seq': 1})
+        url = reverse('stock_feed')
+        response = self.client.post(url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post(
+            url, body, content_type='application/x-ndjson', HTTP_AUTHORIZATION='Bearer feed-token',
+        )
+        self.assertEqual(response.json()['applied'], 1)
+        self.assertEqual(self.stock(self.mug), 11)
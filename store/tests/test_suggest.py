@@ -0,0 +1,49 @@
+from django.test import SimpleTestCase, TestCase
+
+from store.suggest import SuggestionIndex, build_index, edit_distance
+
+from .helpers import make_product
+
+
+class SuggestionTests(SimpleTestCase):
+    """Typo-tolerant prefix matching in store.suggest."""
+
+    def setUp(self):
+        products = [
+            (1, 'Wireless Headphones', 'wireless-headphones'),
+            (2, 'Wired Headphones', 'wired-headphones'),
+            (3, 'Ceramic Coffee Mug', 'ceramic-coffee-mug'),
+            (4, 'Crème Brûlée Torch', 'creme-brulee-torch'),
+        ]
+        self.index = SuggestionIndex(products, {2: 50, 1: 10}, version=0)
+
+    def search(self, query):
+        return [self.index.slugs[product] for product in self.index.search(query, 5)]
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance('headphnoes', 'headphones', 2), 1)
+        self.assertEqual(edit_distance('mug', 'mugs', 1), 1)
+        self.assertEqual(edit_distance('coffee', 'torch', 2), 3)
+
+    def test_prefix_ranks_by_popularity(self):
+        self.assertEqual(self.search('head'), ['wired-headphones', 'wireless-headphones'])
+
+    def test_typos_still_match(self):
+        self.assertEqual(self.search('wirelss')[0], 'wireless-headphones')
+        self.assertEqual(self.search('headphnoes')[:2], ['wired-headphones', 'wireless-headphones'])
+        self.assertEqual(self.search('cofee mug'), ['ceramic-coffee-mug'])
+
+    def test_accents_are_ignored(self):
+        self.assertEqual(self.search('creme brulee'), ['creme-brulee-torch'])
+
+    def test_unrelated_or_short_queries_match_nothing(self):
+        self.assertEqual(self.search('xylophone'), [])
+        self.assertEqual(self.search('w'), [])
+
+
+class BuildIndexTests(TestCase):
+    def test_only_listed_products_are_indexed(self):
+        make_product('Desk Lamp')
+        make_product('Floor Lamp', is_available=False)
+        index = build_index(version=0)
+        self.assertEqual([index.slugs[product] for product in index.search('lamp', 5)], ['desk-lamp'])
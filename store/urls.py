@@ -1,11 +1,13 @@
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('cart/', views.cart, name='cart'),
+    path('cart/update/', views.cart_update, name='cart_update'),
     path('register/', views.register, name='register'), 
     path('search/', views.search, name='search'),# <-- NEW URL
+    path('search/suggest/', views.search_suggest, name='search_suggest'), # Autocomplete (JSON)
     path('account/', views.my_account, name='my_account'),       # My Account Dashboard
     path('account/edit/', views.edit_profile, name='edit_profile'),
     path('decrease_cart/<slug:product_slug>/', views.decrease_cart, name='decrease_cart'),
@@ -15,6 +17,10 @@ urlpatterns = [
     path('checkout/', views.checkout, name='checkout'),
     path('order_complete/<str:order_number>/', views.order_complete, name='order_complete'),
     path('order_detail/<str:order_number>/', views.order_detail, name='order_detail'),
+    path('inventory/stock-feed/', views.stock_feed, name='stock_feed'), # Warehouse stock adjustments
+    path('robots.txt', views.robots_txt, name='robots_txt'),
+    path('sitemap.xml', views.sitemap, name='sitemap'),
+    re_path(r'^(?P<name>sitemap-[a-z]+(?:-\d+)?\.xml\.gz)$', views.sitemap, name='sitemap_part'),
     path('<slug:product_slug>/', views.product_detail, name='product_detail'),
     path('category/<slug:category_slug>/', views.products_by_category, name='products_by_category'),
     path('my_orders/', views.my_orders, name='my_orders'),
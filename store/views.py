@@ -1,26 +1,37 @@
-from django.db.models import Q
+import hmac
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum
+from django.http import HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required # For restricting access
-from django.utils.crypto import get_random_string # For generating order number
-from .models import Product, Cart, CartItem, Order, OrderItem # All your models
+from .order_numbers import new_order_number # Time-ordered order numbers
+from .reporting import record_order_placed
+from .models import Product, Cart, CartItem, Order, OrderItem, ArchivedOrder # All your models
 from .models import Product, Category
 from .forms import UserProfileForm
 from .forms import OrderForm, RegistrationForm # The form you created
+from .facets import apply_facets
+from .carts import attach_cart_on_login
+from .archive import get_order_items
+from .inventory import (
+    InsufficientStock, StockConflict, adjust_stock, available_stock, release, reserve, reserve_many,
+    with_available_stock,
+)
+from .recommendations import recommended_for_cart, recommended_products
+from .rankings import get_bestsellers, get_trending, record_sales
+from .stock_ingest import InvalidStockRecord, ingest_stock_records, parse_records
+from .media import serve_media
+from .snapshot import SITEMAP_INDEX, sitemap_url
+from .suggest import suggest
 from django.contrib import messages
 
-def home(request):
-    # Retrieve all products where 'is_available' is True, 
-    # ordering them by their name (as defined in the model Meta class)
-    products = Product.objects.filter(is_available=True)
-    
-    # Define the context dictionary to pass data to the template
-    context = {
-        'products': products
-    }
-    
-    # Render the home.html template, passing the products in the context
-    return render(request, 'home.html', context)
-
 def product_detail(request, product_slug):
     # Use get_object_or_404 to retrieve the product by its slug.
     # If a product with that slug is not found, Django automatically returns a 404 error.
@@ -32,6 +43,10 @@ def product_detail(request, product_slug):
     
     context = {
         'product': product,
+        # On-hand stock minus units currently held in shoppers' carts
+        'available_stock': available_stock(product),
+        # "Frequently bought together", precomputed by `manage.py build_recommendations`
+        'recommendations': recommended_products(product),
     }
     
     return render(request, 'store/product_detail.html', context)
@@ -48,39 +63,68 @@ def _get_cart_id(request):
         request.session['cart_id'] = cart_id
     return cart_id
 
+def _get_cart(request, create=False):
+    """
+    Returns the current shopper's cart.
+
+    A logged-in user's is their own cart, found by primary key (remembered in the session at
+    login). An anonymous shopper's is found by the session's cart id. If there is none,
+    Cart.DoesNotExist is raised unless `create` is set: only the paths that add to a cart
+    create one, so browsing (and the cart_counter on every page) never writes.
+    """
+    # The view and the cart_counter context processor share one lookup per request
+    if getattr(request, '_cart', None) is not None:
+        return request._cart
+    if request.user.is_authenticated:
+        cart_pk = request.session.get('cart_pk')
+        cart = Cart.objects.filter(pk=cart_pk, user=request.user).first() if cart_pk else None
+        if cart is None and create:
+            # Sessions that logged in before carts belonged to users get theirs attached (and merged) now
+            cart = attach_cart_on_login(request, request.user)
+        elif cart is None:
+            cart = Cart.objects.get(user=request.user)
+    elif create:
+        cart, _ = Cart.objects.get_or_create(cart_id=_get_cart_id(request), user=None)
+    else:
+        cart = Cart.objects.get(cart_id=request.session.get('cart_id'), user=None)
+    request._cart = cart
+    return cart
+
 def add_cart(request, product_slug):
     product = get_object_or_404(Product, slug=product_slug)
-    cart_id = _get_cart_id(request)
+    cart = _get_cart(request, create=True)
     
-    try:
-        cart = Cart.objects.get(cart_id=cart_id)
-    except Cart.DoesNotExist:
-        cart = Cart.objects.create(cart_id=cart_id)
-        cart.save()
-    
-    try:
-        cart_item = CartItem.objects.get(product=product, cart=cart)
-        
-        # 🛑 STOCK CHECK LOGIC 🛑
-        if cart_item.quantity < product.stock:
-            # Only increment if the total quantity in the cart is less than available stock
-            cart_item.quantity += 1
-            cart_item.save()
-        else:
-            # If quantity is maxed out, send a message
-            messages.info(request, f"Sorry, only {product.stock} items of {product.name} are available in stock.")
+    with transaction.atomic():
+        # Re-read the stock inside the transaction (a checkout may have taken some since the lookup above).
+        # select_for_update() reads the primary and, where supported, holds the row until the hold is written
+        product = Product.objects.select_for_update().get(pk=product.pk)
+        # Stock not already held by other shoppers' carts
+        available = available_stock(product, exclude_cart=cart)
+        try:
+            cart_item = CartItem.objects.get(product=product, cart=cart)
             
-    except CartItem.DoesNotExist:
-        # If it's a new item, check if stock is > 0 before creating
-        if product.stock > 0:
-            cart_item = CartItem.objects.create(
-                product=product,
-                quantity=1,
-                cart=cart
-            )
-            cart_item.save()
-        else:
-             messages.error(request, f"{product.name} is currently out of stock.")
+            # 🛑 STOCK CHECK LOGIC 🛑
+            if cart_item.quantity < available:
+                # Only increment if the total quantity in the cart is less than available stock
+                cart_item.quantity += 1
+                cart_item.save()
+                # Hold the units for this cart until the reservation TTL runs out
+                reserve(cart, product, cart_item.quantity)
+            else:
+                # If quantity is maxed out, send a message
+                messages.info(request, f"Sorry, only {available} items of {product.name} are available in stock.")
+                
+        except CartItem.DoesNotExist:
+            # If it's a new item, check if stock is > 0 before creating
+            if available > 0:
+                cart_item = CartItem.objects.create(
+                    product=product,
+                    quantity=1,
+                    cart=cart
+                )
+                reserve(cart, product, 1)
+            else:
+                 messages.error(request, f"{product.name} is currently out of stock.")
     
     # Conditional redirect logic remains the same
     if 'cart' in request.META.get('HTTP_REFERER', ''):
@@ -94,9 +138,8 @@ def cart(request, total=0, quantity=0, cart_items=None):
     Renders the shopping cart page, calculating the total price and quantity.
     """
     try:
-        # 1. Get the current cart based on the session ID
-        cart_id = _get_cart_id(request)
-        cart_obj = Cart.objects.get(cart_id=cart_id)
+        # 1. Get the current cart (the user's own, or the session's)
+        cart_obj = _get_cart(request)
         
         # 2. Retrieve all active items linked to this cart
         cart_items = CartItem.objects.filter(cart=cart_obj, is_active=True)
@@ -114,12 +157,95 @@ def cart(request, total=0, quantity=0, cart_items=None):
     context = {
         'total': total,
         'quantity': quantity,
-        'cart_items': cart_items
+        'cart_items': cart_items,
+        # Products often bought with what's already in the cart
+        'recommendations': recommended_for_cart([item.product_id for item in cart_items or ()]),
     }
     
     return render(request, 'store/cart.html', context)
 
 
+# Most lines one batch cart update may change
+CART_UPDATE_MAX_LINES = 100
+
+@require_POST
+def cart_update(request):
+    """
+    Sets several cart quantities in one request: POST {"items": {"<slug>": <quantity>, ...}} as JSON.
+
+    A quantity of 0 removes the line; quantities above the stock other carts aren't holding
+    are lowered to it. Responds with the updated lines and the new cart totals.
+    """
+    # 1. Parse the requested changes
+    try:
+        changes = json.loads(request.body)['items']
+        if not isinstance(changes, dict) or len(changes) > CART_UPDATE_MAX_LINES:
+            raise ValueError
+        changes = {str(slug): int(quantity) for slug, quantity in changes.items()}
+        if any(quantity < 0 for quantity in changes.values()):
+            raise ValueError
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse(
+            {'error': f'Expected {{"items": {{"<slug>": <quantity>, ...}}}} with at most {CART_UPDATE_MAX_LINES} items.'},
+            status=400,
+        )
+
+    # 2. Get (or start) the current cart
+    cart = _get_cart(request, create=True)
+
+    with transaction.atomic():
+        # 3. Lock the products on the primary (in pk order, so two updates can't deadlock), as add_cart
+        # does, then read every product with its free stock in one query. The stock sum can't be read
+        # in the locking query itself: FOR UPDATE isn't allowed with GROUP BY
+        locked = list(
+            Product.objects.using('default').select_for_update()
+            .filter(slug__in=changes).order_by('pk').values_list('pk', flat=True)
+        )
+        products = {
+            product.slug: product
+            for product in with_available_stock(
+                Product.objects.using('default').filter(pk__in=locked), exclude_carts=[cart],
+            )
+        }
+        unknown = sorted(set(changes) - set(products))
+        if unknown:
+            return JsonResponse({'error': 'Unknown products.', 'unknown': unknown}, status=400)
+
+        quantities = {}
+        notices = []
+        for slug, quantity in changes.items():
+            product = products[slug]
+            available = max(product.available, 0)
+            if quantity > available:
+                quantity = available
+                notices.append(f"Sorry, only {available} items of {product.name} are available in stock.")
+            quantities[product] = quantity
+
+        # 4. Upsert the kept lines, delete the zeroed ones, and move the stock holds to match
+        CartItem.objects.bulk_create(
+            [CartItem(cart=cart, product=product, quantity=quantity) for product, quantity in quantities.items() if quantity],
+            update_conflicts=True, unique_fields=['cart', 'product'], update_fields=['quantity', 'is_active'],
+        )
+        removed = [product.pk for product, quantity in quantities.items() if not quantity]
+        if removed:
+            CartItem.objects.filter(cart=cart, product_id__in=removed).delete()
+        reserve_many(cart, {product.pk: quantity for product, quantity in quantities.items()})
+
+    # 5. The new cart totals, in one aggregate query
+    totals = CartItem.objects.filter(cart=cart, is_active=True).aggregate(
+        total=Sum(F('quantity') * F('product__price')), quantity=Sum('quantity'),
+    )
+    return JsonResponse({
+        'items': {
+            product.slug: {'quantity': quantity, 'sub_total': f'{product.price * quantity:.2f}'}
+            for product, quantity in quantities.items()
+        },
+        'notices': notices,
+        'quantity': totals['quantity'] or 0,
+        'total': f"{totals['total'] or 0:.2f}",
+    })
+
+
 def remove_cart(request, product_slug):
     """
     Handles removing a single CartItem instance entirely from the cart.
@@ -127,21 +253,19 @@ def remove_cart(request, product_slug):
     # 1. Get the product to be removed
     product = get_object_or_404(Product, slug=product_slug)
     
-    # 2. Get the current Cart object
-    cart_id = _get_cart_id(request)
-    cart = Cart.objects.get(cart_id=cart_id)
-    
-    # 3. Find the CartItem associated with the product and cart
+    # 2. Get the current Cart object and find the CartItem associated with the product and cart
     try:
+        cart = _get_cart(request)
         cart_item = CartItem.objects.get(
             product=product,
             cart=cart
         )
-        # 4. Delete the CartItem from the database
+        # 4. Delete the CartItem from the database and give back its held stock
         cart_item.delete()
+        release(cart, product)
         
-    except CartItem.DoesNotExist:
-        # If the item doesn't exist, just pass (or show a message)
+    except (Cart.DoesNotExist, CartItem.DoesNotExist):
+        # If the cart or item doesn't exist, just pass (or show a message)
         pass 
         
     # 5. Redirect back to the cart page
@@ -156,12 +280,9 @@ def decrease_cart(request, product_slug):
     # 1. Get the product to be modified
     product = get_object_or_404(Product, slug=product_slug)
     
-    # 2. Get the current Cart object
-    cart_id = _get_cart_id(request)
-    cart = Cart.objects.get(cart_id=cart_id)
-    
-    # 3. Find the CartItem
+    # 2. Get the current Cart object and find the CartItem
     try:
+        cart = _get_cart(request)
         cart_item = CartItem.objects.get(
             product=product,
             cart=cart
@@ -172,12 +293,14 @@ def decrease_cart(request, product_slug):
             # Decrease quantity by 1
             cart_item.quantity -= 1
             cart_item.save()
+            reserve(cart, product, cart_item.quantity)
         else:
             # If quantity is 1, delete the item entirely
             cart_item.delete()
+            release(cart, product)
             
-    except CartItem.DoesNotExist:
-        # If the item doesn't exist, just pass
+    except (Cart.DoesNotExist, CartItem.DoesNotExist):
+        # If the cart or item doesn't exist, just pass
         pass 
         
     # 5. Redirect back to the cart page
@@ -188,8 +311,8 @@ def decrease_cart(request, product_slug):
 @login_required(login_url='login') 
 def checkout(request, total=0, quantity=0, cart_items=None):
     try:
-        cart = Cart.objects.get(cart_id=_get_cart_id(request))
-        cart_items = CartItem.objects.filter(cart=cart, is_active=True)
+        cart = _get_cart(request)
+        cart_items = CartItem.objects.filter(cart=cart, is_active=True).select_related('product')
         for item in cart_items:
             total += item.sub_total()
             quantity += item.quantity
@@ -211,30 +334,45 @@ def checkout(request, total=0, quantity=0, cart_items=None):
             data.country = form.cleaned_data['country']
             data.order_total = total
             
-            order_number = get_random_string(20).upper()
-            data.order_number = order_number
+            data.order_number = new_order_number()
             data.is_ordered = True 
-            data.save() 
-
-            for item in cart_items:
-    # 3a. Create the OrderItem record
-                OrderItem.objects.create(
-                order=data,
-                product=item.product,
-                quantity=item.quantity,
-                product_price=item.product.price,
-                is_ordered=True
-            )
-    
-    # 3b. 🛑 INVENTORY DEDUCTION LOGIC 🛑
-                product = item.product # Get the Product instance
-                product.stock -= item.quantity # Reduce stock by purchased quantity
-                product.save() # Save the updated stock back to the database
-    
-    # 4. Clear the cart after order creation (as before)
-                cart_items.delete() 
+
+            try:
+                # The order, its items and every stock deduction succeed or fail together
+                with transaction.atomic():
+                    _save_new_order(data)
+
+                    order_items = []
+                    for item in cart_items:
+                        # 3a. Create the OrderItem record
+                        order_items.append(OrderItem.objects.create(
+                            order=data,
+                            product=item.product,
+                            quantity=item.quantity,
+                            product_price=item.product.price,
+                            is_ordered=True
+                        ))
+            
+                        # 3b. 🛑 INVENTORY DEDUCTION LOGIC 🛑
+                        # Compare-and-swap on Product.version: never overwrites a concurrent change
+                        adjust_stock(item.product, -item.quantity)
+            
+                    # 4. Clear the cart after order creation (as before)
+                    cart_items.delete() 
+                    # The stock is deducted now, so the cart's holds are no longer needed
+                    release(cart)
+                    # Add the order to the daily sales rollups behind the admin dashboard
+                    record_order_placed(data, order_items)
+                    # ...and to the running counters behind the home page rankings
+                    record_sales(data, order_items)
+            except InsufficientStock as e:
+                messages.error(request, f"Sorry, only {e.product.stock} items of {e.product.name} are left in stock. Please update your cart.")
+                return redirect('cart')
+            except StockConflict:
+                messages.error(request, "The store is very busy right now. Please try placing your order again.")
+                return redirect('checkout')
             # Pass order_number to the completion page to display details
-            return redirect('order_complete', order_number=order_number) 
+            return redirect('order_complete', order_number=data.order_number) 
     else:
         form = OrderForm()
         
@@ -247,16 +385,41 @@ def checkout(request, total=0, quantity=0, cart_items=None):
     return render(request, 'store/checkout.html', context)
 
 
+def _save_new_order(order, attempts=3):
+    """Saves a new order, drawing a fresh order number in the (very unlikely) event of a clash."""
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic():
+                order.save()
+            return
+        except IntegrityError:
+            if attempt == attempts - 1 or not Order.objects.filter(order_number=order.order_number).exists():
+                raise
+            order.order_number = new_order_number()
+
+
+def _get_user_order(user, order_number):
+    """
+    The user's placed order with this number, accepting pre-migration (legacy) numbers from old links.
+
+    Falls back to the archive (store.archive) for orders old enough to have been moved there.
+    """
+    number = Q(order_number=order_number) | Q(legacy_order_number=order_number)
+    return (
+        Order.objects.filter(number, user=user, is_ordered=True).first()
+        or ArchivedOrder.objects.filter(number, user=user, is_ordered=True).first()
+    )
+
+
 @login_required(login_url='login')
 def order_complete(request, order_number):
     """
     Renders a success page and displays the order details using the order_number passed in the URL.
     """
-    try:
-        order = Order.objects.get(user=request.user, order_number=order_number, is_ordered=True)
-        order_items = OrderItem.objects.filter(order=order)
-    except Order.DoesNotExist:
+    order = _get_user_order(request.user, order_number)
+    if order is None:
         return redirect('home') # Redirect if the order isn't found or doesn't belong to the user
+    order_items = get_order_items(order)
     
     context = {
         'order': order,
@@ -265,13 +428,30 @@ def order_complete(request, order_number):
     return render(request, 'store/order_complete.html', context)
 
 
+MY_ORDERS_PAGE_SIZE = 20
+
 @login_required(login_url='login')
 def my_orders(request):
-    """Retrieves all orders placed by the currently logged-in user."""
-    orders = Order.objects.filter(user=request.user, is_ordered=True).order_by('-created_at')
+    """Retrieves the orders placed by the currently logged-in user, newest first, one page at a time."""
+    orders = Order.objects.filter(user=request.user, is_ordered=True).order_by('-order_number')
+    archived = ArchivedOrder.objects.filter(user=request.user, is_ordered=True).order_by('-order_number')
+    
+    # Keyset pagination: order numbers sort by time, so "older than this order" is an index range scan
+    before = request.GET.get('before')
+    if before:
+        orders = orders.filter(order_number__lt=before)
+        archived = archived.filter(order_number__lt=before)
+    # Old orders move to the archive: take one page from each table and merge them, newest first
+    orders = sorted(
+        [*orders[:MY_ORDERS_PAGE_SIZE + 1], *archived[:MY_ORDERS_PAGE_SIZE + 1]],
+        key=lambda order: order.order_number, reverse=True,
+    )[:MY_ORDERS_PAGE_SIZE + 1]
+    next_cursor = orders[MY_ORDERS_PAGE_SIZE - 1].order_number if len(orders) > MY_ORDERS_PAGE_SIZE else None
     
     context = {
-        'orders': orders,
+        'orders': orders[:MY_ORDERS_PAGE_SIZE],
+        'next_cursor': next_cursor,
+        'is_first_page': not before,
     }
     return render(request, 'store/my_orders.html', context)
 
@@ -281,12 +461,10 @@ def order_detail(request, order_number):
     """
     Retrieves and displays a single order and its items, verifying ownership.
     """
-    try:
-        order = Order.objects.get(user=request.user, order_number=order_number, is_ordered=True)
-        order_items = OrderItem.objects.filter(order=order)
-        
-    except Order.DoesNotExist:
+    order = _get_user_order(request.user, order_number)
+    if order is None:
         return redirect('my_orders') 
+    order_items = get_order_items(order)
 
     context = {
         'order': order,
@@ -314,12 +492,17 @@ def register(request):
 
 def home(request):
     # Retrieve all available products
+    # (the navbar categories come from the cached tree in store.context_processors.categories)
     products = Product.objects.filter(is_available=True)
-    categories = Category.objects.all()
+    # Narrow by the selected price/stock/category facets and count every option
+    products, facets = apply_facets(request, products)
     
     context = {
         'products': products,
-        'categories': categories, # <-- Pass categories to the template
+        'facets': facets,
+        # Cached top-N lists from the running sales counters (store.rankings)
+        'bestsellers': get_bestsellers(),
+        'trending': get_trending(),
     }
     
     return render(request, 'home.html', context)
@@ -328,15 +511,13 @@ def products_by_category(request, category_slug=None):
     # 1. Fetch the selected category object
     current_category = get_object_or_404(Category, slug=category_slug)
     
-    # 2. Filter products that belong to this category
-    products = Product.objects.filter(category=current_category, is_available=True)
-    
-    # 3. Fetch all categories again (for the navbar/sidebar)
-    categories = Category.objects.all()
+    # 2. Products in this category or any of its subcategories (one path-range subquery)
+    products = current_category.subtree_products().filter(is_available=True)
+    products, facets = apply_facets(request, products, current_category=current_category)
     
     context = {
         'products': products,
-        'categories': categories,
+        'facets': facets,
         'current_category': current_category,
     }
     return render(request, 'home.html', context)
@@ -344,6 +525,7 @@ def products_by_category(request, category_slug=None):
 def search(request):
     products = None
     keyword = None
+    facets = None
     
     if 'keyword' in request.GET:
         keyword = request.GET['keyword']
@@ -353,15 +535,28 @@ def search(request):
                 Q(description__icontains=keyword) | Q(name__icontains=keyword),
                 is_available=True
             )
+            products, facets = apply_facets(request, products)
             
     context = {
         'products': products,
         'keyword': keyword,
+        'facets': facets,
     }
     # We will reuse the home.html template to display search results
     return render(request, 'home.html', context)
 
 
+@cache_control(private=True, max_age=60)
+def search_suggest(request):
+    """
+    Search-as-you-type: GET ?q=<partly typed text> -> {"results": [{"name", "slug", "url"}, ...]}.
+
+    Answered from the in-memory index in store.suggest (typo tolerant); no database queries.
+    """
+    query = request.GET.get('q', '')[:100]
+    return JsonResponse({'query': query, 'results': suggest(query)})
+
+
 @login_required(login_url='login')
 def my_account(request):
     """Renders the user account dashboard, showing basic links."""
@@ -381,4 +576,39 @@ def edit_profile(request):
         form = UserProfileForm(instance=request.user)
         
     context = {'form': form, 'title': 'Edit Profile'}
-    return render(request, 'store/edit_profile.html', context)
\ No newline at end of file
+    return render(request, 'store/edit_profile.html', context)
+
+@csrf_exempt # Called by the warehouse system, not a browser: authenticated by token instead
+@require_POST
+def stock_feed(request):
+    """
+    Applies warehouse stock records POSTed as JSON lines (format in store.stock_ingest.parse_records),
+    with "Authorization: Bearer <STOCK_INGEST_TOKEN>". Responds with the counts applied.
+    """
+    # 1. Only the warehouse may call this; the endpoint is off until a token is configured
+    token = settings.STOCK_INGEST_TOKEN
+    scheme, _, supplied = request.headers.get('Authorization', '').partition(' ')
+    if not token or scheme != 'Bearer' or not hmac.compare_digest(supplied.encode(), token.encode()):
+        return JsonResponse({'error': 'Invalid or missing token.'}, status=403)
+
+    # 2. Apply the records as the body streams in, a buffer at a time (it is never read whole)
+    try:
+        stats = ingest_stock_records(parse_records(request))
+    except InvalidStockRecord as e:
+        # Records before the bad line may have been applied; resending the feed is safe (sequence numbers)
+        return JsonResponse({'error': str(e), 'line': e.line_number}, status=400)
+    return JsonResponse(stats)
+
+
+@cache_control(public=True, max_age=60 * 60 * 24)
+def robots_txt(request):
+    """Points crawlers at the static sitemaps (`manage.py build_catalog_snapshot`) instead of crawling the catalog."""
+    # Rendered without the request: crawlers don't need the cart and category context processors
+    content = render_to_string('robots.txt', {'sitemap_url': sitemap_url()})
+    return HttpResponse(content, content_type='text/plain')
+
+
+def sitemap(request, name=SITEMAP_INDEX):
+    """The sitemap index and its sitemaps, written by `manage.py build_catalog_snapshot`, served from the site root."""
+    # Same validators, 304s and front-end offload as product images; only the URL differs
+    return serve_media(request, f'{settings.CATALOG_SNAPSHOT_DIR}/{name}')
@@ -0,0 +1,102 @@
+# store/warmup.py
+
+import logging
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.urls import get_resolver, reverse
+
+from .catalog import get_category_tree
+from .rankings import get_bestsellers, get_trending
+from .suggest import get_index
+
+logger = logging.getLogger(__name__)
+
+
+def warm_url_resolver():
+    """Builds the URL resolver's lookup tables (normally done by the first reverse())."""
+    resolver = get_resolver()
+    # Reading reverse_dict populates the lookup tables; reverse() also loads every included URLconf
+    resolver.reverse_dict
+    reverse('home')
+    return len(resolver.url_patterns)
+
+
+def _template_names(engine):
+    for directory in engine.template_dirs:
+        directory = Path(directory)
+        for path in directory.rglob('*'):
+            if path.suffix in ('.html', '.txt', '.xml') and path.is_file():
+                yield path.relative_to(directory).as_posix()
+
+
+def warm_templates():
+    """
+    Loads and compiles every project and app template into the cached template loader.
+
+    Names found in several directories compile whichever the loaders would pick, exactly
+    as a request would. Returns the number of templates compiled.
+    """
+    compiled = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        for name in sorted(set(_template_names(engine))):
+            try:
+                engine.get_template(name)
+            except Exception:
+                # A broken template fails its request later as it always did; warm-up carries on
+                logger.warning("Warm-up could not compile template %s", name, exc_info=True)
+            else:
+                compiled += 1
+    return compiled
+
+
+def warm_catalog_caches():
+    """Primes the cached category tree and home page rankings."""
+    return len(get_category_tree()) + len(get_bestsellers()) + len(get_trending())
+
+
+def warm_search_suggestions():
+    """Builds this process's search suggestion index; returns the number of products in it."""
+    return len(get_index().names)
+
+
+STEPS = (
+    ('URL resolver', warm_url_resolver),
+    ('templates', warm_templates),
+    ('catalog caches', warm_catalog_caches),
+    ('search suggestions', warm_search_suggestions),
+)
+
+
+def warm_up():
+    """Runs every warm-up step; returns [(step, result, seconds), ...]. Never raises."""
+    report = []
+    for name, step in STEPS:
+        started = time.perf_counter()
+        try:
+            result = step()
+        except Exception:
+            # e.g. migrations not applied yet, or the cache unreachable: the worker must still start
+            logger.warning("Warm-up step '%s' failed", name, exc_info=True)
+            result = None
+        report.append((name, result, time.perf_counter() - started))
+    # Don't hand a connection opened here to forked workers (gunicorn --preload)
+    connections.close_all()
+    return report
+
+
+def warm_up_worker():
+    """Called from config/wsgi.py and config/asgi.py once the application is loaded."""
+    if not settings.WARMUP_ON_STARTUP:
+        return
+    report = warm_up()
+    logger.info(
+        "Worker warm-up: %s",
+        ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, _, seconds in report),
+    )